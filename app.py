@@ -1,15 +1,21 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, send_file, flash
+from flask import Flask, Response, g, render_template, request, jsonify, session, redirect, url_for, send_file, send_from_directory, flash
 from datetime import datetime, timedelta
 import os
 import logging
 from functools import wraps
+from werkzeug.exceptions import NotFound
 
 # Importar módulos do sistema
 from config import Config
-from database import Database
-from business import ClienteBusiness, VendaBusiness, PagamentoBusiness, RelatoriosBusiness
-from utils import validar_cpf, formatar_moeda, exportar_para_csv, exportar_para_excel, Logger
+from database import obter_database, liberar_database, cache_configuracoes
+from cache import cache_respostas, cache_resposta, responder_com_etag
+from idempotencia import idempotente
+from exportacoes import criar_exportacao, estado_exportacao, marcar_exportacoes_interrompidas, ExportacaoInvalida
+from business import ClienteBusiness, VendaBusiness, PagamentoBusiness, RelatoriosBusiness, DashboardBusiness, LogsBusiness
+from utils import validar_cpf, formatar_moeda, exportar_para_csv, exportar_para_excel, criar_backup_mysql, Logger
 from printer import imprimir_comprovante_venda, testar_impressora, PrinterFallback
+from tarefas import agendador
+from filtros import FiltroVendas, FiltroLogs, FiltroInvalido, limite_pagina, ler_cursor_vendas, ler_cursor_clientes, ler_cursor_logs
 
 # Configurar logging
 Logger.setup_logging()
@@ -19,6 +25,9 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 app.config.from_object(Config)
 
+# Uma conexão do pool por request, devolvida ao final
+app.teardown_appcontext(liberar_database)
+
 # Verificar se está autenticado
 def login_required(f):
     @wraps(f)
@@ -39,8 +48,8 @@ def login():
             session['login_time'] = datetime.now().isoformat()
             
             # Log do login
-            db = Database()
-            db.inserir_log('LOGIN', 'Login realizado', 'usuario', request.remote_addr)
+            db = obter_database()
+            db.inserir_log('LOGIN', 'Login realizado')
             
             return redirect(url_for('dashboard'))
         else:
@@ -53,26 +62,33 @@ def logout():
     session.clear()
     return redirect(url_for('login'))
 
+# SERVICE WORKER
+# Servido na raiz para que o escopo cubra as páginas e /api/
+@app.route('/sw.js')
+def service_worker():
+    resposta = send_from_directory(os.path.join(app.static_folder, 'js'), 'sw.js',
+                                   mimetype='application/javascript')
+    resposta.headers['Cache-Control'] = 'no-cache'
+    return resposta
+
 # ROTA PRINCIPAL - DASHBOARD
 # ROTA PRINCIPAL - DASHBOARD (CORRIGIDA)
 @app.route('/')
 @login_required
 def dashboard():
     try:
-        # Buscar estatísticas
-        stats_result = VendaBusiness.get_estatisticas_dashboard()
-        alertas_result = ClienteBusiness.get_alertas_inadimplencia()
-        graficos_result = RelatoriosBusiness.get_dados_graficos(30)
+        # Estatísticas, alertas e gráficos em um único payload (em cache por alguns segundos)
+        resultado = cache_respostas.obter_ou_calcular(
+            'dashboard:30', lambda: DashboardBusiness.get_dados_dashboard(30)
+        )
         
         # Tratar resultados de forma mais segura
-        stats = {}
-        alertas = []
-        graficos = {}
+        stats = resultado.get('estatisticas') or {}
+        alertas = resultado.get('alertas') or []
+        graficos = resultado.get('graficos') or {}
         
         # Processar estatísticas
-        if stats_result and stats_result.get('sucesso'):
-            stats = stats_result.get('estatisticas', {})
-        else:
+        if not stats:
             # Valores padrão se não conseguir buscar
             stats = {
                 'total_clientes': 0,
@@ -81,14 +97,8 @@ def dashboard():
                 'vendas_vencidas': {'total': 0, 'valor_total': 0, 'valor_total_formatado': 'R$ 0,00'}
             }
         
-        # Processar alertas
-        if alertas_result and alertas_result.get('sucesso'):
-            alertas = alertas_result.get('alertas', [])
-        
         # Processar gráficos
-        if graficos_result and graficos_result.get('sucesso'):
-            graficos = graficos_result.get('graficos', {})
-        else:
+        if not graficos:
             # Valores padrão para gráficos
             graficos = {
                 'vendas_por_dia': {'labels': [], 'valores': [], 'quantidades': []},
@@ -131,15 +141,37 @@ def clientes():
 def api_listar_clientes():
     try:
         filtro = request.args.get('filtro', '')
-        limite = int(request.args.get('limite', 50))
+        limite = limite_pagina(request.args.get('limite'))
+        after = ler_cursor_clientes(request.args.get('after'))
         
-        resultado = ClienteBusiness.buscar_clientes(filtro if filtro else None, limite)
+        resultado = ClienteBusiness.buscar_clientes(filtro if filtro else None, limite, after)
         return jsonify(resultado)
         
+    except FiltroInvalido as e:
+        return jsonify({'sucesso': False, 'erro': str(e)})
     except Exception as e:
         logger.error(f"Erro ao listar clientes: {e}")
         return jsonify({'sucesso': False, 'erro': 'Erro interno do sistema'})
 
+@app.route('/api/clientes/sugestoes', methods=['GET'])
+@login_required
+def api_sugestoes_clientes():
+    try:
+        termo = request.args.get('q', '').strip()
+        cliente_id = request.args.get('id', type=int)
+        limite = min(request.args.get('limite', 10, type=int), 50)
+        com_saldo = request.args.get('com_saldo') in ('1', 'true')
+        
+        if not termo and cliente_id is None:
+            return jsonify({'sucesso': True, 'clientes': []})
+        
+        resultado = ClienteBusiness.sugerir_clientes(termo, limite, com_saldo, cliente_id)
+        return jsonify(resultado)
+        
+    except Exception as e:
+        logger.error(f"Erro ao buscar sugestões de clientes: {e}")
+        return jsonify({'sucesso': False, 'erro': 'Erro interno do sistema'})
+
 @app.route('/api/clientes', methods=['POST'])
 @login_required
 def api_criar_cliente():
@@ -147,11 +179,6 @@ def api_criar_cliente():
         dados = request.json
         resultado = ClienteBusiness.criar_cliente(dados)
         
-        if resultado['sucesso']:
-            # Log da operação
-            db = Database()
-            db.inserir_log('CLIENTE_CRIADO', f"Cliente: {dados.get('nome')}", 'usuario', request.remote_addr)
-        
         return jsonify(resultado)
         
     except Exception as e:
@@ -162,8 +189,10 @@ def api_criar_cliente():
 @login_required
 def api_buscar_cliente(cliente_id):
     try:
-        resultado = ClienteBusiness.buscar_cliente(cliente_id)
-        return jsonify(resultado)
+        return responder_com_etag(
+            obter_database().versao_cliente(cliente_id),
+            lambda: ClienteBusiness.buscar_cliente(cliente_id)
+        )
         
     except Exception as e:
         logger.error(f"Erro ao buscar cliente: {e}")
@@ -176,11 +205,6 @@ def api_atualizar_cliente(cliente_id):
         dados = request.json
         resultado = ClienteBusiness.atualizar_cliente(cliente_id, dados)
         
-        if resultado['sucesso']:
-            # Log da operação
-            db = Database()
-            db.inserir_log('CLIENTE_ATUALIZADO', f"Cliente ID: {cliente_id}", 'usuario', request.remote_addr)
-        
         return jsonify(resultado)
         
     except Exception as e:
@@ -193,11 +217,6 @@ def api_excluir_cliente(cliente_id):
     try:
         resultado = ClienteBusiness.excluir_cliente(cliente_id)
         
-        if resultado['sucesso']:
-            # Log da operação
-            db = Database()
-            db.inserir_log('CLIENTE_EXCLUIDO', f"Cliente ID: {cliente_id}", 'usuario', request.remote_addr)
-        
         return jsonify(resultado)
         
     except Exception as e:
@@ -214,25 +233,15 @@ def vendas():
 @login_required
 def api_listar_vendas():
     try:
-        filtros = {}
-        
-        if request.args.get('cliente_id'):
-            filtros['cliente_id'] = int(request.args.get('cliente_id'))
-        
-        if request.args.get('status'):
-            filtros['status'] = request.args.get('status')
-        
-        if request.args.get('data_inicio'):
-            filtros['data_inicio'] = request.args.get('data_inicio')
+        filtros = FiltroVendas.de_request_args(request.args)
+        limite = limite_pagina(request.args.get('limite'))
+        after = ler_cursor_vendas(request.args.get('after'))
         
-        if request.args.get('data_fim'):
-            filtros['data_fim'] = request.args.get('data_fim')
-        
-        limite = int(request.args.get('limite', 50))
-        
-        resultado = VendaBusiness.buscar_vendas(filtros if filtros else None, limite)
+        resultado = VendaBusiness.buscar_vendas(filtros, limite, after)
         return jsonify(resultado)
         
+    except FiltroInvalido as e:
+        return jsonify({'sucesso': False, 'erro': str(e)})
     except Exception as e:
         logger.error(f"Erro ao listar vendas: {e}")
         return jsonify({'sucesso': False, 'erro': 'Erro interno do sistema'})
@@ -244,11 +253,6 @@ def api_criar_venda():
         dados = request.json
         resultado = VendaBusiness.criar_venda(dados)
         
-        if resultado['sucesso']:
-            # Log da operação
-            db = Database()
-            db.inserir_log('VENDA_CRIADA', f"Venda ID: {resultado['venda_id']}, Valor: {formatar_moeda(resultado['valor_total'])}", 'usuario', request.remote_addr)
-        
         return jsonify(resultado)
         
     except Exception as e:
@@ -259,13 +263,26 @@ def api_criar_venda():
 @login_required
 def api_buscar_venda(venda_id):
     try:
-        resultado = VendaBusiness.buscar_venda(venda_id)
-        return jsonify(resultado)
+        return responder_com_etag(
+            obter_database().versao_venda(venda_id),
+            lambda: VendaBusiness.buscar_venda(venda_id)
+        )
         
     except Exception as e:
         logger.error(f"Erro ao buscar venda: {e}")
         return jsonify({'sucesso': False, 'erro': 'Erro interno do sistema'})
 
+@app.route('/api/vendas/<int:venda_id>/origens', methods=['GET'])
+@login_required
+def api_linhagem_venda(venda_id):
+    try:
+        resultado = VendaBusiness.buscar_linhagem_venda(venda_id)
+        return jsonify(resultado)
+        
+    except Exception as e:
+        logger.error(f"Erro ao buscar linhagem da venda: {e}")
+        return jsonify({'sucesso': False, 'erro': 'Erro interno do sistema'})
+
 # ROTAS DE PAGAMENTOS
 @app.route('/pagamentos')
 @login_required
@@ -275,6 +292,20 @@ def pagamentos():
 @app.route('/api/pagamentos/simples', methods=['POST'])
 @login_required
 def api_pagamento_simples():
+    resposta = _registrar_pagamento_simples()
+    
+    # Impressão depois do commit, fora da transação da Idempotency-Key. O
+    # resultado vai só nesta resposta: uma repetição não imprime de novo
+    dados_impressao = g.pop('comprovante_confirmado', None)
+    if dados_impressao is None:
+        return resposta
+    
+    resultado = resposta.get_json()
+    resultado['impressao'] = _imprimir_comprovante(dados_impressao)
+    return jsonify(resultado)
+
+@idempotente
+def _registrar_pagamento_simples():
     try:
         dados = request.json
         resultado = PagamentoBusiness.processar_pagamento_simples(
@@ -284,28 +315,10 @@ def api_pagamento_simples():
             dados.get('observacoes', '')
         )
         
-        if resultado['sucesso']:
-            # Log da operação
-            db = Database()
-            db.inserir_log('PAGAMENTO_PROCESSADO', f"Venda ID: {dados['venda_id']}, Valor: {formatar_moeda(dados['valor_pago'])}", 'usuario', request.remote_addr)
-            
-            # Se venda foi quitada e tem dados para impressão, tentar imprimir
-            if resultado.get('venda_quitada') and resultado.get('dados_impressao'):
-                try:
-                    sucesso_impressao, msg_impressao = imprimir_comprovante_venda(
-                        resultado['dados_impressao']['venda'],
-                        resultado['dados_impressao']
-                    )
-                    resultado['impressao'] = {
-                        'sucesso': sucesso_impressao,
-                        'mensagem': msg_impressao
-                    }
-                except Exception as e:
-                    logger.error(f"Erro na impressão: {e}")
-                    resultado['impressao'] = {
-                        'sucesso': False,
-                        'mensagem': f'Erro na impressão: {str(e)}'
-                    }
+        # Se venda foi quitada e tem dados para impressão, imprimir após o commit
+        if resultado['sucesso'] and resultado.get('venda_quitada') and resultado.get('dados_impressao'):
+            dados_impressao = resultado['dados_impressao']
+            obter_database().ao_confirmar(lambda: setattr(g, 'comprovante_confirmado', dados_impressao))
         
         return jsonify(resultado)
         
@@ -313,8 +326,27 @@ def api_pagamento_simples():
         logger.error(f"Erro ao processar pagamento: {e}")
         return jsonify({'sucesso': False, 'erro': 'Erro interno do sistema'})
 
+def _imprimir_comprovante(dados_impressao):
+    """Imprimir o comprovante da venda quitada; retorna o resultado para a resposta"""
+    try:
+        sucesso_impressao, msg_impressao = imprimir_comprovante_venda(
+            dados_impressao['venda'],
+            dados_impressao
+        )
+        return {
+            'sucesso': sucesso_impressao,
+            'mensagem': msg_impressao
+        }
+    except Exception as e:
+        logger.error(f"Erro na impressão: {e}")
+        return {
+            'sucesso': False,
+            'mensagem': f'Erro na impressão: {str(e)}'
+        }
+
 @app.route('/api/pagamentos/multiplo', methods=['POST'])
 @login_required
+@idempotente
 def api_pagamento_multiplo():
     try:
         dados = request.json
@@ -325,12 +357,6 @@ def api_pagamento_multiplo():
             dados['forma_pagamento']
         )
         
-        if resultado['sucesso']:
-            # Log da operação
-            db = Database()
-            vendas_str = ', '.join([f"#{vid}" for vid in dados['vendas_ids']])
-            db.inserir_log('PAGAMENTO_MULTIPLO', f"Cliente ID: {dados['cliente_id']}, Vendas: {vendas_str}, Valor: {formatar_moeda(dados['valor_pago'])}", 'usuario', request.remote_addr)
-        
         return jsonify(resultado)
         
     except Exception as e:
@@ -341,8 +367,10 @@ def api_pagamento_multiplo():
 @login_required
 def api_vendas_em_aberto_cliente(cliente_id):
     try:
-        resultado = PagamentoBusiness.buscar_vendas_em_aberto_cliente(cliente_id)
-        return jsonify(resultado)
+        return responder_com_etag(
+            obter_database().versao_cliente(cliente_id),
+            lambda: PagamentoBusiness.buscar_vendas_em_aberto_cliente(cliente_id)
+        )
         
     except Exception as e:
         logger.error(f"Erro ao buscar vendas em aberto: {e}")
@@ -359,43 +387,38 @@ def relatorios():
 def api_exportar_vendas():
     try:
         # Parâmetros de filtro
-        filtros = {}
-        if request.args.get('cliente_id'):
-            filtros['cliente_id'] = int(request.args.get('cliente_id'))
-        if request.args.get('status'):
-            filtros['status'] = request.args.get('status')
-        if request.args.get('data_inicio'):
-            filtros['data_inicio'] = request.args.get('data_inicio')
-        if request.args.get('data_fim'):
-            filtros['data_fim'] = request.args.get('data_fim')
+        filtros = FiltroVendas.de_request_args(request.args)
         
         formato = request.args.get('formato', 'excel')  # excel ou csv
-        
-        # Gerar relatório
-        resultado = RelatoriosBusiness.gerar_relatorio_vendas(filtros)
-        
-        if not resultado['sucesso']:
-            return jsonify(resultado)
-        
-        # Gerar arquivo
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         
         if formato == 'csv':
+            # CSV em streaming direto do banco: sem limite de linhas nem arquivo em exports/
             nome_arquivo = f'relatorio_vendas_{timestamp}.csv'
-            sucesso, caminho = exportar_para_csv(resultado['dados'], nome_arquivo)
-        else:
-            nome_arquivo = f'relatorio_vendas_{timestamp}.xlsx'
-            sucesso, caminho = exportar_para_excel(resultado['dados'], nome_arquivo, 'Vendas')
+            blocos, fechar = RelatoriosBusiness.exportar_vendas_csv(filtros)
+            
+            obter_database().inserir_log('RELATORIO_EXPORTADO', f"Relatório de vendas: {nome_arquivo}")
+            
+            resposta = Response(blocos, mimetype='text/csv')
+            resposta.headers['Content-Disposition'] = f'attachment; filename={nome_arquivo}'
+            resposta.call_on_close(fechar)
+            return resposta
+        
+        # Gerar arquivo (linhas lidas do banco e gravadas aos poucos)
+        nome_arquivo = f'relatorio_vendas_{timestamp}.xlsx'
+        sucesso, caminho = RelatoriosBusiness.exportar_vendas_excel(filtros, nome_arquivo)
         
         if sucesso:
             # Log da operação
-            db = Database()
-            db.inserir_log('RELATORIO_EXPORTADO', f"Relatório de vendas: {nome_arquivo}", 'usuario', request.remote_addr)
+            db = obter_database()
+            db.inserir_log('RELATORIO_EXPORTADO', f"Relatório de vendas: {nome_arquivo}")
             
             return send_file(caminho, as_attachment=True, download_name=nome_arquivo)
         else:
             return jsonify({'sucesso': False, 'erro': caminho})
         
+    except FiltroInvalido as e:
+        return jsonify({'sucesso': False, 'erro': str(e)})
     except Exception as e:
         logger.error(f"Erro ao exportar relatório: {e}")
         return jsonify({'sucesso': False, 'erro': 'Erro interno do sistema'})
@@ -424,8 +447,8 @@ def api_exportar_inadimplentes():
         
         if sucesso:
             # Log da operação
-            db = Database()
-            db.inserir_log('RELATORIO_EXPORTADO', f"Relatório de inadimplentes: {nome_arquivo}", 'usuario', request.remote_addr)
+            db = obter_database()
+            db.inserir_log('RELATORIO_EXPORTADO', f"Relatório de inadimplentes: {nome_arquivo}")
             
             return send_file(caminho, as_attachment=True, download_name=nome_arquivo)
         else:
@@ -437,13 +460,74 @@ def api_exportar_inadimplentes():
 
 @app.route('/api/graficos/<int:periodo_dias>')
 @login_required
+@cache_resposta()
 def api_dados_graficos(periodo_dias):
     try:
-        resultado = RelatoriosBusiness.get_dados_graficos(periodo_dias)
-        return jsonify(resultado)
+        return RelatoriosBusiness.get_dados_graficos(periodo_dias)
         
     except Exception as e:
         logger.error(f"Erro ao buscar dados dos gráficos: {e}")
+        return {'sucesso': False, 'erro': 'Erro interno do sistema'}
+
+# ROTAS DE EXPORTAÇÕES (geradas em segundo plano)
+@app.route('/api/exports', methods=['POST'])
+@login_required
+@idempotente
+def api_criar_exportacao():
+    try:
+        dados = request.json or {}
+        exportacao_id = criar_exportacao(
+            obter_database(),
+            dados.get('tipo'),
+            dados.get('formato', 'excel'),
+            dados.get('filtros')
+        )
+        
+        return jsonify({
+            'sucesso': True,
+            'exportacao_id': exportacao_id,
+            'url_status': url_for('api_estado_exportacao', exportacao_id=exportacao_id)
+        })
+        
+    except (ExportacaoInvalida, FiltroInvalido) as e:
+        return jsonify({'sucesso': False, 'erro': str(e)})
+    except Exception as e:
+        logger.error(f"Erro ao criar exportação: {e}")
+        return jsonify({'sucesso': False, 'erro': 'Erro interno do sistema'})
+
+@app.route('/api/exports/<exportacao_id>')
+@login_required
+def api_estado_exportacao(exportacao_id):
+    try:
+        exportacao = obter_database().buscar_exportacao(exportacao_id)
+        if not exportacao:
+            return jsonify({'sucesso': False, 'erro': 'Exportação não encontrada'}), 404
+        
+        estado = estado_exportacao(exportacao)
+        if exportacao['status'] == 'concluida':
+            estado['url_download'] = url_for('api_baixar_exportacao', exportacao_id=exportacao_id)
+        
+        return jsonify({'sucesso': True, 'exportacao': estado})
+        
+    except Exception as e:
+        logger.error(f"Erro ao buscar exportação: {e}")
+        return jsonify({'sucesso': False, 'erro': 'Erro interno do sistema'})
+
+@app.route('/api/exports/<exportacao_id>/arquivo')
+@login_required
+def api_baixar_exportacao(exportacao_id):
+    try:
+        exportacao = obter_database().buscar_exportacao(exportacao_id)
+        if not exportacao or exportacao['status'] != 'concluida':
+            return jsonify({'sucesso': False, 'erro': 'Exportação não encontrada'}), 404
+        
+        return send_from_directory(Config.EXPORT_FOLDER, exportacao['arquivo'], as_attachment=True,
+                                   download_name=exportacao['nome_download'])
+        
+    except NotFound:
+        return jsonify({'sucesso': False, 'erro': 'Arquivo da exportação não está mais disponível'}), 404
+    except Exception as e:
+        logger.error(f"Erro ao baixar exportação: {e}")
         return jsonify({'sucesso': False, 'erro': 'Erro interno do sistema'})
 
 # ROTAS DE IMPRESSÃO
@@ -454,8 +538,8 @@ def api_teste_impressora():
         sucesso, mensagem = testar_impressora()
         
         # Log da operação
-        db = Database()
-        db.inserir_log('TESTE_IMPRESSORA', mensagem, 'usuario', request.remote_addr)
+        db = obter_database()
+        db.inserir_log('TESTE_IMPRESSORA', mensagem)
         
         return jsonify({
             'sucesso': sucesso,
@@ -489,8 +573,8 @@ def api_reimprimir_comprovante(venda_id):
                 sucesso = True
         
         # Log da operação
-        db = Database()
-        db.inserir_log('REIMPRESSAO_COMPROVANTE', f"Venda ID: {venda_id}, Sucesso: {sucesso}", 'usuario', request.remote_addr)
+        db = obter_database()
+        db.inserir_log('REIMPRESSAO_COMPROVANTE', f"Venda ID: {venda_id}, Sucesso: {sucesso}")
         
         return jsonify({
             'sucesso': sucesso,
@@ -542,24 +626,42 @@ def api_busca_global():
         logger.error(f"Erro na busca global: {e}")
         return jsonify({'sucesso': False, 'erro': 'Erro interno do sistema'})
 
+# ROTAS DO DASHBOARD
+@app.route('/api/dashboard')
+@login_required
+@cache_resposta()
+def api_dashboard():
+    try:
+        periodo_dias = request.args.get('periodo_dias', 30, type=int)
+        return DashboardBusiness.get_dados_dashboard(periodo_dias)
+        
+    except Exception as e:
+        logger.error(f"Erro ao buscar dados do dashboard: {e}")
+        return {'sucesso': False, 'erro': 'Erro interno do sistema'}
+
+@app.route('/api/cache')
+@login_required
+def api_cache_respostas():
+    return jsonify({'sucesso': True, 'cache': cache_respostas.estatisticas()})
+
 # ROTAS DE ALERTAS
 @app.route('/api/alertas')
 @login_required
+@cache_resposta()
 def api_buscar_alertas():
     try:
-        resultado = ClienteBusiness.get_alertas_inadimplencia()
-        return jsonify(resultado)
+        return ClienteBusiness.get_alertas_inadimplencia()
         
     except Exception as e:
         logger.error(f"Erro ao buscar alertas: {e}")
-        return jsonify({'sucesso': False, 'erro': 'Erro interno do sistema'})
+        return {'sucesso': False, 'erro': 'Erro interno do sistema'}
 
 # ROTAS DE CONFIGURAÇÃO
 @app.route('/api/configuracao', methods=['GET'])
 @login_required
 def api_buscar_configuracao():
     try:
-        db = Database()
+        db = obter_database()
         configuracoes = {
             'nome_empresa': db.buscar_configuracao('nome_empresa', 'Açougue do João'),
             'endereco_empresa': db.buscar_configuracao('endereco_empresa', ''),
@@ -583,13 +685,12 @@ def api_buscar_configuracao():
 def api_salvar_configuracao():
     try:
         dados = request.json
-        db = Database()
+        db = obter_database()
         
-        for chave, valor in dados.items():
-            db.atualizar_configuracao(chave, valor)
+        db.atualizar_configuracoes(dados)
         
         # Log da operação
-        db.inserir_log('CONFIGURACAO_ATUALIZADA', f"Configurações atualizadas", 'usuario', request.remote_addr)
+        db.inserir_log('CONFIGURACAO_ATUALIZADA', f"Configurações atualizadas")
         
         return jsonify({
             'sucesso': True,
@@ -600,42 +701,43 @@ def api_salvar_configuracao():
         logger.error(f"Erro ao salvar configurações: {e}")
         return jsonify({'sucesso': False, 'erro': 'Erro interno do sistema'})
 
+@app.route('/api/configuracao/cache')
+@login_required
+def api_cache_configuracao():
+    return jsonify({'sucesso': True, 'cache': cache_configuracoes.estatisticas()})
+
+# ROTAS DE LOGS
+@app.route('/api/logs')
+@login_required
+def api_buscar_logs():
+    """Logs ainda no banco (os mais antigos ficam arquivados em backups/)"""
+    try:
+        filtros = FiltroLogs.de_request_args(request.args)
+        limite = limite_pagina(request.args.get('limite'), padrao=100)
+        after = ler_cursor_logs(request.args.get('after'))
+        
+        resultado = LogsBusiness.buscar_logs(filtros, limite, after)
+        return jsonify(resultado)
+        
+    except FiltroInvalido as e:
+        return jsonify({'sucesso': False, 'erro': str(e)})
+    except Exception as e:
+        logger.error(f"Erro ao buscar logs: {e}")
+        return jsonify({'sucesso': False, 'erro': 'Erro interno do sistema'})
+
 # ROTAS DE BACKUP
 @app.route('/api/backup/criar')
 @login_required
 def api_criar_backup():
     try:
-        from utils import gerar_nome_arquivo_backup, criar_diretorio_se_nao_existe
-        import subprocess
-        
-        # Criar diretório de backup
-        criar_diretorio_se_nao_existe('backups')
-        
-        # Gerar nome do arquivo
-        nome_arquivo = gerar_nome_arquivo_backup()
-        caminho_backup = os.path.join('backups', nome_arquivo)
-        
-        # Comando mysqldump
-        config_db = Config.DATABASE_CONFIG
-        comando = [
-            'mysqldump',
-            f'--host={config_db["host"]}',
-            f'--user={config_db["user"]}',
-            f'--password={config_db["password"]}',
-            '--single-transaction',
-            '--routines',
-            '--triggers',
-            config_db['database']
-        ]
-        
-        # Executar backup
-        with open(caminho_backup, 'w') as arquivo_backup:
-            resultado = subprocess.run(comando, stdout=arquivo_backup, stderr=subprocess.PIPE, text=True)
-        
-        if resultado.returncode == 0:
+        sucesso, resultado = criar_backup_mysql(Config.DATABASE_CONFIG, Config.BACKUP_FOLDER)
+        
+        if sucesso:
+            nome_arquivo = resultado
+            
             # Log da operação
-            db = Database()
-            db.inserir_log('BACKUP_CRIADO', f"Backup: {nome_arquivo}", 'usuario', request.remote_addr)
+            db = obter_database()
+            db.inserir_log('BACKUP_CRIADO', f"Backup: {nome_arquivo}")
             
             return jsonify({
                 'sucesso': True,
@@ -645,13 +747,28 @@ def api_criar_backup():
         else:
             return jsonify({
                 'sucesso': False,
-                'erro': f'Erro ao criar backup: {resultado.stderr}'
+                'erro': f'Erro ao criar backup: {resultado}'
             })
         
     except Exception as e:
         logger.error(f"Erro ao criar backup: {e}")
         return jsonify({'sucesso': False, 'erro': 'Erro interno do sistema'})
 
+# ROTAS DE TAREFAS AGENDADAS
+@app.route('/api/jobs')
+@login_required
+def api_status_jobs():
+    try:
+        return jsonify({
+            'sucesso': True,
+            'lider': agendador.lider,
+            'jobs': agendador.status()
+        })
+        
+    except Exception as e:
+        logger.error(f"Erro ao buscar status das tarefas: {e}")
+        return jsonify({'sucesso': False, 'erro': 'Erro interno do sistema'})
+
 # MANIPULADORES DE ERRO
 @app.errorhandler(404)
 def page_not_found(e):
@@ -680,16 +797,35 @@ def inject_globals():
 def criar_tabelas_iniciais():
     """Criar tabelas e dados iniciais se necessário"""
     try:
-        db = Database()
+        db = obter_database()
         db.create_tables()
         db.insert_initial_data()
         logger.info("Tabelas e dados iniciais verificados/criados")
     except Exception as e:
         logger.error(f"Erro ao criar tabelas iniciais: {e}")
 
+def verificar_exportacoes_interrompidas():
+    """Exportações de processos encerrados (reinício, worker que caiu) viram erro"""
+    db = None
+    try:
+        db = obter_database()
+        total = marcar_exportacoes_interrompidas(db)
+        if total:
+            logger.warning(f"{total} exportação(ões) interrompida(s) marcada(s) como erro")
+    except Exception as e:
+        logger.error(f"Erro ao verificar exportações interrompidas: {e}")
+    finally:
+        if db is not None:
+            db.disconnect()
+
 if __name__ == '__main__':
     # Criar tabelas iniciais
     criar_tabelas_iniciais()
+    verificar_exportacoes_interrompidas()
+    
+    # Tarefas periódicas (vendas vencidas, limpeza de logs, backup)
+    if Config.TAREFAS_CONFIG['habilitado']:
+        agendador.iniciar()
     
     # Configurar e iniciar aplicação
     debug_mode = Config.DEBUG
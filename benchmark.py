@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmarks do sistema de crediário (precisa do MySQL configurado em config.py)
+
+Uso:
+    python benchmark.py conexoes [--requests 50]
+    python benchmark.py itens [--repeticoes 5]
+    python benchmark.py filtro-datas [--linhas 1000000] [--manter-tabela]
+    python benchmark.py dashboard [--requisicoes 200]
+    python benchmark.py excel [--linhas 100000]
+"""
+
+import argparse
+import os
+import time
+
+from config import Config
+
+ROTAS_LEITURA = [
+    '/',
+    '/api/clientes',
+    '/api/vendas',
+    '/api/alertas',
+    '/api/configuracao',
+    '/api/graficos/30'
+]
+
+def _cliente_autenticado(app):
+    cliente = app.test_client()
+    with cliente.session_transaction() as sessao:
+        sessao['authenticated'] = True
+    return cliente
+
+def benchmark_conexoes(total_requests):
+    """Conexões abertas por request: sem pool x pool com conexão por request"""
+    import database
+    from app import app
+
+    print("=" * 60)
+    print("CONEXÕES POR REQUEST")
+    print("=" * 60)
+
+    cliente = _cliente_autenticado(app)
+
+    # Antes: uma conexão nova a cada Database()
+    Config.POOL_CONFIG['habilitado'] = False
+    Config.POOL_CONFIG['por_request'] = False
+    inicio_conexoes = database.Database.conexoes_diretas
+    inicio = time.perf_counter()
+    for i in range(total_requests):
+        cliente.get(ROTAS_LEITURA[i % len(ROTAS_LEITURA)])
+    tempo_antes = time.perf_counter() - inicio
+    conexoes_antes = database.Database.conexoes_diretas - inicio_conexoes
+
+    # Depois: pool + uma conexão emprestada por request
+    Config.POOL_CONFIG['habilitado'] = True
+    Config.POOL_CONFIG['por_request'] = True
+    pool = database.obter_pool()
+    inicio_criadas = pool.conexoes_criadas
+    inicio_emprestimos = pool.emprestimos
+    inicio = time.perf_counter()
+    for i in range(total_requests):
+        cliente.get(ROTAS_LEITURA[i % len(ROTAS_LEITURA)])
+    tempo_depois = time.perf_counter() - inicio
+    conexoes_depois = pool.conexoes_criadas - inicio_criadas
+    emprestimos_depois = pool.emprestimos - inicio_emprestimos
+
+    print(f"Requests: {total_requests} (rotas: {', '.join(ROTAS_LEITURA)})")
+    print(f"Antes  -> conexões abertas: {conexoes_antes} "
+          f"({conexoes_antes / total_requests:.2f}/request), tempo: {tempo_antes:.3f}s")
+    print(f"Depois -> conexões abertas: {conexoes_depois} "
+          f"({conexoes_depois / total_requests:.2f}/request), "
+          f"empréstimos do pool: {emprestimos_depois / total_requests:.2f}/request, "
+          f"tempo: {tempo_depois:.3f}s")
+
+def _criar_cliente_benchmark(db):
+    return db.inserir_cliente({
+        'nome': 'Cliente Benchmark',
+        'cpf': None,
+        'telefone': '0000000000',
+        'endereco': '',
+        'limite_credito': 0,
+        'observacoes': 'Criado por benchmark.py'
+    })
+
+def _remover_cliente_benchmark(db, cliente_id):
+    db.execute_query("DELETE FROM itens_venda WHERE venda_id IN (SELECT id FROM vendas WHERE cliente_id = %s)", (cliente_id,))
+    db.execute_query("DELETE FROM vendas WHERE cliente_id = %s", (cliente_id,))
+    db.execute_query("DELETE FROM clientes WHERE id = %s", (cliente_id,))
+
+def _inserir_venda_item_a_item(db, dados_venda, itens):
+    """Caminho antigo: um INSERT (e um commit) por item"""
+    query_venda = '''INSERT INTO vendas (cliente_id, valor_total, observacoes)
+                    VALUES (%(cliente_id)s, %(valor_total)s, %(observacoes)s)'''
+    venda_id = db.execute_query(query_venda, dados_venda)
+    query_item = '''INSERT INTO itens_venda (venda_id, descricao, quantidade, valor_unitario)
+                   VALUES (%s, %s, %s, %s)'''
+    for item in itens:
+        db.execute_query(query_item, (venda_id, item['descricao'], item['quantidade'], item['valor_unitario']))
+    return venda_id
+
+def benchmark_itens(repeticoes):
+    """Itens gravados por segundo em vendas de 1, 10, 100 e 1000 linhas"""
+    from database import Database
+
+    print("=" * 60)
+    print("INSERÇÃO DE ITENS DE VENDA")
+    print("=" * 60)
+
+    db = Database()
+    cliente_id = _criar_cliente_benchmark(db)
+
+    try:
+        print(f"{'linhas':>8} {'item a item (itens/s)':>24} {'em lote (itens/s)':>20}")
+        for linhas in (1, 10, 100, 1000):
+            itens = [{'descricao': f'Item {i}', 'quantidade': 1.5, 'valor_unitario': 10.0}
+                     for i in range(linhas)]
+            dados_venda = {
+                'cliente_id': cliente_id,
+                'valor_total': 15.0 * linhas,
+                'observacoes': 'benchmark'
+            }
+
+            resultados = []
+            for inserir in (_inserir_venda_item_a_item, Database.inserir_venda):
+                inicio = time.perf_counter()
+                for _ in range(repeticoes):
+                    inserir(db, dados_venda, itens)
+                tempo = time.perf_counter() - inicio
+                resultados.append(linhas * repeticoes / tempo)
+
+            print(f"{linhas:>8} {resultados[0]:>24.0f} {resultados[1]:>20.0f}")
+    finally:
+        _remover_cliente_benchmark(db, cliente_id)
+        db.disconnect()
+
+def _popular_tabela_sintetica(db, linhas, lote=10000):
+    """Tabela vendas_benchmark com datas aleatórias nos últimos 3 anos"""
+    import random
+    from datetime import datetime, timedelta
+
+    db.execute_query("DROP TABLE IF EXISTS vendas_benchmark")
+    db.execute_query('''
+        CREATE TABLE vendas_benchmark (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            cliente_id INT NOT NULL,
+            data_venda TIMESTAMP NOT NULL,
+            valor_total DECIMAL(10,2) NOT NULL,
+            status ENUM('aberta', 'paga', 'vencida', 'cancelada') DEFAULT 'aberta',
+            INDEX idx_data_venda (data_venda)
+        )
+    ''')
+
+    agora = datetime.now()
+    segundos_periodo = 3 * 365 * 24 * 3600
+    query = "INSERT INTO vendas_benchmark (cliente_id, data_venda, valor_total, status) VALUES (%s, %s, %s, %s)"
+    for inicio in range(0, linhas, lote):
+        with db.transaction():
+            db.execute_many(query, [
+                (random.randint(1, 5000),
+                 agora - timedelta(seconds=random.randint(0, segundos_periodo)),
+                 round(random.uniform(5, 500), 2),
+                 random.choice(('aberta', 'paga', 'paga', 'vencida')))
+                for _ in range(min(lote, linhas - inicio))
+            ])
+
+def benchmark_filtro_datas(linhas, manter_tabela, repeticoes=20):
+    """DATE(data_venda) x intervalo semiaberto em uma tabela sintética"""
+    from datetime import date, timedelta
+    from database import Database
+    from filtros import FiltroVendas
+
+    print("=" * 60)
+    print(f"FILTRO POR PERÍODO ({linhas} vendas sintéticas)")
+    print("=" * 60)
+
+    db = Database()
+    try:
+        print("Populando tabela vendas_benchmark...")
+        _popular_tabela_sintetica(db, linhas)
+        db.cursor.execute("ANALYZE TABLE vendas_benchmark")
+        db.cursor.fetchall()
+
+        data_fim = date.today() - timedelta(days=30)
+        data_inicio = data_fim - timedelta(days=30)
+
+        # Antes: função sobre a coluna
+        query_antes = '''SELECT COUNT(*) as total, SUM(v.valor_total) as valor
+                         FROM vendas_benchmark v
+                         WHERE DATE(v.data_venda) >= %s AND DATE(v.data_venda) <= %s'''
+        params_antes = (data_inicio, data_fim)
+
+        # Depois: intervalo semiaberto gerado por FiltroVendas
+        where, params_depois = FiltroVendas(data_inicio=data_inicio, data_fim=data_fim).where('v')
+        query_depois = f'''SELECT COUNT(*) as total, SUM(v.valor_total) as valor
+                          FROM vendas_benchmark v
+                          WHERE {where}'''
+
+        for descricao, query, params in (('DATE(data_venda)', query_antes, params_antes),
+                                         ('intervalo semiaberto', query_depois, params_depois)):
+            inicio = time.perf_counter()
+            for _ in range(repeticoes):
+                resultado = db.execute_query(query, params)
+            tempo_ms = (time.perf_counter() - inicio) / repeticoes * 1000
+            print(f"{descricao:>22}: {tempo_ms:8.2f} ms/consulta ({resultado[0]['total']} vendas)")
+    finally:
+        if not manter_tabela:
+            db.execute_query("DROP TABLE IF EXISTS vendas_benchmark")
+        db.disconnect()
+
+def _percentil(tempos, percentil):
+    ordenados = sorted(tempos)
+    indice = min(len(ordenados) - 1, int(round(percentil / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+def benchmark_dashboard(requisicoes):
+    """Dados do dashboard: seções em série (rota antiga) x serviço consolidado"""
+    from app import app
+    from business import ClienteBusiness, VendaBusiness, RelatoriosBusiness, DashboardBusiness
+
+    print("=" * 60)
+    print(f"DASHBOARD ({requisicoes} requisições, base atual)")
+    print("=" * 60)
+
+    def em_serie():
+        VendaBusiness.get_estatisticas_dashboard()
+        ClienteBusiness.get_alertas_inadimplencia()
+        RelatoriosBusiness.get_dados_graficos(30)
+
+    def consolidado():
+        DashboardBusiness.get_dados_dashboard(30)
+
+    for descricao, funcao in (('seções em série', em_serie), ('consolidado', consolidado)):
+        tempos = []
+        for _ in range(requisicoes):
+            with app.app_context():
+                inicio = time.perf_counter()
+                funcao()
+                tempos.append((time.perf_counter() - inicio) * 1000)
+
+        print(f"{descricao:>16}: p50 {_percentil(tempos, 50):7.2f} ms | "
+              f"p95 {_percentil(tempos, 95):7.2f} ms | máx {max(tempos):7.2f} ms")
+
+def _linhas_relatorio_sinteticas(linhas):
+    """Linhas no formato do relatório de vendas (sem banco)"""
+    import random
+    from datetime import datetime, timedelta
+    from decimal import Decimal
+
+    agora = datetime.now()
+    for i in range(linhas):
+        valor_total = Decimal(random.randint(500, 50000)) / 100
+        valor_pago = valor_total if i % 3 else Decimal(0)
+        yield {
+            'ID': i + 1,
+            'Data': agora - timedelta(minutes=i),
+            'Cliente': f'Cliente {random.randint(1, 5000)}',
+            'Telefone': '(11) 90000-0000',
+            'Valor Total': valor_total,
+            'Valor Pago': valor_pago,
+            'Valor Restante': valor_total - valor_pago,
+            'Status': 'Paga' if i % 3 else 'Aberta',
+            'Observações': ''
+        }
+
+def _exportar_excel_celula_a_celula(dados, caminho):
+    """Caminho antigo: Workbook normal célula a célula e larguras relendo todas as colunas"""
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, Alignment, PatternFill
+
+    colunas = list(dados[0].keys())
+    wb = Workbook()
+    ws = wb.active
+    ws.title = 'Vendas'
+
+    for col_num, coluna in enumerate(colunas, 1):
+        cell = ws.cell(row=1, column=col_num, value=coluna)
+        cell.font = Font(bold=True, color="FFFFFF")
+        cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+        cell.alignment = Alignment(horizontal="center", vertical="center")
+
+    for row_num, linha in enumerate(dados, 2):
+        for col_num, coluna in enumerate(colunas, 1):
+            valor = linha.get(coluna, '')
+            if isinstance(valor, (int, float)) and 'valor' in coluna.lower():
+                valor = float(valor)
+            ws.cell(row=row_num, column=col_num, value=valor)
+
+    for column in ws.columns:
+        max_length = max(len(str(cell.value)) for cell in column)
+        ws.column_dimensions[column[0].column_letter].width = min(max_length + 2, 50)
+
+    wb.save(caminho)
+
+def _pico_memoria_mb():
+    """Pico de memória residente do processo (None onde não há o módulo resource)"""
+    import sys
+    try:
+        import resource
+    except ImportError:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB, macOS em bytes
+    return pico / (1024 * 1024) if sys.platform == 'darwin' else pico / 1024
+
+def _medir_exportacao_excel(variante, linhas, caminho, resultados):
+    """Executado em um processo separado, para o pico de memória ser só desta exportação"""
+    import utils
+
+    memoria_inicial = _pico_memoria_mb()
+    inicio = time.perf_counter()
+    if variante == 'antes':
+        # O relatório antigo montava a lista inteira (datas já em texto) antes de gerar o arquivo
+        dados = [dict(linha, Data=linha['Data'].strftime('%d/%m/%Y %H:%M'))
+                 for linha in _linhas_relatorio_sinteticas(linhas)]
+        _exportar_excel_celula_a_celula(dados, caminho)
+    else:
+        sucesso, erro = utils.exportar_para_excel(_linhas_relatorio_sinteticas(linhas),
+                                                  os.path.basename(caminho), 'Vendas')
+        if not sucesso:
+            raise RuntimeError(erro)
+    resultados.put((time.perf_counter() - inicio, memoria_inicial, _pico_memoria_mb()))
+
+def benchmark_excel(linhas):
+    """Exportação Excel: Workbook célula a célula x write-only em streaming"""
+    import multiprocessing
+
+    print("=" * 60)
+    print(f"EXPORTAÇÃO EXCEL ({linhas} linhas sintéticas)")
+    print("=" * 60)
+
+    contexto = multiprocessing.get_context('spawn')
+    for variante, descricao in (('antes', 'célula a célula'), ('depois', 'write-only')):
+        caminho = os.path.join('exports', f'benchmark_excel_{variante}.xlsx')
+        resultados = contexto.Queue()
+        processo = contexto.Process(target=_medir_exportacao_excel,
+                                    args=(variante, linhas, caminho, resultados))
+        processo.start()
+        tempo, memoria_inicial, memoria_pico = resultados.get()
+        processo.join()
+
+        tamanho_mb = os.path.getsize(caminho) / (1024 * 1024)
+        os.remove(caminho)
+
+        if memoria_pico is None:
+            memoria = 'pico de memória: n/d nesta plataforma'
+        else:
+            memoria = f"pico RSS: {memoria_pico:7.1f} MB (+{memoria_pico - memoria_inicial:.1f} MB)"
+        print(f"{descricao:>16}: {tempo:7.2f} s | {memoria} | arquivo: {tamanho_mb:.1f} MB")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks do sistema de crediário')
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    parser_conexoes = subparsers.add_parser('conexoes', help='Conexões abertas por request')
+    parser_conexoes.add_argument('--requests', type=int, default=50)
+
+    parser_itens = subparsers.add_parser('itens', help='Itens/segundo na gravação de vendas')
+    parser_itens.add_argument('--repeticoes', type=int, default=5)
+
+    parser_filtro = subparsers.add_parser('filtro-datas', help='Filtro por período com e sem DATE()')
+    parser_filtro.add_argument('--linhas', type=int, default=1000000)
+    parser_filtro.add_argument('--manter-tabela', action='store_true')
+
+    parser_dashboard = subparsers.add_parser('dashboard', help='Latência (p50/p95) dos dados do dashboard')
+    parser_dashboard.add_argument('--requisicoes', type=int, default=200)
+
+    parser_excel = subparsers.add_parser('excel', help='Tempo e pico de memória da exportação Excel')
+    parser_excel.add_argument('--linhas', type=int, default=100000)
+
+    args = parser.parse_args()
+
+    if args.comando == 'conexoes':
+        benchmark_conexoes(args.requests)
+    elif args.comando == 'itens':
+        benchmark_itens(args.repeticoes)
+    elif args.comando == 'filtro-datas':
+        benchmark_filtro_datas(args.linhas, args.manter_tabela)
+    elif args.comando == 'dashboard':
+        benchmark_dashboard(args.requisicoes)
+    elif args.comando == 'excel':
+        benchmark_excel(args.linhas)
+
+if __name__ == '__main__':
+    main()
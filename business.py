@@ -1,10 +1,17 @@
-from database import Database
-from utils import validar_cpf, formatar_moeda, calcular_troco
+from database import Database, obter_database
+from utils import validar_cpf, formatar_moeda, calcular_troco, gerar_csv, exportar_para_excel
+from filtros import cursor_clientes, cursor_vendas, cursor_logs
 from datetime import datetime, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
 import logging
 
 logger = logging.getLogger(__name__)
 
+COLUNAS_RELATORIO_VENDAS = ['ID', 'Data', 'Cliente', 'Telefone', 'Valor Total', 'Valor Pago',
+                            'Valor Restante', 'Status', 'Observações']
+
 class ClienteBusiness:
     @staticmethod
     def criar_cliente(dados):
@@ -35,7 +42,7 @@ class ClienteBusiness:
                 'observacoes': dados.get('observacoes', '').strip()
             }
             
-            db = Database()
+            db = obter_database()
             cliente_id = db.inserir_cliente(dados_cliente)
             
             # Log da operação
@@ -55,7 +62,7 @@ class ClienteBusiness:
     def atualizar_cliente(cliente_id, dados):
         """Atualizar dados do cliente"""
         try:
-            db = Database()
+            db = obter_database()
             
             # Verificar se cliente existe
             cliente_atual = db.buscar_cliente(cliente_id)
@@ -112,11 +119,16 @@ class ClienteBusiness:
             return {'sucesso': False, 'erro': 'Erro interno do sistema'}
     
     @staticmethod
-    def buscar_clientes(filtro=None, limite=50):
-        """Buscar clientes com filtro opcional"""
+    def buscar_clientes(filtro=None, limite=50, after=None):
+        """Buscar clientes com filtro opcional, paginados por cursor (nome, id)"""
         try:
-            db = Database()
-            clientes = db.buscar_clientes(filtro, limite)
+            db = obter_database()
+            # Um item a mais indica se existe próxima página
+            clientes = db.buscar_clientes(filtro, limite + 1, after)
+            next_cursor = None
+            if len(clientes) > limite:
+                clientes = clientes[:limite]
+                next_cursor = cursor_clientes(clientes[-1])
             
             # Formatar dados para exibição
             for cliente in clientes:
@@ -131,17 +143,37 @@ class ClienteBusiness:
                 else:
                     cliente['percentual_limite_usado'] = 0
             
-            return {'sucesso': True, 'clientes': clientes}
+            return {'sucesso': True, 'clientes': clientes, 'next_cursor': next_cursor}
             
         except Exception as e:
             logger.error(f"Erro ao buscar clientes: {e}")
             return {'sucesso': False, 'erro': 'Erro interno do sistema'}
     
+    @staticmethod
+    def sugerir_clientes(termo=None, limite=10, com_saldo=False, cliente_id=None):
+        """Sugestões leves para seletores de cliente (typeahead)"""
+        try:
+            db = obter_database()
+            clientes = db.buscar_sugestoes_clientes(termo, limite, com_saldo, cliente_id)
+            
+            for cliente in clientes:
+                cliente['limite_credito'] = float(cliente.get('limite_credito') or 0)
+                cliente['saldo_devedor'] = float(cliente.get('saldo_devedor') or 0)
+                cliente['cpf_formatado'] = ClienteBusiness.formatar_cpf(cliente.get('cpf'))
+                cliente['saldo_devedor_formatado'] = formatar_moeda(cliente['saldo_devedor'])
+                cliente['limite_credito_formatado'] = formatar_moeda(cliente['limite_credito'])
+            
+            return {'sucesso': True, 'clientes': clientes}
+            
+        except Exception as e:
+            logger.error(f"Erro ao buscar sugestões de clientes: {e}")
+            return {'sucesso': False, 'erro': 'Erro interno do sistema'}
+    
     @staticmethod
     def buscar_cliente(cliente_id):
         """Buscar cliente específico com histórico"""
         try:
-            db = Database()
+            db = obter_database()
             cliente = db.buscar_cliente(cliente_id)
             
             if not cliente:
@@ -182,7 +214,7 @@ class ClienteBusiness:
     def excluir_cliente(cliente_id):
         """Excluir (desativar) cliente"""
         try:
-            db = Database()
+            db = obter_database()
             sucesso, mensagem = db.excluir_cliente(cliente_id)
             
             if sucesso:
@@ -202,10 +234,10 @@ class ClienteBusiness:
         return f"{cpf[:3]}.{cpf[3:6]}.{cpf[6:9]}-{cpf[9:]}"
     
     @staticmethod
-    def get_alertas_inadimplencia():
+    def get_alertas_inadimplencia(db=None):
         """Buscar alertas de inadimplência"""
         try:
-            db = Database()
+            db = db or obter_database()
             vendas_vencidas = db.buscar_vendas_vencidas()
             clientes_limite = db.buscar_clientes_limite_credito()
             
@@ -288,33 +320,37 @@ class VendaBusiness:
                 return {'sucesso': False, 'erros': erros}
             
             # Verificar limite de crédito do cliente
-            db = Database()
+            db = obter_database()
             cliente = db.buscar_cliente(dados['cliente_id'])
             if not cliente:
                 return {'sucesso': False, 'erro': 'Cliente não encontrado'}
             
-            vendas_abertas = db.buscar_vendas_em_aberto_cliente(dados['cliente_id'])
-            valor_em_aberto = sum(v['valor_restante'] for v in vendas_abertas)
-            
-            if (valor_em_aberto + valor_total) > cliente['limite_credito']:
-                return {
-                    'sucesso': False, 
-                    'erro': f'Limite de crédito excedido. Disponível: {formatar_moeda(cliente["limite_credito"] - valor_em_aberto)}'
+            # Verificação de limite e gravação na mesma transação
+            with db.transaction():
+                # Saldo materializado, travado até o fim da transação
+                saldo = db.buscar_saldo_cliente(dados['cliente_id'], para_atualizacao=True)
+                valor_em_aberto = float(saldo['saldo_devedor'])
+                limite_credito = float(cliente['limite_credito'])
+                
+                if (valor_em_aberto + valor_total) > limite_credito:
+                    return {
+                        'sucesso': False, 
+                        'erro': f'Limite de crédito excedido. Disponível: {formatar_moeda(limite_credito - valor_em_aberto)}'
+                    }
+                
+                # Preparar dados da venda
+                dados_venda = {
+                    'cliente_id': dados['cliente_id'],
+                    'valor_total': valor_total,
+                    'observacoes': dados.get('observacoes', '').strip(),
+                    'venda_origem_ids': dados.get('venda_origem_ids', None)
                 }
-            
-            # Preparar dados da venda
-            dados_venda = {
-                'cliente_id': dados['cliente_id'],
-                'valor_total': valor_total,
-                'observacoes': dados.get('observacoes', '').strip(),
-                'venda_origem_ids': dados.get('venda_origem_ids', None)
-            }
-            
-            # Inserir venda
-            venda_id = db.inserir_venda(dados_venda, itens_validados)
-            
-            # Log da operação
-            db.inserir_log('VENDA_CRIADA', f'Venda ID: {venda_id}, Cliente: {cliente["nome"]}, Valor: {formatar_moeda(valor_total)}')
+                
+                # Inserir venda
+                venda_id = db.inserir_venda(dados_venda, itens_validados)
+                
+                # Log da operação
+                db.inserir_log('VENDA_CRIADA', f'Venda ID: {venda_id}, Cliente: {cliente["nome"]}, Valor: {formatar_moeda(valor_total)}')
             
             return {
                 'sucesso': True,
@@ -329,11 +365,15 @@ class VendaBusiness:
             return {'sucesso': False, 'erro': 'Erro interno do sistema'}
     
     @staticmethod
-    def buscar_vendas(filtros=None, limite=50):
-        """Buscar vendas com filtros"""
+    def buscar_vendas(filtros=None, limite=50, after=None):
+        """Buscar vendas com filtros, paginadas por cursor (data_venda, id)"""
         try:
-            db = Database()
-            vendas = db.buscar_vendas(filtros, limite)
+            db = obter_database()
+            vendas = db.buscar_vendas(filtros, limite + 1, after)
+            next_cursor = None
+            if len(vendas) > limite:
+                vendas = vendas[:limite]
+                next_cursor = cursor_vendas(vendas[-1])
             
             # Formatar dados para exibição
             for venda in vendas:
@@ -359,7 +399,7 @@ class VendaBusiness:
                     dias_aberto = (datetime.now() - venda['data_venda']).days
                     venda['dias_em_aberto'] = dias_aberto
             
-            return {'sucesso': True, 'vendas': vendas}
+            return {'sucesso': True, 'vendas': vendas, 'next_cursor': next_cursor}
             
         except Exception as e:
             logger.error(f"Erro ao buscar vendas: {e}")
@@ -369,7 +409,7 @@ class VendaBusiness:
     def buscar_venda(venda_id):
         """Buscar venda específica com detalhes"""
         try:
-            db = Database()
+            db = obter_database()
             venda = db.buscar_venda(venda_id)
             
             if not venda:
@@ -400,18 +440,10 @@ class VendaBusiness:
                 }
                 pagamento['forma_pagamento_texto'] = forma_map.get(pagamento['forma_pagamento'], pagamento['forma_pagamento'])
             
-            # Se é venda de saldo restante, buscar vendas origem
-            if venda.get('venda_origem_ids'):
-                vendas_origem_ids = venda['venda_origem_ids'].split(',')
-                vendas_origem = []
-                for origem_id in vendas_origem_ids:
-                    if origem_id.strip():
-                        venda_origem = db.buscar_venda(int(origem_id.strip()))
-                        if venda_origem:
-                            venda_origem['valor_total_formatado'] = formatar_moeda(venda_origem['valor_total'])
-                            venda_origem['data_venda_formatada'] = venda_origem['data_venda'].strftime('%d/%m/%Y')
-                            vendas_origem.append(venda_origem)
-                venda['vendas_origem'] = vendas_origem
+            # Vendas de origem (saldo restante): já vêm com a venda, só formatar
+            for venda_origem in venda['vendas_origem']:
+                venda_origem['valor_total_formatado'] = formatar_moeda(venda_origem['valor_total'])
+                venda_origem['data_venda_formatada'] = venda_origem['data_venda'].strftime('%d/%m/%Y')
             
             return {'sucesso': True, 'venda': venda}
             
@@ -420,10 +452,27 @@ class VendaBusiness:
             return {'sucesso': False, 'erro': 'Erro interno do sistema'}
     
     @staticmethod
-    def get_estatisticas_dashboard():
+    def buscar_linhagem_venda(venda_id):
+        """Cadeia completa de vendas que originaram uma venda de saldo restante"""
+        try:
+            db = obter_database()
+            linhagem = db.buscar_linhagem_venda(venda_id)
+            
+            for venda in linhagem:
+                venda['valor_total_formatado'] = formatar_moeda(venda['valor_total'])
+                venda['data_venda_formatada'] = venda['data_venda'].strftime('%d/%m/%Y')
+            
+            return {'sucesso': True, 'vendas': linhagem}
+            
+        except Exception as e:
+            logger.error(f"Erro ao buscar linhagem da venda: {e}")
+            return {'sucesso': False, 'erro': 'Erro interno do sistema'}
+    
+    @staticmethod
+    def get_estatisticas_dashboard(db=None):
         """Buscar estatísticas para o dashboard"""
         try:
-            db = Database()
+            db = db or obter_database()
             stats = db.get_estatisticas_dashboard()
             
             # Formatar valores
@@ -442,16 +491,6 @@ class PagamentoBusiness:
     def processar_pagamento_simples(venda_id, valor_pago, forma_pagamento, observacoes=''):
         """Processar pagamento em uma única venda"""
         try:
-            db = Database()
-            
-            # Verificar se venda existe e está em aberto
-            venda = db.buscar_venda(venda_id)
-            if not venda:
-                return {'sucesso': False, 'erro': 'Venda não encontrada'}
-            
-            if venda['status'] not in ['aberta', 'vencida']:
-                return {'sucesso': False, 'erro': 'Venda não está em aberto'}
-            
             # Validações
             try:
                 valor_pago = float(valor_pago)
@@ -461,24 +500,40 @@ class PagamentoBusiness:
             if valor_pago <= 0:
                 return {'sucesso': False, 'erro': 'Valor deve ser maior que zero'}
             
-            if valor_pago > venda['valor_restante']:
-                return {'sucesso': False, 'erro': f'Valor maior que o restante da venda ({formatar_moeda(venda["valor_restante"])})'}
-            
             if forma_pagamento not in ['dinheiro', 'cartao', 'pix']:
                 return {'sucesso': False, 'erro': 'Forma de pagamento inválida'}
             
-            # Processar pagamento
-            dados_pagamento = {
-                'venda_id': venda_id,
-                'valor_pago': valor_pago,
-                'forma_pagamento': forma_pagamento,
-                'observacoes': observacoes.strip()
-            }
+            db = obter_database()
             
-            pagamento_id = db.inserir_pagamento(dados_pagamento)
+            with db.transaction():
+                # Travar a venda antes de ler o restante: dois terminais pagando
+                # a mesma venda são atendidos um depois do outro
+                venda_travada = db.travar_venda(venda_id)
+                if not venda_travada:
+                    return {'sucesso': False, 'erro': 'Venda não encontrada'}
+                
+                # Restante e status da leitura travada (sempre a versão mais recente)
+                venda = db.buscar_venda(venda_id)
+                venda.update(venda_travada)
+                
+                if venda['status'] not in ['aberta', 'vencida']:
+                    return {'sucesso': False, 'erro': 'Venda não está em aberto'}
+                
+                if valor_pago > venda['valor_restante']:
+                    return {'sucesso': False, 'erro': f'Valor maior que o restante da venda ({formatar_moeda(venda["valor_restante"])})'}
+                
+                # Processar pagamento
+                dados_pagamento = {
+                    'venda_id': venda_id,
+                    'valor_pago': valor_pago,
+                    'forma_pagamento': forma_pagamento,
+                    'observacoes': observacoes.strip()
+                }
+                
+                pagamento_id = db.inserir_pagamento(dados_pagamento)
             
-            # Buscar venda atualizada
-            venda_atualizada = db.buscar_venda(venda_id)
+            # Estado pós-pagamento calculado a partir da venda já lida, sem reler
+            venda_atualizada = PagamentoBusiness._venda_apos_pagamento(venda, pagamento_id, dados_pagamento)
             
             # Calcular troco se pagamento em dinheiro
             troco = 0
@@ -509,6 +564,30 @@ class PagamentoBusiness:
             logger.error(f"Erro ao processar pagamento: {e}")
             return {'sucesso': False, 'erro': 'Erro interno do sistema'}
     
+    @staticmethod
+    def _venda_apos_pagamento(venda, pagamento_id, dados_pagamento):
+        """Venda como ficou no banco depois de inserir_pagamento
+        
+        Mesmas regras do banco: valor pago em DECIMAL(10,2) somado ao já pago
+        e status 'paga' quando nada resta, 'aberta' caso contrário.
+        """
+        valor_pago = Decimal(str(dados_pagamento['valor_pago'])).quantize(Decimal('0.01'), ROUND_HALF_UP)
+        
+        venda_atualizada = dict(venda)
+        venda_atualizada['valor_pago'] = venda['valor_pago'] + valor_pago
+        venda_atualizada['valor_restante'] = venda['valor_total'] - venda_atualizada['valor_pago']
+        venda_atualizada['status'] = 'paga' if venda_atualizada['valor_restante'] <= 0 else 'aberta'
+        venda_atualizada['pagamentos'] = venda['pagamentos'] + [{
+            'id': pagamento_id,
+            'venda_id': venda['id'],
+            'valor_pago': valor_pago,
+            'forma_pagamento': dados_pagamento['forma_pagamento'],
+            'data_pagamento': datetime.now(),
+            'observacoes': dados_pagamento['observacoes'],
+            'comprovante_impresso': 0
+        }]
+        return venda_atualizada
+    
     @staticmethod
     def processar_pagamento_multiplo(cliente_id, vendas_ids, valor_pago, forma_pagamento):
         """Processar pagamento em múltiplas vendas"""
@@ -527,7 +606,7 @@ class PagamentoBusiness:
             if forma_pagamento not in ['dinheiro', 'cartao', 'pix']:
                 return {'sucesso': False, 'erro': 'Forma de pagamento inválida'}
             
-            db = Database()
+            db = obter_database()
             
             # Processar pagamento múltiplo
             resultado_pagamento = db.processar_pagamento_multiplo(cliente_id, vendas_ids, valor_pago, forma_pagamento)
@@ -562,7 +641,7 @@ class PagamentoBusiness:
     def buscar_vendas_em_aberto_cliente(cliente_id):
         """Buscar vendas em aberto de um cliente para pagamento múltiplo"""
         try:
-            db = Database()
+            db = obter_database()
             vendas = db.buscar_vendas_em_aberto_cliente(cliente_id)
             
             # Formatar dados
@@ -594,7 +673,7 @@ class PagamentoBusiness:
     def preparar_dados_impressao(venda, valor_pago, forma_pagamento, troco):
         """Preparar dados para impressão do comprovante"""
         try:
-            db = Database()
+            db = obter_database()
             configs = {
                 'nome_empresa': db.buscar_configuracao('nome_empresa', 'Açougue do João'),
                 'endereco_empresa': db.buscar_configuracao('endereco_empresa', ''),
@@ -624,7 +703,7 @@ class RelatoriosBusiness:
     def get_dados_graficos(periodo_dias=30):
         """Buscar dados para gráficos do dashboard"""
         try:
-            db = Database()
+            db = obter_database()
             dados = db.get_dados_graficos(periodo_dias)
             
             # Verificar se dados existe e tem as chaves necessárias
@@ -714,8 +793,8 @@ class RelatoriosBusiness:
     def gerar_relatorio_vendas(filtros):
         """Gerar relatório de vendas para exportação"""
         try:
-            db = Database()
-            vendas = db.buscar_vendas(filtros, limite=10000)  # Buscar todas
+            db = obter_database()
+            vendas = list(db.iterar_vendas(filtros))
             
             # Preparar dados para exportação
             dados_exportacao = []
@@ -749,7 +828,7 @@ class RelatoriosBusiness:
     def gerar_relatorio_inadimplentes():
         """Gerar relatório de clientes inadimplentes"""
         try:
-            db = Database()
+            db = obter_database()
             vendas_vencidas = db.buscar_vendas_vencidas()
             
             # Agrupar por cliente
@@ -815,10 +894,10 @@ class RelatoriosBusiness:
             logger.error(f"Erro ao gerar relatório de inadimplentes: {e}")
             return {'sucesso': False, 'erro': 'Erro interno do sistema'}
     @staticmethod
-    def get_dados_graficos(periodo_dias=30):
+    def get_dados_graficos(periodo_dias=30, db=None):
         """Buscar dados para gráficos do dashboard"""
         try:
-            db = Database()
+            db = db or obter_database()
             dados = db.get_dados_graficos(periodo_dias)
             
             # Formatar dados para Chart.js
@@ -857,23 +936,11 @@ class RelatoriosBusiness:
     def gerar_relatorio_vendas(filtros):
         """Gerar relatório de vendas para exportação"""
         try:
-            db = Database()
-            vendas = db.buscar_vendas(filtros, limite=10000)  # Buscar todas
+            db = obter_database()
+            vendas = list(db.iterar_vendas(filtros))
             
             # Preparar dados para exportação
-            dados_exportacao = []
-            for venda in vendas:
-                dados_exportacao.append({
-                    'ID': venda['id'],
-                    'Data': venda['data_venda'].strftime('%d/%m/%Y %H:%M'),
-                    'Cliente': venda['cliente_nome'],
-                    'Telefone': venda['cliente_telefone'],
-                    'Valor Total': venda['valor_total'],
-                    'Valor Pago': venda['valor_pago'],
-                    'Valor Restante': venda['valor_restante'],
-                    'Status': venda['status'].title(),
-                    'Observações': venda.get('observacoes', '')
-                })
+            dados_exportacao = [RelatoriosBusiness._linha_relatorio_venda(venda) for venda in vendas]
             
             return {
                 'sucesso': True,
@@ -889,10 +956,67 @@ class RelatoriosBusiness:
             return {'sucesso': False, 'erro': 'Erro interno do sistema'}
     
     @staticmethod
-    def gerar_relatorio_inadimplentes():
+    def _linha_relatorio_venda(venda):
+        return {
+            'ID': venda['id'],
+            'Data': venda['data_venda'],
+            'Cliente': venda['cliente_nome'],
+            'Telefone': venda['cliente_telefone'],
+            'Valor Total': venda['valor_total'],
+            'Valor Pago': venda['valor_pago'],
+            'Valor Restante': venda['valor_restante'],
+            'Status': venda['status'].title(),
+            'Observações': venda.get('observacoes', '')
+        }
+    
+    @staticmethod
+    def exportar_vendas_csv(filtros):
+        """CSV do relatório de vendas em blocos, para resposta em streaming
+        
+        Sem limite de linhas e sem arquivo temporário: as vendas vêm de um
+        cursor sem buffer em uma conexão própria. Retorna (blocos, fechar);
+        fechar devolve a conexão e deve ser chamado ao fim da resposta, mesmo
+        que o download seja interrompido.
+        """
+        db = Database()
+        try:
+            vendas = db.iterar_vendas_sem_buffer(filtros)
+        except Exception:
+            db.disconnect()
+            raise
+        
+        linhas = (RelatoriosBusiness._linha_relatorio_venda(venda) for venda in vendas)
+        blocos = gerar_csv(linhas, COLUNAS_RELATORIO_VENDAS)
+        
+        def fechar():
+            vendas.close()
+            db.disconnect()
+        
+        return blocos, fechar
+    
+    @staticmethod
+    def exportar_vendas_excel(filtros, nome_arquivo):
+        """Relatório de vendas em .xlsx (exports/) sem carregar as vendas em memória
+        
+        Linhas do cursor sem buffer (conexão própria) gravadas direto no
+        workbook write-only. Retorna (sucesso, caminho ou mensagem de erro).
+        """
+        db = Database()
+        try:
+            vendas = db.iterar_vendas_sem_buffer(filtros)
+            try:
+                linhas = (RelatoriosBusiness._linha_relatorio_venda(venda) for venda in vendas)
+                return exportar_para_excel(linhas, nome_arquivo, 'Vendas', COLUNAS_RELATORIO_VENDAS)
+            finally:
+                vendas.close()
+        finally:
+            db.disconnect()
+    
+    @staticmethod
+    def gerar_relatorio_inadimplentes(db=None):
         """Gerar relatório de clientes inadimplentes"""
         try:
-            db = Database()
+            db = db or obter_database()
             vendas_vencidas = db.buscar_vendas_vencidas()
             
             # Agrupar por cliente
@@ -945,4 +1069,72 @@ class RelatoriosBusiness:
             
         except Exception as e:
             logger.error(f"Erro ao gerar relatório de inadimplentes: {e}")
-            return {'sucesso': False, 'erro': 'Erro interno do sistema'}
\ No newline at end of file
+            return {'sucesso': False, 'erro': 'Erro interno do sistema'}
+
+class LogsBusiness:
+    @staticmethod
+    def buscar_logs(filtros=None, limite=100, after=None):
+        """Consultar logs_sistema na janela ainda no banco (mais recentes primeiro)"""
+        try:
+            db = obter_database()
+            logs = db.buscar_logs(filtros, limite + 1, after)
+            
+            next_cursor = None
+            if len(logs) > limite:
+                logs = logs[:limite]
+                next_cursor = cursor_logs(logs[-1])
+            
+            for log in logs:
+                log['timestamp_formatado'] = log['timestamp'].strftime('%d/%m/%Y %H:%M:%S')
+            
+            return {'sucesso': True, 'logs': logs, 'next_cursor': next_cursor}
+            
+        except Exception as e:
+            logger.error(f"Erro ao buscar logs: {e}")
+            return {'sucesso': False, 'erro': 'Erro interno do sistema'}
+
+# Seções do dashboard em paralelo; limitado para não esgotar o pool
+_executor_dashboard = ThreadPoolExecutor(
+    max_workers=max(3, Config.POOL_CONFIG['tamanho'] // 2),
+    thread_name_prefix='dashboard'
+)
+
+def _executar_com_conexao_propria(funcao, *args):
+    """Rodar funcao(*args, db=...) com uma conexão própria do pool"""
+    db = Database()
+    try:
+        return funcao(*args, db=db)
+    finally:
+        db.disconnect()
+
+class DashboardBusiness:
+    @staticmethod
+    def get_dados_dashboard(periodo_dias=30):
+        """Estatísticas, alertas e gráficos do dashboard em um único payload
+        
+        As três seções rodam ao mesmo tempo, cada uma na sua conexão; os
+        alertas são os de /api/alertas, com as vendas e clientes de cada um.
+        """
+        futuro_stats = _executor_dashboard.submit(
+            _executar_com_conexao_propria, VendaBusiness.get_estatisticas_dashboard
+        )
+        futuro_alertas = _executor_dashboard.submit(
+            _executar_com_conexao_propria, ClienteBusiness.get_alertas_inadimplencia
+        )
+        futuro_graficos = _executor_dashboard.submit(
+            _executar_com_conexao_propria, RelatoriosBusiness.get_dados_graficos, periodo_dias
+        )
+        
+        stats_result = futuro_stats.result()
+        alertas_result = futuro_alertas.result()
+        graficos_result = futuro_graficos.result()
+        
+        if not any(resultado.get('sucesso') for resultado in (stats_result, alertas_result, graficos_result)):
+            return {'sucesso': False, 'erro': 'Erro interno do sistema'}
+        
+        return {
+            'sucesso': True,
+            'estatisticas': stats_result.get('estatisticas'),
+            'alertas': alertas_result.get('alertas', []),
+            'graficos': graficos_result.get('graficos')
+        }
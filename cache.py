@@ -0,0 +1,249 @@
+"""
+Cache de respostas de leitura (dashboard, alertas, gráficos)
+
+Chave = rota + parâmetros; cada item expira após o TTL e todo o cache é
+invalidado quando uma venda, pagamento ou cliente é gravado.
+
+Backends:
+    memoria  LRU no próprio processo (padrão). Com vários workers, cada um
+             só enxerga as próprias invalidações; os demais dependem do TTL.
+    sqlite   arquivo local compartilhado pelos processos da máquina; uma
+             invalidação vale para todos os workers.
+
+Leituras de um único registro (venda, cliente) usam GET condicional:
+responder_com_etag compara o If-None-Match com uma versão barata do
+registro e devolve 304 sem montar o payload.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import logging
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+from functools import wraps
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class CacheMemoria:
+    """LRU em memória com expiração por item"""
+
+    def __init__(self, max_itens=256):
+        self.max_itens = max_itens
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                return None
+            expira_em, valor = item
+            if expira_em <= time.time():
+                del self._itens[chave]
+                return None
+            self._itens.move_to_end(chave)
+            return valor
+
+    def definir(self, chave, valor, ttl_segundos):
+        with self._lock:
+            self._itens[chave] = (time.time() + ttl_segundos, valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+    def tamanho(self):
+        with self._lock:
+            return len(self._itens)
+
+def _serializar(valor):
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    raise TypeError(f"Tipo não serializável no cache: {type(valor).__name__}")
+
+class CacheSQLite:
+    """Cache em arquivo SQLite compartilhado pelos processos da máquina
+
+    Valores são gravados como JSON (Decimal vira float e datas viram texto
+    ISO), então só guarde o que já está pronto para exibição.
+    """
+
+    def __init__(self, caminho):
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        self._conexao = sqlite3.connect(caminho, timeout=5, check_same_thread=False,
+                                        isolation_level=None)
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        self._conexao.execute('''
+            CREATE TABLE IF NOT EXISTS respostas (
+                chave TEXT PRIMARY KEY,
+                valor TEXT NOT NULL,
+                expira_em REAL NOT NULL
+            )
+        ''')
+
+    def obter(self, chave):
+        with self._lock:
+            linha = self._conexao.execute(
+                "SELECT valor FROM respostas WHERE chave = ? AND expira_em > ?",
+                (chave, time.time())
+            ).fetchone()
+        return json.loads(linha[0]) if linha else None
+
+    def definir(self, chave, valor, ttl_segundos):
+        agora = time.time()
+        with self._lock:
+            self._conexao.execute(
+                "INSERT OR REPLACE INTO respostas (chave, valor, expira_em) VALUES (?, ?, ?)",
+                (chave, json.dumps(valor, default=_serializar), agora + ttl_segundos)
+            )
+            self._conexao.execute("DELETE FROM respostas WHERE expira_em <= ?", (agora,))
+
+    def limpar(self):
+        with self._lock:
+            self._conexao.execute("DELETE FROM respostas")
+
+    def tamanho(self):
+        with self._lock:
+            return self._conexao.execute("SELECT COUNT(*) FROM respostas").fetchone()[0]
+
+class CacheRespostas:
+    """Cache de resultados de leitura com contadores de acerto/falta"""
+
+    def __init__(self, backend, ttl_segundos=60, habilitado=True):
+        self.backend = backend
+        self.ttl_segundos = ttl_segundos
+        self.habilitado = habilitado
+
+        self.acertos = 0
+        self.faltas = 0
+        self.invalidacoes = 0
+
+    def obter_ou_calcular(self, chave, funcao, ttl_segundos=None):
+        """Resultado em cache ou funcao(); só guarda resultados com sucesso"""
+        if not self.habilitado:
+            return funcao()
+
+        try:
+            valor = self.backend.obter(chave)
+        except Exception as e:
+            logger.error(f"Erro ao ler cache de respostas: {e}")
+            valor = None
+
+        if valor is not None:
+            self.acertos += 1
+            return valor
+
+        self.faltas += 1
+        valor = funcao()
+        if isinstance(valor, dict) and valor.get('sucesso'):
+            try:
+                self.backend.definir(chave, valor, ttl_segundos or self.ttl_segundos)
+            except Exception as e:
+                logger.error(f"Erro ao gravar cache de respostas: {e}")
+        return valor
+
+    def invalidar(self):
+        try:
+            self.backend.limpar()
+            self.invalidacoes += 1
+        except Exception as e:
+            logger.error(f"Erro ao invalidar cache de respostas: {e}")
+
+    def estatisticas(self):
+        total = self.acertos + self.faltas
+        return {
+            'habilitado': self.habilitado,
+            'backend': type(self.backend).__name__,
+            'itens': self.backend.tamanho(),
+            'ttl_segundos': self.ttl_segundos,
+            'acertos': self.acertos,
+            'faltas': self.faltas,
+            'invalidacoes': self.invalidacoes,
+            'taxa_acerto': round(self.acertos / total * 100, 1) if total else 0
+        }
+
+def criar_cache_respostas():
+    cache_config = Config.CACHE_CONFIG
+    if cache_config['respostas_backend'] == 'sqlite':
+        backend = CacheSQLite(cache_config['respostas_arquivo_sqlite'])
+    else:
+        backend = CacheMemoria(cache_config['respostas_max_itens'])
+
+    return CacheRespostas(
+        backend,
+        ttl_segundos=cache_config['respostas_ttl_segundos'],
+        habilitado=cache_config['respostas_habilitado']
+    )
+
+cache_respostas = criar_cache_respostas()
+
+def cache_resposta(ttl_segundos=None):
+    """Decorador de rotas GET que retornam o dicionário da resposta
+
+    O JSON já serializado fica em cache por rota + parâmetros, então um
+    acerto devolve exatamente os mesmos bytes em qualquer backend.
+    """
+    from flask import current_app, request, jsonify
+
+    def decorador(funcao):
+        @wraps(funcao)
+        def envoltorio(*args, **kwargs):
+            parametros = '&'.join(f"{k}={v}" for k, v in sorted(request.args.items(multi=True)))
+            chave = f"{request.path}?{parametros}"
+
+            def calcular():
+                resultado = funcao(*args, **kwargs)
+                return {
+                    'sucesso': resultado.get('sucesso'),
+                    'corpo': jsonify(resultado).get_data(as_text=True)
+                }
+
+            item = cache_respostas.obter_ou_calcular(chave, calcular, ttl_segundos)
+            return current_app.response_class(item['corpo'], mimetype='application/json')
+        return envoltorio
+    return decorador
+
+def responder_com_etag(versao, calcular):
+    """Resposta JSON com ETag derivado de versao (ou 304 se o cliente já a tem)
+
+    versao é uma tupla barata de ler (updated_at, contadores...) que muda
+    sempre que o payload de calcular() mudaria; None (registro inexistente)
+    desliga o ETag. A data do dia entra na versão porque alguns campos
+    (dias em aberto) dependem dela.
+    """
+    from flask import current_app, request, jsonify
+
+    if versao is None:
+        return jsonify(calcular())
+
+    etag = hashlib.sha1(repr((versao, date.today())).encode('utf-8')).hexdigest()[:24]
+
+    if request.if_none_match.contains(etag):
+        resposta = current_app.response_class(status=304)
+    else:
+        resultado = calcular()
+        resposta = jsonify(resultado)
+        if not resultado.get('sucesso'):
+            return resposta
+
+    resposta.set_etag(etag)
+    # Pode guardar, mas sempre revalida (a sessão decide quem enxerga o quê)
+    resposta.headers['Cache-Control'] = 'private, no-cache'
+    return resposta
@@ -0,0 +1,95 @@
+import threading
+import time
+import logging
+
+from mysql.connector import Error
+
+logger = logging.getLogger(__name__)
+
+class CacheConfiguracoes:
+    """Cópia em memória da tabela configuracoes, compartilhada pelo processo
+
+    A tabela inteira é carregada em uma consulta e as leituras saem da
+    memória. Passados ttl_segundos, a cópia é revalidada lendo o contador
+    de configuracoes_versao (uma linha pela chave primária): a tabela só
+    é relida se algum worker alterou configurações nesse intervalo.
+    """
+
+    def __init__(self, ttl_segundos=10):
+        self.ttl_segundos = ttl_segundos
+
+        self._valores = None
+        self._versao = None
+        self._validado_em = 0.0
+        self._geracao = 0
+        self._lock = threading.Lock()
+
+        # Contadores para diagnóstico
+        self.acertos = 0
+        self.faltas = 0
+        self.revalidacoes = 0
+
+    def _ler_versao(self, db):
+        try:
+            result = db.execute_query("SELECT versao FROM configuracoes_versao WHERE id = 1")
+        except Error as e:
+            # Sem a tabela de versão (migração pendente) a cópia vale só pelo TTL
+            logger.warning(f"Versão das configurações indisponível: {e}")
+            return None
+        return result[0]['versao'] if result else None
+
+    def _garantir_carregado(self, db):
+        with self._lock:
+            if self._valores is not None and time.monotonic() - self._validado_em < self.ttl_segundos:
+                self.acertos += 1
+                return self._valores
+            geracao = self._geracao
+
+        # Versão lida antes da tabela: uma alteração no meio do caminho
+        # deixa a cópia com versão antiga e força nova leitura depois
+        versao = self._ler_versao(db)
+
+        with self._lock:
+            if self._valores is not None and versao is not None and versao == self._versao:
+                self.acertos += 1
+                self.revalidacoes += 1
+                self._validado_em = time.monotonic()
+                return self._valores
+
+        linhas = db.execute_query("SELECT chave, valor FROM configuracoes")
+        valores = {linha['chave']: linha['valor'] for linha in linhas}
+
+        with self._lock:
+            self.faltas += 1
+            # Invalidada durante a leitura: usa o resultado, mas não guarda
+            if geracao == self._geracao:
+                self._valores = valores
+                self._versao = versao
+                self._validado_em = time.monotonic()
+        return valores
+
+    def obter(self, db, chave, valor_default=None):
+        return self._garantir_carregado(db).get(chave, valor_default)
+
+    def obter_todas(self, db):
+        return dict(self._garantir_carregado(db))
+
+    def invalidar(self):
+        with self._lock:
+            self._valores = None
+            self._versao = None
+            self._geracao += 1
+
+    def estatisticas(self):
+        with self._lock:
+            total = self.acertos + self.faltas
+            return {
+                'carregado': self._valores is not None,
+                'chaves': len(self._valores) if self._valores is not None else 0,
+                'versao': self._versao,
+                'ttl_segundos': self.ttl_segundos,
+                'acertos': self.acertos,
+                'faltas': self.faltas,
+                'revalidacoes': self.revalidacoes,
+                'taxa_acerto': round(self.acertos / total * 100, 1) if total else 0
+            }
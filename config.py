@@ -16,6 +16,29 @@ class Config:
         'autocommit': True
     }
     
+    # Pool de conexões (habilitado=False volta a abrir uma conexão por Database();
+    # por_request=False faz cada Database() pegar sua própria conexão)
+    POOL_CONFIG = {
+        'habilitado': True,
+        'por_request': True,
+        'tamanho': 10,
+        'max_idade_segundos': 1800,
+        'verificar_apos_segundos': 30,
+        'timeout_espera': 10
+    }
+    
+    # Cópia em memória da tabela configuracoes (revalidada após o TTL) e
+    # cache de respostas do dashboard/alertas/gráficos ('memoria' ou 'sqlite')
+    CACHE_CONFIG = {
+        'configuracoes_habilitado': True,
+        'configuracoes_ttl_segundos': 10,
+        'respostas_habilitado': True,
+        'respostas_backend': 'memoria',
+        'respostas_ttl_segundos': 60,
+        'respostas_max_itens': 256,
+        'respostas_arquivo_sqlite': 'cache/respostas.sqlite3'
+    }
+    
     SISTEMA_CONFIGS = {
         'nome_empresa': 'Casa de Carnes São José',
         'endereco': 'Rua Governador Valadares, Centro',
@@ -34,6 +57,38 @@ class Config:
         'codepage': 'cp850'
     }
     
+    # Gravação assíncrona de logs_sistema: lote a cada N registros ou T ms;
+    # com o MySQL fora, os registros vão para arquivo_pendentes
+    FILA_LOGS_CONFIG = {
+        'habilitado': True,
+        'tamanho_maximo': 10000,
+        'lote': 200,
+        'intervalo_ms': 500,
+        'arquivo_pendentes': 'logs/logs_sistema_pendentes.jsonl'
+    }
+    
+    # Exportações de relatórios em segundo plano (POST /api/exports): threads
+    # que geram os arquivos e por quanto tempo arquivos/registros ficam em exports/
+    EXPORTACOES_CONFIG = {
+        'workers': 2,
+        'progresso_a_cada': 1000,
+        'retencao_horas': 24
+    }
+    
+    # Tarefas periódicas em segundo plano (intervalos em segundos)
+    TAREFAS_CONFIG = {
+        'habilitado': True,
+        'intervalo_varredura_vencidas': 300,
+        'horario_backup': '02:00',
+        'horario_limpeza_logs': '03:00',
+        'horario_recalculo_saldos': '04:00',
+        'horario_arquivo_vendas': '04:30',
+        'intervalo_limpeza_exportacoes': 3600,
+        'retencao_logs_dias': 365,
+        'retencao_chaves_idempotencia_horas': 48,
+        'arquivo_vendas_pagas_dias': 730
+    }
+    
     UPLOAD_FOLDER = 'uploads'
     BACKUP_FOLDER = 'backups'
     EXPORT_FOLDER = 'exports'
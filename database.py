@@ -1,46 +1,258 @@
 import mysql.connector
 from mysql.connector import Error
-from datetime import datetime, timedelta
+from datetime import datetime, date, timedelta
+from contextlib import contextmanager
+from decimal import Decimal, ROUND_HALF_UP
+import gzip
+import json
+import os
+import re
+from flask import g, has_app_context, has_request_context, request, session
+import threading
 import utils as ut
 from config import Config
+from pool import PoolConexoes
+from cache_configuracoes import CacheConfiguracoes
+from cache import cache_respostas
+from fila_logs import FilaLogs
+from migracoes import aplicar_migracoes
+from filtros import FiltroVendas, FiltroLogs
 import logging
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Chave primária duplicada
+ER_DUP_ENTRY = 1062
+
+# Status das vendas que entram no saldo devedor
+STATUS_EM_ABERTO = ('aberta', 'vencida')
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _linhas_json(texto, campos_data=(), ordem=('id',)):
+    """Linhas agregadas com JSON_ARRAYAGG de volta ao formato do cursor
+
+    DECIMAL volta como Decimal e os campos de data como datetime. O MySQL
+    não garante a ordem dentro do JSON_ARRAYAGG, então a ordenação é feita aqui.
+    """
+    if not texto:
+        return []
+    linhas = json.loads(texto, parse_float=Decimal)
+    for linha in linhas:
+        for campo in campos_data:
+            if linha.get(campo):
+                linha[campo] = datetime.fromisoformat(linha[campo])
+    linhas.sort(key=lambda linha: tuple(linha[campo] for campo in ordem))
+    return linhas
+
+# Colunas de vendas/itens/pagamentos, iguais nas tabelas de arquivo (*_arquivo)
+COLUNAS_VENDAS = ('id', 'cliente_id', 'data_venda', 'valor_total', 'valor_pago', 'valor_restante',
+                  'status', 'observacoes', 'created_at', 'updated_at')
+COLUNAS_ITENS_VENDA = ('id', 'venda_id', 'descricao', 'quantidade', 'valor_unitario', 'subtotal')
+COLUNAS_PAGAMENTOS = ('id', 'venda_id', 'valor_pago', 'forma_pagamento', 'data_pagamento',
+                      'observacoes', 'comprovante_impresso')
+
+def _colunas(colunas, alias=None):
+    return ', '.join(f"{alias}.{coluna}" if alias else coluna for coluna in colunas)
+
+# Colunas somadas na linha do dia de vendas_diarias
+COLUNAS_RESUMO_DIARIO = ('quantidade_vendas', 'valor_vendas', 'quantidade_pagamentos', 'valor_pago',
+                         'quantidade_dinheiro', 'valor_dinheiro', 'quantidade_cartao', 'valor_cartao',
+                         'quantidade_pix', 'valor_pix')
+
+def _centavos(valor):
+    """Valor monetário como Decimal com 2 casas (como o MySQL grava em DECIMAL(10,2))"""
+    return Decimal(str(valor)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+# Partições mensais de logs_sistema: pAAAAMM guarda o mês AAAA-MM
+PADRAO_PARTICAO_LOGS = re.compile(r'^p(\d{4})(\d{2})$')
+
+def _proximo_mes(mes):
+    return date(mes.year + mes.month // 12, mes.month % 12 + 1, 1)
+
+def _particao_logs(mes):
+    """Definição da partição do mês (RANGE sobre UNIX_TIMESTAMP do timestamp)"""
+    return (f"PARTITION p{mes:%Y%m} VALUES LESS THAN "
+            f"(UNIX_TIMESTAMP('{_proximo_mes(mes):%Y-%m-%d} 00:00:00'))")
+
+def obter_pool():
+    """Pool de conexões compartilhado pelo processo (criado sob demanda)"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                pool_config = Config.POOL_CONFIG
+                _pool = PoolConexoes(
+                    Config.DATABASE_CONFIG,
+                    tamanho=pool_config['tamanho'],
+                    max_idade_segundos=pool_config['max_idade_segundos'],
+                    verificar_apos_segundos=pool_config['verificar_apos_segundos'],
+                    timeout_espera=pool_config['timeout_espera']
+                )
+    return _pool
+
+cache_configuracoes = CacheConfiguracoes(Config.CACHE_CONFIG['configuracoes_ttl_segundos'])
+
+fila_logs = FilaLogs(
+    lambda: Database(),
+    tamanho_maximo=Config.FILA_LOGS_CONFIG['tamanho_maximo'],
+    lote=Config.FILA_LOGS_CONFIG['lote'],
+    intervalo_ms=Config.FILA_LOGS_CONFIG['intervalo_ms'],
+    arquivo_pendentes=Config.FILA_LOGS_CONFIG['arquivo_pendentes']
+)
+
+def obter_database():
+    """Database do request atual; fora de um request retorna um novo Database"""
+    if not has_app_context() or not Config.POOL_CONFIG.get('por_request', True):
+        return Database()
+    
+    if 'db' not in g:
+        g.db = Database()
+    return g.db
+
+def liberar_database(exc=None):
+    """Devolver ao pool a conexão do request (usar em teardown_appcontext)"""
+    db = g.pop('db', None)
+    if db is not None:
+        db.disconnect()
+
 class Database:
+    # Total de conexões abertas diretamente (sem pool), para diagnóstico
+    conexoes_diretas = 0
+    
     def __init__(self):
         self.connection = None
         self.cursor = None
+        self._emprestada = None
+        self._nivel_transacao = 0
+        self._apos_commit = []
+        self._resumo_diario_pendente = {}
         self.connect()
     
     def connect(self):
         try:
-            self.connection = mysql.connector.connect(**Config.DATABASE_CONFIG)
+            if Config.POOL_CONFIG.get('habilitado', True):
+                self._emprestada = obter_pool().obter()
+                self.connection = self._emprestada.conexao
+            else:
+                self.connection = mysql.connector.connect(**Config.DATABASE_CONFIG)
+                Database.conexoes_diretas += 1
+                logger.info("Conexão com banco estabelecida")
             self.cursor = self.connection.cursor(dictionary=True)
-            logger.info("Conexão com banco estabelecida")
         except Error as e:
             logger.error(f"Erro ao conectar com o banco: {e}")
             raise
     
     def disconnect(self):
+        # Gerador de iterar_vendas_sem_buffer fechado sem ter começado
+        self._descartar_resultado_pendente()
         if self.cursor:
-            self.cursor.close()
-        if self.connection:
+            try:
+                self.cursor.close()
+            except Error:
+                pass
+            self.cursor = None
+        if self._emprestada:
+            obter_pool().devolver(self._emprestada)
+            self._emprestada = None
+        elif self.connection:
             self.connection.close()
+        self.connection = None
+    
+    @contextmanager
+    def transaction(self):
+        """Unidade de trabalho: todos os comandos do bloco em um único commit
+        
+        Em caso de exceção faz rollback de tudo. Blocos aninhados participam
+        da transação mais externa.
+        """
+        if self._nivel_transacao > 0:
+            self._nivel_transacao += 1
+            try:
+                yield self
+            finally:
+                self._nivel_transacao -= 1
+            return
+        
+        self.connection.start_transaction()
+        self._nivel_transacao = 1
+        try:
+            yield self
+            # Linha do dia em vendas_diarias por último: travada só até o commit
+            self._gravar_resumo_diario()
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            self._apos_commit = []
+            self._resumo_diario_pendente = {}
+            raise
+        finally:
+            self._nivel_transacao = 0
+        
+        self._executar_apos_commit()
+    
+    @property
+    def em_transacao(self):
+        return self._nivel_transacao > 0
+    
+    def ao_confirmar(self, callback):
+        """Executar callback depois do commit (na hora, se fora de transação)
+        
+        Em caso de rollback os callbacks pendentes são descartados.
+        """
+        if not self.em_transacao:
+            callback()
+        elif callback not in self._apos_commit:
+            self._apos_commit.append(callback)
+    
+    def _executar_apos_commit(self):
+        callbacks, self._apos_commit = self._apos_commit, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Erro em callback pós-commit: {e}")
+    
+    def _dados_alterados(self):
+        """Vendas, pagamentos ou clientes mudaram: descartar respostas em cache"""
+        self.ao_confirmar(cache_respostas.invalidar)
     
     def execute_query(self, query, params=None):
         try:
             self.cursor.execute(query, params or ())
-            if query.strip().upper().startswith('SELECT'):
+            # SELECT, WITH ... SELECT, SHOW: comandos que devolvem linhas
+            if self.cursor.with_rows:
                 return self.cursor.fetchall()
             else:
-                self.connection.commit()
+                # Dentro de transaction() o commit acontece no final do bloco
+                if not self.em_transacao:
+                    self.connection.commit()
                 return self.cursor.lastrowid or self.cursor.rowcount
         except Error as e:
             logger.error(f"Erro ao executar query: {e}")
-            self.connection.rollback()
+            if not self.em_transacao:
+                self.connection.rollback()
+            raise
+    
+    def execute_many(self, query, lista_params):
+        """Executar o mesmo comando para vários conjuntos de parâmetros
+        
+        Para INSERT ... VALUES o conector envia um único INSERT com várias linhas.
+        """
+        if not lista_params:
+            return 0
+        try:
+            self.cursor.executemany(query, lista_params)
+            if not self.em_transacao:
+                self.connection.commit()
+            return self.cursor.rowcount
+        except Error as e:
+            logger.error(f"Erro ao executar query em lote: {e}")
+            if not self.em_transacao:
+                self.connection.rollback()
             raise
     
     def create_tables(self):
@@ -70,7 +282,6 @@ class Database:
                     valor_restante DECIMAL(10,2) GENERATED ALWAYS AS (valor_total - valor_pago) STORED,
                     status ENUM('aberta', 'paga', 'vencida', 'cancelada') DEFAULT 'aberta',
                     observacoes TEXT,
-                    venda_origem_ids TEXT, -- Para rastrear vendas que geraram saldo restante
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
                     FOREIGN KEY (cliente_id) REFERENCES clientes(id)
@@ -116,6 +327,43 @@ class Database:
                     ip VARCHAR(45),
                     timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
+            ''',
+            'saldos_clientes': '''
+                CREATE TABLE IF NOT EXISTS saldos_clientes (
+                    cliente_id INT PRIMARY KEY,
+                    saldo_devedor DECIMAL(12,2) NOT NULL DEFAULT 0.00,
+                    vendas_abertas INT NOT NULL DEFAULT 0,
+                    venda_aberta_mais_antiga TIMESTAMP NULL,
+                    versao INT NOT NULL DEFAULT 0,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                    FOREIGN KEY (cliente_id) REFERENCES clientes(id)
+                )
+            ''',
+            'vendas_diarias': '''
+                CREATE TABLE IF NOT EXISTS vendas_diarias (
+                    data DATE PRIMARY KEY,
+                    quantidade_vendas INT NOT NULL DEFAULT 0,
+                    valor_vendas DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+                    quantidade_pagamentos INT NOT NULL DEFAULT 0,
+                    valor_pago DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+                    quantidade_dinheiro INT NOT NULL DEFAULT 0,
+                    valor_dinheiro DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+                    quantidade_cartao INT NOT NULL DEFAULT 0,
+                    valor_cartao DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+                    quantidade_pix INT NOT NULL DEFAULT 0,
+                    valor_pix DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+                )
+            ''',
+            'tarefas_execucoes': '''
+                CREATE TABLE IF NOT EXISTS tarefas_execucoes (
+                    nome VARCHAR(100) PRIMARY KEY,
+                    ultima_execucao TIMESTAMP NULL,
+                    duracao_ms INT,
+                    status VARCHAR(20),
+                    erro TEXT,
+                    total_execucoes INT DEFAULT 0
+                )
             '''
         }
         
@@ -125,6 +373,27 @@ class Database:
                 logger.info(f"Tabela {table_name} criada/verificada")
             except Error as e:
                 logger.error(f"Erro ao criar tabela {table_name}: {e}")
+        
+        # Índices e demais alterações versionadas do esquema
+        try:
+            for migracao in aplicar_migracoes(self):
+                logger.info(f"Migração {migracao['versao']:04d}_{migracao['nome']} aplicada")
+        except Error as e:
+            logger.error(f"Erro ao aplicar migrações: {e}")
+        
+        # Conferir os saldos materializados com as vendas
+        try:
+            self.recalcular_saldos_clientes()
+        except Error as e:
+            logger.error(f"Erro ao recalcular saldos dos clientes: {e}")
+        
+        # Preencher o resumo diário na primeira execução
+        try:
+            result = self.execute_query("SELECT COUNT(*) as total FROM vendas_diarias")
+            if result[0]['total'] == 0:
+                self.reconstruir_vendas_diarias()
+        except Error as e:
+            logger.error(f"Erro ao preencher vendas_diarias: {e}")
     
     def insert_initial_data(self):
         """Inserir dados iniciais do sistema"""
@@ -149,7 +418,18 @@ class Database:
     def inserir_cliente(self, dados):
         query = '''INSERT INTO clientes (nome, cpf, telefone, endereco, limite_credito, observacoes)
                    VALUES (%(nome)s, %(cpf)s, %(telefone)s, %(endereco)s, %(limite_credito)s, %(observacoes)s)'''
-        return self.execute_query(query, dados)
+        with self.transaction():
+            cliente_id = self.execute_query(query, dados)
+            # Linha de saldo desde o cadastro: a primeira venda já encontra o que travar
+            self.execute_query("INSERT INTO saldos_clientes (cliente_id) VALUES (%s)", (cliente_id,))
+            self.indexar_busca_clientes([{
+                'id': cliente_id,
+                'nome': dados.get('nome'),
+                'cpf': dados.get('cpf'),
+                'telefone': dados.get('telefone')
+            }])
+            self._dados_alterados()
+        return cliente_id
     
     def atualizar_cliente(self, cliente_id, dados):
         campos = []
@@ -164,41 +444,47 @@ class Database:
         
         valores.append(cliente_id)
         query = f"UPDATE clientes SET {', '.join(campos)} WHERE id = %s"
-        return self.execute_query(query, valores)
+        with self.transaction():
+            resultado = self.execute_query(query, valores)
+            if any(dados.get(campo) is not None for campo in ('nome', 'cpf', 'telefone')):
+                self.indexar_busca_cliente(cliente_id)
+            self._dados_alterados()
+        return resultado
     
     def buscar_cliente(self, cliente_id):
         query = "SELECT * FROM clientes WHERE id = %s AND ativo = TRUE"
         result = self.execute_query(query, (cliente_id,))
         return result[0] if result else None
     
-    def buscar_clientes(self, filtro=None, limite=50):
+    def buscar_clientes(self, filtro=None, limite=50, after=None):
+        """Buscar clientes ativos ordenados por (nome, id)
+        
+        after é a chave (nome, id) do último cliente da página anterior;
+        a próxima página continua dali pelo índice, sem OFFSET.
+        """
+        where_clauses = ["c.ativo = TRUE"]
+        params = []
+        
         if filtro:
-            query = '''SELECT c.*, 
-                             COALESCE(SUM(v.valor_restante), 0) as saldo_devedor,
-                             COUNT(v.id) as total_vendas
-                      FROM clientes c
-                      LEFT JOIN vendas v ON c.id = v.cliente_id AND v.status IN ('aberta', 'vencida')
-                      WHERE c.ativo = TRUE AND (
-                          c.nome LIKE %s OR 
-                          c.cpf LIKE %s OR 
-                          c.telefone LIKE %s
-                      )
-                      GROUP BY c.id
-                      ORDER BY c.nome
-                      LIMIT %s'''
-            filtro_like = f"%{filtro}%"
-            return self.execute_query(query, (filtro_like, filtro_like, filtro_like, limite))
-        else:
-            query = '''SELECT c.*, 
-                             COALESCE(SUM(v.valor_restante), 0) as saldo_devedor,
-                             COUNT(v.id) as total_vendas
-                      FROM clientes c
-                      LEFT JOIN vendas v ON c.id = v.cliente_id AND v.status IN ('aberta', 'vencida')
-                      WHERE c.ativo = TRUE
-                      GROUP BY c.id
-                      ORDER BY c.nome
-                      LIMIT %s'''
-            return self.execute_query(query, (limite,))
+            clausulas_busca, params_busca = self._clausulas_busca_clientes(filtro)
+            where_clauses.extend(clausulas_busca)
+            params.extend(params_busca)
+        
+        if after:
+            nome, cliente_id = after
+            where_clauses.append("(c.nome > %s OR (c.nome = %s AND c.id > %s))")
+            params.extend([nome, nome, cliente_id])
+        
+        params.append(limite)
+        query = f'''SELECT c.*, 
+                         COALESCE(s.saldo_devedor, 0) as saldo_devedor,
+                         COALESCE(s.vendas_abertas, 0) as total_vendas
+                  FROM clientes c
+                  LEFT JOIN saldos_clientes s ON s.cliente_id = c.id
+                  WHERE {' AND '.join(where_clauses)}
+                  ORDER BY c.nome, c.id
+                  LIMIT %s'''
+        return self.execute_query(query, params)
     
     def excluir_cliente(self, cliente_id):
         # Verificar se tem vendas em aberto
@@ -210,108 +496,700 @@ class Database:
         # Desativar cliente
         query = "UPDATE clientes SET ativo = FALSE WHERE id = %s"
         self.execute_query(query, (cliente_id,))
+        self._dados_alterados()
         return True, "Cliente excluído com sucesso"
     
+    # MÉTODOS PARA BUSCA DE CLIENTES (typeahead)
+    def indexar_busca_clientes(self, clientes):
+        """Regravar em clientes_busca os termos de [{'id', 'nome', 'cpf', 'telefone'}]"""
+        if not clientes:
+            return
+        
+        ids = [cliente['id'] for cliente in clientes]
+        linhas = [
+            (cliente['id'], termo[:64])
+            for cliente in clientes
+            for termo in ut.termos_busca_cliente(cliente['nome'], cliente.get('cpf'), cliente.get('telefone'))
+        ]
+        
+        with self.transaction():
+            placeholders = ', '.join(['%s'] * len(ids))
+            self.execute_query(f"DELETE FROM clientes_busca WHERE cliente_id IN ({placeholders})", ids)
+            if linhas:
+                self.execute_many(
+                    "INSERT IGNORE INTO clientes_busca (cliente_id, termo) VALUES (%s, %s)",
+                    linhas
+                )
+    
+    def indexar_busca_cliente(self, cliente_id):
+        query = "SELECT id, nome, cpf, telefone FROM clientes WHERE id = %s"
+        self.indexar_busca_clientes(self.execute_query(query, (cliente_id,)))
+    
+    def reindexar_busca_clientes(self, lote=1000):
+        """Reconstruir clientes_busca a partir de clientes, em lotes por id"""
+        total = 0
+        ultimo_id = 0
+        
+        while True:
+            clientes = self.execute_query(
+                "SELECT id, nome, cpf, telefone FROM clientes WHERE id > %s ORDER BY id LIMIT %s",
+                (ultimo_id, lote)
+            )
+            if not clientes:
+                break
+            
+            self.indexar_busca_clientes(clientes)
+            total += len(clientes)
+            ultimo_id = clientes[-1]['id']
+        
+        self.execute_query('''DELETE b FROM clientes_busca b
+                              LEFT JOIN clientes c ON c.id = b.cliente_id
+                              WHERE c.id IS NULL''')
+        return total
+    
+    def _clausulas_busca_clientes(self, termo, alias='c'):
+        """Condições para clientes cujos termos começam com cada palavra digitada
+        
+        Cada palavra é um intervalo (LIKE 'x%') na chave primária de
+        clientes_busca; sem curinga à esquerda, nada de varredura completa.
+        """
+        termos = ut.termos_consulta_busca(termo)[:5]
+        if not termos:
+            return ["1=0"], []
+        
+        clausulas = [
+            f"{alias}.id IN (SELECT cliente_id FROM clientes_busca WHERE termo LIKE %s)"
+            for _ in termos
+        ]
+        return clausulas, [f"{t[:64]}%" for t in termos]
+    
+    def buscar_sugestoes_clientes(self, termo=None, limite=10, com_saldo=False, cliente_id=None):
+        """Resumo (id, nome, contato, limite, saldo) dos clientes ativos que
+        casam com o termo, ou do cliente_id informado"""
+        where_clauses = ["c.ativo = TRUE"]
+        params = []
+        
+        if cliente_id is not None:
+            where_clauses.append("c.id = %s")
+            params.append(cliente_id)
+        else:
+            clausulas_busca, params_busca = self._clausulas_busca_clientes(termo)
+            where_clauses.extend(clausulas_busca)
+            params.extend(params_busca)
+        
+        if com_saldo:
+            where_clauses.append("s.saldo_devedor > 0")
+        
+        params.append(limite)
+        query = f'''SELECT c.id, c.nome, c.cpf, c.telefone, c.limite_credito,
+                          COALESCE(s.saldo_devedor, 0) as saldo_devedor
+                   FROM clientes c
+                   LEFT JOIN saldos_clientes s ON s.cliente_id = c.id
+                   WHERE {' AND '.join(where_clauses)}
+                   ORDER BY c.nome, c.id
+                   LIMIT %s'''
+        return self.execute_query(query, params)
+    
+    # MÉTODOS PARA SALDOS DOS CLIENTES
+    def buscar_saldo_cliente(self, cliente_id, para_atualizacao=False):
+        """Saldo em aberto do cliente a partir da tabela materializada
+        
+        Com para_atualizacao=True a linha fica travada até o fim da transação,
+        serializando vendas simultâneas do mesmo cliente. A linha é criada antes
+        se ainda não existir (cliente cadastrado antes de saldos_clientes): sem
+        ela o FOR UPDATE só travaria o intervalo do índice, e duas primeiras
+        vendas simultâneas passariam ambas pela verificação de limite.
+        """
+        query = '''SELECT saldo_devedor, vendas_abertas, venda_aberta_mais_antiga
+                   FROM saldos_clientes
+                   WHERE cliente_id = %s'''
+        if para_atualizacao:
+            self._travar_saldos([cliente_id])
+            query += " FOR UPDATE"
+        result = self.execute_query(query, (cliente_id,))
+        if result:
+            return result[0]
+        return {'saldo_devedor': 0, 'vendas_abertas': 0, 'venda_aberta_mais_antiga': None}
+    
+    def _travar_saldos(self, clientes_ids):
+        """Travar as linhas de saldos_clientes dos clientes (criando as que faltarem)
+        
+        Toda gravação que muda saldos trava primeiro estas linhas, em ordem de
+        cliente_id, e só depois toca em vendas: vendas e pagamentos simultâneos
+        do mesmo cliente pegam as travas na mesma ordem e não entram em deadlock.
+        """
+        clientes_ids = sorted(set(clientes_ids))
+        if not clientes_ids:
+            return
+        valores = ', '.join(['(%s)'] * len(clientes_ids))
+        self.execute_query(f'''INSERT INTO saldos_clientes (cliente_id) VALUES {valores}
+                               ON DUPLICATE KEY UPDATE cliente_id = cliente_id''', clientes_ids)
+    
+    def _situacao_vendas(self, vendas_ids, travar=False):
+        """{id: venda} com o que entra no saldo: cliente, restante, status e data"""
+        vendas_ids = list(set(vendas_ids))
+        if not vendas_ids:
+            return {}
+        placeholders = ', '.join(['%s'] * len(vendas_ids))
+        query = f'''SELECT id, cliente_id, valor_restante, status, data_venda
+                    FROM vendas
+                    WHERE id IN ({placeholders})'''
+        if travar:
+            query += " FOR UPDATE"
+        return {venda['id']: venda for venda in self.execute_query(query, vendas_ids)}
+    
+    def _travar_vendas(self, vendas_ids, clientes_ids=()):
+        """Travar as vendas para alteração, depois dos saldos dos seus clientes
+        
+        clientes_ids acrescenta saldos a travar junto (ex.: o cliente que
+        recebe a venda de saldo do pagamento múltiplo).
+        Retorna a situação das vendas antes da alteração (_situacao_vendas).
+        """
+        vendas_ids = list(set(vendas_ids))
+        if not vendas_ids:
+            return {}
+        placeholders = ', '.join(['%s'] * len(vendas_ids))
+        clientes = self.execute_query(
+            f"SELECT DISTINCT cliente_id FROM vendas WHERE id IN ({placeholders})", vendas_ids
+        )
+        self._travar_saldos([linha['cliente_id'] for linha in clientes] + list(clientes_ids))
+        return self._situacao_vendas(vendas_ids, travar=True)
+    
+    def _aplicar_variacao_saldos(self, antes, depois):
+        """Somar a saldos_clientes a diferença entre duas situações das vendas
+        
+        antes/depois vêm de _situacao_vendas (uma venda nova não está em antes).
+        Cada cliente recebe um UPDATE com variações do saldo e da contagem de
+        vendas abertas; a venda aberta mais antiga só é relida, pelo índice de
+        vendas (cliente_id, status, data_venda), quando uma venda sai do aberto.
+        As linhas já devem estar travadas (_travar_saldos).
+        """
+        variacoes = {}
+        for venda_id in set(antes) | set(depois):
+            venda_antes = antes.get(venda_id)
+            venda_depois = depois.get(venda_id)
+            cliente_id = (venda_depois or venda_antes)['cliente_id']
+            variacao = variacoes.setdefault(cliente_id, {'saldo': Decimal('0.00'), 'abertas': 0,
+                                                         'fechou': False, 'abriu_em': None})
+            
+            aberta_antes = venda_antes is not None and venda_antes['status'] in STATUS_EM_ABERTO
+            aberta_depois = venda_depois is not None and venda_depois['status'] in STATUS_EM_ABERTO
+            if aberta_antes:
+                variacao['saldo'] -= venda_antes['valor_restante']
+                variacao['abertas'] -= 1
+            if aberta_depois:
+                variacao['saldo'] += venda_depois['valor_restante']
+                variacao['abertas'] += 1
+            
+            if aberta_antes and not aberta_depois:
+                variacao['fechou'] = True
+            elif aberta_depois and not aberta_antes:
+                data_venda = venda_depois['data_venda']
+                variacao['abriu_em'] = min(variacao['abriu_em'] or data_venda, data_venda)
+        
+        alterou = False
+        for cliente_id in sorted(variacoes):
+            variacao = variacoes[cliente_id]
+            if variacao['fechou']:
+                mais_antiga = '''(SELECT MIN(data_venda) FROM vendas
+                                  WHERE cliente_id = %s AND status IN ('aberta', 'vencida'))'''
+                params_mais_antiga = [cliente_id]
+            elif variacao['abriu_em'] is not None:
+                mais_antiga = "LEAST(COALESCE(venda_aberta_mais_antiga, %s), %s)"
+                params_mais_antiga = [variacao['abriu_em'], variacao['abriu_em']]
+            elif variacao['saldo'] or variacao['abertas']:
+                mais_antiga = "venda_aberta_mais_antiga"
+                params_mais_antiga = []
+            else:
+                continue
+            
+            query = f'''UPDATE saldos_clientes
+                        SET saldo_devedor = saldo_devedor + %s,
+                            vendas_abertas = vendas_abertas + %s,
+                            venda_aberta_mais_antiga = {mais_antiga},
+                            versao = versao + 1
+                        WHERE cliente_id = %s'''
+            self.execute_query(query, [variacao['saldo'], variacao['abertas']] + params_mais_antiga + [cliente_id])
+            alterou = True
+        
+        if alterou:
+            self._dados_alterados()
+    
+    def recalcular_saldos_clientes(self):
+        """Reconstruir todos os saldos materializados (conferência periódica)
+        
+        Único recálculo completo: as gravações do dia a dia aplicam variações
+        com _aplicar_variacao_saldos.
+        """
+        query = '''INSERT INTO saldos_clientes (cliente_id, saldo_devedor, vendas_abertas, venda_aberta_mais_antiga)
+                   SELECT c.id,
+                          COALESCE(SUM(v.valor_restante), 0),
+                          COUNT(v.id),
+                          MIN(v.data_venda)
+                   FROM clientes c
+                   LEFT JOIN vendas v ON v.cliente_id = c.id AND v.status IN ('aberta', 'vencida')
+                   GROUP BY c.id
+                   ON DUPLICATE KEY UPDATE saldo_devedor = VALUES(saldo_devedor),
+                                           vendas_abertas = VALUES(vendas_abertas),
+                                           venda_aberta_mais_antiga = VALUES(venda_aberta_mais_antiga),
+                                           versao = versao + 1'''
+        resultado = self.execute_query(query)
+        self._dados_alterados()
+        return resultado
+    
+    # MÉTODOS PARA O RESUMO DIÁRIO (vendas_diarias)
+    def _acumular_vendas_diarias(self, valores_vendas):
+        """Somar vendas gravadas agora ao resumo do dia"""
+        if not valores_vendas:
+            return
+        self._acumular_resumo_diario({
+            'quantidade_vendas': len(valores_vendas),
+            'valor_vendas': sum(_centavos(valor) for valor in valores_vendas)
+        })
+    
+    def _acumular_pagamentos_diarios(self, pagamentos):
+        """Somar pagamentos gravados agora ao resumo do dia
+        
+        pagamentos: lista de (valor_pago, forma_pagamento)
+        """
+        if not pagamentos:
+            return
+        
+        deltas = {'quantidade_pagamentos': len(pagamentos), 'valor_pago': Decimal('0.00')}
+        for valor_pago, forma_pagamento in pagamentos:
+            valor = _centavos(valor_pago)
+            deltas['valor_pago'] += valor
+            deltas[f'quantidade_{forma_pagamento}'] = deltas.get(f'quantidade_{forma_pagamento}', 0) + 1
+            deltas[f'valor_{forma_pagamento}'] = deltas.get(f'valor_{forma_pagamento}', Decimal('0.00')) + valor
+        self._acumular_resumo_diario(deltas)
+    
+    def _acumular_resumo_diario(self, deltas):
+        """Juntar deltas da linha de hoje em vendas_diarias
+        
+        Dentro de transaction() os deltas só são gravados no commit, como
+        último comando (ver _gravar_resumo_diario): a linha do dia é a mais
+        disputada do sistema e fica travada só pelo tempo do commit.
+        """
+        pendente = self._resumo_diario_pendente
+        for coluna, valor in deltas.items():
+            pendente[coluna] = pendente.get(coluna, 0) + valor
+        
+        if not self.em_transacao:
+            self._gravar_resumo_diario()
+    
+    def _gravar_resumo_diario(self):
+        """Um único upsert na linha de hoje com tudo que foi acumulado"""
+        pendente, self._resumo_diario_pendente = self._resumo_diario_pendente, {}
+        if not pendente:
+            return
+        
+        colunas = [coluna for coluna in COLUNAS_RESUMO_DIARIO if coluna in pendente]
+        query = f'''INSERT INTO vendas_diarias (data, {', '.join(colunas)})
+                    VALUES (CURRENT_DATE(), {', '.join(['%s'] * len(colunas))})
+                    ON DUPLICATE KEY UPDATE {', '.join(f"{coluna} = {coluna} + VALUES({coluna})" for coluna in colunas)}'''
+        self.execute_query(query, [pendente[coluna] for coluna in colunas])
+    
+    def reconstruir_vendas_diarias(self, data_inicio=None):
+        """Recalcular o resumo diário a partir de vendas e pagamentos (backfill)"""
+        if data_inicio is None:
+            data_inicio = date(1970, 1, 1)
+        
+        with self.transaction():
+            self.execute_query("DELETE FROM vendas_diarias WHERE data >= %s", (data_inicio,))
+            
+            # Vendas e pagamentos arquivados continuam contando no resumo
+            query_vendas = '''INSERT INTO vendas_diarias (data, quantidade_vendas, valor_vendas)
+                              SELECT DATE(data_venda), COUNT(*), COALESCE(SUM(valor_total), 0)
+                              FROM (SELECT data_venda, valor_total FROM vendas WHERE data_venda >= %s
+                                    UNION ALL
+                                    SELECT data_venda, valor_total FROM vendas_arquivo WHERE data_venda >= %s) v
+                              GROUP BY DATE(data_venda)'''
+            self.execute_query(query_vendas, (data_inicio, data_inicio))
+            
+            query_pagamentos = '''INSERT INTO vendas_diarias (data, quantidade_pagamentos, valor_pago,
+                                                           quantidade_dinheiro, valor_dinheiro,
+                                                           quantidade_cartao, valor_cartao,
+                                                           quantidade_pix, valor_pix)
+                                  SELECT DATE(data_pagamento), COUNT(*), COALESCE(SUM(valor_pago), 0),
+                                         SUM(forma_pagamento = 'dinheiro'),
+                                         COALESCE(SUM(CASE WHEN forma_pagamento = 'dinheiro' THEN valor_pago END), 0),
+                                         SUM(forma_pagamento = 'cartao'),
+                                         COALESCE(SUM(CASE WHEN forma_pagamento = 'cartao' THEN valor_pago END), 0),
+                                         SUM(forma_pagamento = 'pix'),
+                                         COALESCE(SUM(CASE WHEN forma_pagamento = 'pix' THEN valor_pago END), 0)
+                                  FROM (SELECT data_pagamento, valor_pago, forma_pagamento
+                                        FROM pagamentos WHERE data_pagamento >= %s
+                                        UNION ALL
+                                        SELECT data_pagamento, valor_pago, forma_pagamento
+                                        FROM pagamentos_arquivo WHERE data_pagamento >= %s) p
+                                  GROUP BY DATE(data_pagamento)
+                                  ON DUPLICATE KEY UPDATE quantidade_pagamentos = VALUES(quantidade_pagamentos),
+                                                          valor_pago = VALUES(valor_pago),
+                                                          quantidade_dinheiro = VALUES(quantidade_dinheiro),
+                                                          valor_dinheiro = VALUES(valor_dinheiro),
+                                                          quantidade_cartao = VALUES(quantidade_cartao),
+                                                          valor_cartao = VALUES(valor_cartao),
+                                                          quantidade_pix = VALUES(quantidade_pix),
+                                                          valor_pix = VALUES(valor_pix)'''
+            self.execute_query(query_pagamentos, (data_inicio, data_inicio))
+    
     # MÉTODOS PARA VENDAS
     def inserir_venda(self, dados_venda, itens):
         try:
-            # Inserir venda
-            query_venda = '''INSERT INTO vendas (cliente_id, valor_total, observacoes, venda_origem_ids)
-                            VALUES (%(cliente_id)s, %(valor_total)s, %(observacoes)s, %(venda_origem_ids)s)'''
-            venda_id = self.execute_query(query_venda, dados_venda)
-            
-            # Inserir itens
-            query_item = '''INSERT INTO itens_venda (venda_id, descricao, quantidade, valor_unitario)
-                           VALUES (%s, %s, %s, %s)'''
-            for item in itens:
-                self.execute_query(query_item, (venda_id, item['descricao'], item['quantidade'], item['valor_unitario']))
+            with self.transaction():
+                # Saldo do cliente travado antes de gravar em vendas (ver _travar_saldos)
+                self._travar_saldos([dados_venda['cliente_id']])
+                
+                # Inserir venda
+                query_venda = '''INSERT INTO vendas (cliente_id, valor_total, observacoes)
+                                VALUES (%(cliente_id)s, %(valor_total)s, %(observacoes)s)'''
+                venda_id = self.execute_query(query_venda, dados_venda)
+                
+                # Inserir todos os itens em um único INSERT
+                self._inserir_itens_venda([(venda_id, item) for item in itens])
+                self._inserir_origens_venda([(venda_id, dados_venda)])
+                
+                self._aplicar_variacao_saldos({}, self._situacao_vendas([venda_id]))
+                self._acumular_vendas_diarias([dados_venda['valor_total']])
             
             return venda_id
         except Error as e:
             logger.error(f"Erro ao inserir venda: {e}")
             raise
     
+    def inserir_vendas_lote(self, vendas):
+        """Inserir várias vendas de uma vez (importação)
+        
+        vendas: lista de (dados_venda, itens). Tudo em uma transação, com os
+        itens de todas as vendas gravados em um único INSERT multi-linhas.
+        """
+        try:
+            with self.transaction():
+                self._travar_saldos([dados_venda['cliente_id'] for dados_venda, _ in vendas])
+                
+                query_venda = '''INSERT INTO vendas (cliente_id, valor_total, observacoes)
+                                VALUES (%(cliente_id)s, %(valor_total)s, %(observacoes)s)'''
+                vendas_ids = []
+                itens_com_venda = []
+                for dados_venda, itens in vendas:
+                    venda_id = self.execute_query(query_venda, dados_venda)
+                    vendas_ids.append(venda_id)
+                    itens_com_venda.extend((venda_id, item) for item in itens)
+                
+                self._inserir_itens_venda(itens_com_venda)
+                self._inserir_origens_venda(list(zip(vendas_ids, (dados_venda for dados_venda, _ in vendas))))
+                self._aplicar_variacao_saldos({}, self._situacao_vendas(vendas_ids))
+                self._acumular_vendas_diarias([dados_venda['valor_total'] for dados_venda, _ in vendas])
+            
+            return vendas_ids
+        except Error as e:
+            logger.error(f"Erro ao inserir vendas em lote: {e}")
+            raise
+    
+    def _inserir_itens_venda(self, itens_com_venda):
+        query_item = '''INSERT INTO itens_venda (venda_id, descricao, quantidade, valor_unitario)
+                       VALUES (%s, %s, %s, %s)'''
+        self.execute_many(query_item, [
+            (venda_id, item['descricao'], item['quantidade'], item['valor_unitario'])
+            for venda_id, item in itens_com_venda
+        ])
+    
+    def _inserir_origens_venda(self, vendas_com_dados):
+        """Gravar em venda_origens as vendas que geraram cada saldo restante"""
+        self.execute_many(
+            "INSERT IGNORE INTO venda_origens (venda_id, venda_origem_id) VALUES (%s, %s)",
+            [(venda_id, origem_id)
+             for venda_id, dados_venda in vendas_com_dados
+             for origem_id in ut.ids_vendas_origem(dados_venda.get('venda_origem_ids'))]
+        )
+    
     def buscar_venda(self, venda_id):
-        # Buscar dados da venda
-        query_venda = '''SELECT v.*, c.nome as cliente_nome, c.cpf as cliente_cpf
-                        FROM vendas v
-                        JOIN clientes c ON v.cliente_id = c.id
-                        WHERE v.id = %s'''
-        venda = self.execute_query(query_venda, (venda_id,))
+        """Venda com cliente, itens, pagamentos e vendas de origem em uma ida ao banco
+        
+        Itens, pagamentos e origens vêm agregados em JSON (JSON_ARRAYAGG, MySQL
+        5.7.22+) na mesma linha do cabeçalho, em vez de quatro consultas. Se a
+        venda não está entre as ativas, procura nas tabelas de arquivo.
+        """
+        return (self._buscar_venda_em(venda_id, 'vendas', 'itens_venda', 'pagamentos') or
+                self._buscar_venda_em(venda_id, 'vendas_arquivo', 'itens_venda_arquivo', 'pagamentos_arquivo'))
+    
+    def _buscar_venda_em(self, venda_id, tabela_vendas, tabela_itens, tabela_pagamentos):
+        # Origens podem estar ativas ou arquivadas: uma subconsulta para cada tabela
+        origens = '''(SELECT JSON_ARRAYAGG(JSON_OBJECT(
+                                  'id', vo.id, 'data_venda', vo.data_venda,
+                                  'valor_total', vo.valor_total, 'status', vo.status))
+                       FROM venda_origens o
+                       JOIN {tabela} vo ON vo.id = o.venda_origem_id
+                       WHERE o.venda_id = v.id)'''
+        query = f'''SELECT {_colunas(COLUNAS_VENDAS, 'v')}, c.nome as cliente_nome, c.cpf as cliente_cpf,
+                          (SELECT JSON_ARRAYAGG(JSON_OBJECT(
+                                      'id', i.id, 'venda_id', i.venda_id, 'descricao', i.descricao,
+                                      'quantidade', i.quantidade, 'valor_unitario', i.valor_unitario,
+                                      'subtotal', i.subtotal))
+                           FROM {tabela_itens} i WHERE i.venda_id = v.id) as itens_json,
+                          (SELECT JSON_ARRAYAGG(JSON_OBJECT(
+                                      'id', p.id, 'venda_id', p.venda_id, 'valor_pago', p.valor_pago,
+                                      'forma_pagamento', p.forma_pagamento, 'data_pagamento', p.data_pagamento,
+                                      'observacoes', p.observacoes, 'comprovante_impresso', p.comprovante_impresso))
+                           FROM {tabela_pagamentos} p WHERE p.venda_id = v.id) as pagamentos_json,
+                          {origens.format(tabela='vendas')} as origens_json,
+                          {origens.format(tabela='vendas_arquivo')} as origens_arquivo_json
+                   FROM {tabela_vendas} v
+                   JOIN clientes c ON v.cliente_id = c.id
+                   WHERE v.id = %s'''
+        venda = self.execute_query(query, (venda_id,))
         if not venda:
             return None
         
         venda = venda[0]
-        
-        # Buscar itens da venda
-        query_itens = "SELECT * FROM itens_venda WHERE venda_id = %s ORDER BY id"
-        itens = self.execute_query(query_itens, (venda_id,))
-        venda['itens'] = itens
-        
-        # Buscar pagamentos
-        query_pagamentos = "SELECT * FROM pagamentos WHERE venda_id = %s ORDER BY data_pagamento"
-        pagamentos = self.execute_query(query_pagamentos, (venda_id,))
-        venda['pagamentos'] = pagamentos
+        venda['itens'] = _linhas_json(venda.pop('itens_json'))
+        venda['pagamentos'] = _linhas_json(venda.pop('pagamentos_json'), ('data_pagamento',),
+                                           ordem=('data_pagamento', 'id'))
+        venda['vendas_origem'] = sorted(
+            _linhas_json(venda.pop('origens_json'), ('data_venda',)) +
+            _linhas_json(venda.pop('origens_arquivo_json'), ('data_venda',)),
+            key=lambda origem: origem['id']
+        )
         
         return venda
     
-    def buscar_vendas(self, filtros=None, limite=50):
-        where_clauses = ["1=1"]
-        params = []
+    def buscar_linhagem_venda(self, venda_id, profundidade_maxima=50):
+        """Todas as vendas anteriores na cadeia de saldos restantes
         
-        if filtros:
-            if filtros.get('cliente_id'):
-                where_clauses.append("v.cliente_id = %s")
-                params.append(filtros['cliente_id'])
-            
-            if filtros.get('status'):
-                where_clauses.append("v.status = %s")
-                params.append(filtros['status'])
-            
-            if filtros.get('data_inicio'):
-                where_clauses.append("DATE(v.data_venda) >= %s")
-                params.append(filtros['data_inicio'])
-            
-            if filtros.get('data_fim'):
-                where_clauses.append("DATE(v.data_venda) <= %s")
-                params.append(filtros['data_fim'])
+        Consulta recursiva (MySQL 8) percorrendo venda_origens pela chave
+        primária; profundidade 1 = origens diretas.
+        """
+        query = '''WITH RECURSIVE linhagem (venda_id, profundidade) AS (
+                       SELECT venda_origem_id, 1 FROM venda_origens WHERE venda_id = %s
+                       UNION ALL
+                       SELECT o.venda_origem_id, l.profundidade + 1
+                       FROM linhagem l
+                       JOIN venda_origens o ON o.venda_id = l.venda_id
+                       WHERE l.profundidade < %s
+                   )
+                   SELECT id, data_venda, valor_total, valor_pago, status,
+                          MIN(profundidade) as profundidade
+                   FROM (SELECT v.id, v.data_venda, v.valor_total, v.valor_pago, v.status, l.profundidade
+                         FROM linhagem l
+                         JOIN vendas v ON v.id = l.venda_id
+                         UNION ALL
+                         SELECT v.id, v.data_venda, v.valor_total, v.valor_pago, v.status, l.profundidade
+                         FROM linhagem l
+                         JOIN vendas_arquivo v ON v.id = l.venda_id) vendas_linhagem
+                   GROUP BY id, data_venda, valor_total, valor_pago, status
+                   ORDER BY profundidade, id'''
+        return self.execute_query(query, (venda_id, profundidade_maxima))
+    
+    def buscar_vendas(self, filtros=None, limite=50, after=None):
+        """Buscar vendas; filtros pode ser um dict ou um FiltroVendas
         
-        params.append(limite)
+        Ordenação estável por (data_venda, id) decrescentes; after é a chave
+        do último item da página anterior (ver filtros.ler_cursor_vendas).
+        """
+        filtro = FiltroVendas.de_dict(filtros)
+        where_clauses, params = filtro.clausulas('v')
         
-        query = f'''SELECT v.*, c.nome as cliente_nome, c.telefone as cliente_telefone
-                   FROM vendas v
-                   JOIN clientes c ON v.cliente_id = c.id
-                   WHERE {' AND '.join(where_clauses)}
-                   ORDER BY v.data_venda DESC
-                   LIMIT %s'''
+        if after:
+            data_venda, venda_id = after
+            where_clauses.append("(v.data_venda < %s OR (v.data_venda = %s AND v.id < %s))")
+            params.extend([data_venda, data_venda, venda_id])
         
+        query, params = self._sql_vendas(filtro, where_clauses, params, limite)
         return self.execute_query(query, params)
     
+    def _sql_vendas(self, filtro, where_clauses, params, limite=None):
+        """SELECT de vendas com o cliente, ordenado por (data_venda, id) decrescentes
+        
+        Une as vendas arquivadas quando o filtro alcança o arquivo; sem
+        limite, devolve todas as linhas do filtro.
+        """
+        consulta = '''SELECT {colunas}, c.nome as cliente_nome, c.telefone as cliente_telefone
+                      FROM {tabela} v
+                      JOIN clientes c ON v.cliente_id = c.id
+                      WHERE {where}'''
+        where = ' AND '.join(where_clauses or ['1=1'])
+        colunas = _colunas(COLUNAS_VENDAS, 'v')
+        
+        paginar = ' LIMIT %s' if limite else ''
+        params_consulta = list(params) + ([limite] if limite else [])
+        
+        if not self._filtro_alcanca_arquivo(filtro):
+            query = (consulta.format(colunas=colunas, tabela='vendas', where=where) +
+                     ' ORDER BY v.data_venda DESC, v.id DESC' + paginar)
+            return query, params_consulta
+        
+        # Paginando, cada tabela já devolve só a sua primeira página; a união é reordenada
+        ordem_interna = ' ORDER BY v.data_venda DESC, v.id DESC' + paginar if limite else ''
+        query = f'''SELECT * FROM (
+                       ({consulta.format(colunas=colunas, tabela='vendas', where=where)}{ordem_interna})
+                       UNION ALL
+                       ({consulta.format(colunas=colunas, tabela='vendas_arquivo', where=where)}{ordem_interna})
+                   ) vendas_e_arquivo
+                   ORDER BY data_venda DESC, id DESC{paginar}'''
+        return query, params_consulta + params_consulta + ([limite] if limite else [])
+    
+    def _filtro_alcanca_arquivo(self, filtro):
+        """O filtro pode incluir vendas arquivadas?
+        
+        O arquivo só tem vendas pagas anteriores ao corte do arquivamento
+        (hoje menos arquivo_vendas_pagas_dias). Todo processo calcula o corte
+        sem consultar o banco, e uma venda recém-arquivada por outro worker
+        continua aparecendo nas listagens. (Aumentar arquivo_vendas_pagas_dias
+        não traz de volta as vendas arquivadas com o prazo anterior.)
+        """
+        if filtro.status not in (None, 'paga'):
+            return False
+        
+        corte = datetime.now() - timedelta(days=int(Config.TAREFAS_CONFIG['arquivo_vendas_pagas_dias']))
+        return filtro.data_inicio is None or filtro.data_inicio <= corte.date()
+    
+    def iterar_vendas(self, filtros=None, lote=1000):
+        """Percorrer todas as vendas do filtro em páginas de 'lote' linhas"""
+        after = None
+        while True:
+            vendas = self.buscar_vendas(filtros, lote, after)
+            yield from vendas
+            if len(vendas) < lote:
+                break
+            after = (vendas[-1]['data_venda'], vendas[-1]['id'])
+    
+    def contar_vendas(self, filtros=None):
+        """Total de vendas do filtro (com as arquivadas, quando o filtro alcança)"""
+        filtro = FiltroVendas.de_dict(filtros)
+        where_clauses, params = filtro.clausulas('v')
+        query, params = self._sql_vendas(filtro, where_clauses, params)
+        return self.execute_query(f"SELECT COUNT(*) as total FROM ({query}) vendas_filtro", params)[0]['total']
+    
+    def iterar_vendas_sem_buffer(self, filtros=None, lote=1000):
+        """Todas as vendas do filtro em uma única consulta, lidas aos poucos do servidor
+        
+        A consulta é executada aqui (erros aparecem antes de qualquer linha) e
+        o gerador devolvido busca blocos de 'lote' linhas de um cursor sem
+        buffer, então a memória não cresce com o período. Enquanto o gerador
+        não terminar a conexão não aceita outras consultas: use um Database
+        só para ele.
+        """
+        filtro = FiltroVendas.de_dict(filtros)
+        where_clauses, params = filtro.clausulas('v')
+        query, params = self._sql_vendas(filtro, where_clauses, params)
+        
+        cursor = self.connection.cursor(dictionary=True, buffered=False)
+        try:
+            cursor.execute(query, params)
+        except Error:
+            cursor.close()
+            raise
+        return self._ler_cursor_sem_buffer(cursor, lote)
+    
+    def _ler_cursor_sem_buffer(self, cursor, lote):
+        completo = False
+        try:
+            while True:
+                linhas = cursor.fetchmany(lote)
+                if not linhas:
+                    completo = True
+                    break
+                yield from linhas
+        finally:
+            if not completo:
+                self._descartar_resultado_pendente()
+            cursor.close()
+    
+    def _descartar_resultado_pendente(self):
+        """Ler e descartar linhas de um cursor sem buffer abandonado no meio"""
+        try:
+            if self.connection is not None and self.connection.unread_result:
+                self.connection.consume_results()
+        except Error as e:
+            logger.error(f"Erro ao descartar resultado pendente: {e}")
+    
+    # MÉTODOS PARA ARQUIVO DE VENDAS PAGAS
+    def arquivar_vendas_pagas(self, dias, lote=500):
+        """Mover vendas pagas há mais de N dias (com itens e pagamentos) para *_arquivo
+        
+        Em lotes, cada um em uma transação. Vendas pagas não mudam mais e não
+        entram em saldos; as leituras que podem precisar delas (buscar_venda,
+        buscar_vendas/iterar_vendas) consultam o arquivo só quando o filtro alcança.
+        """
+        data_limite = datetime.now() - timedelta(days=int(dias))
+        total = 0
+        
+        while True:
+            with self.transaction():
+                query_ids = '''SELECT id FROM vendas
+                              WHERE status = 'paga' AND data_venda < %s
+                              ORDER BY id
+                              LIMIT %s
+                              FOR UPDATE'''
+                ids = [linha['id'] for linha in self.execute_query(query_ids, (data_limite, lote))]
+                if not ids:
+                    break
+                
+                placeholders = ', '.join(['%s'] * len(ids))
+                for tabela, colunas, chave in (('vendas', COLUNAS_VENDAS, 'id'),
+                                               ('itens_venda', COLUNAS_ITENS_VENDA, 'venda_id'),
+                                               ('pagamentos', COLUNAS_PAGAMENTOS, 'venda_id')):
+                    self.execute_query(f'''INSERT INTO {tabela}_arquivo ({_colunas(colunas)})
+                                           SELECT {_colunas(colunas)} FROM {tabela}
+                                           WHERE {chave} IN ({placeholders})''', ids)
+                
+                # Filhos antes da venda (FK de pagamentos sem cascade)
+                self.execute_query(f"DELETE FROM pagamentos WHERE venda_id IN ({placeholders})", ids)
+                self.execute_query(f"DELETE FROM itens_venda WHERE venda_id IN ({placeholders})", ids)
+                self.execute_query(f"DELETE FROM vendas WHERE id IN ({placeholders})", ids)
+                self._dados_alterados()
+            
+            total += len(ids)
+            if len(ids) < lote:
+                break
+        
+        return total
+    
     def atualizar_status_venda(self, venda_id, novo_status):
-        query = "UPDATE vendas SET status = %s WHERE id = %s"
-        return self.execute_query(query, (novo_status, venda_id))
+        with self.transaction():
+            antes = self._travar_vendas([venda_id])
+            query = "UPDATE vendas SET status = %s WHERE id = %s"
+            resultado = self.execute_query(query, (novo_status, venda_id))
+            self._aplicar_variacao_saldos(antes, self._situacao_vendas([venda_id]))
+        return resultado
     
     # MÉTODOS PARA PAGAMENTOS
     def inserir_pagamento(self, dados_pagamento):
-        query = '''INSERT INTO pagamentos (venda_id, valor_pago, forma_pagamento, observacoes)
-                   VALUES (%(venda_id)s, %(valor_pago)s, %(forma_pagamento)s, %(observacoes)s)'''
-        pagamento_id = self.execute_query(query, dados_pagamento)
-        
-        # Atualizar valor pago na venda
-        query_update = '''UPDATE vendas 
-                         SET valor_pago = (
-                             SELECT COALESCE(SUM(valor_pago), 0) 
-                             FROM pagamentos 
-                             WHERE venda_id = %s
-                         )
-                         WHERE id = %s'''
-        self.execute_query(query_update, (dados_pagamento['venda_id'], dados_pagamento['venda_id']))
-        
-        # Atualizar status se necessário
-        self.atualizar_status_venda_apos_pagamento(dados_pagamento['venda_id'])
+        with self.transaction():
+            antes = self._travar_vendas([dados_pagamento['venda_id']])
+            
+            query = '''INSERT INTO pagamentos (venda_id, valor_pago, forma_pagamento, observacoes)
+                       VALUES (%(venda_id)s, %(valor_pago)s, %(forma_pagamento)s, %(observacoes)s)'''
+            pagamento_id = self.execute_query(query, dados_pagamento)
+            
+            # Atualizar valor pago na venda
+            query_update = '''UPDATE vendas 
+                             SET valor_pago = (
+                                 SELECT COALESCE(SUM(valor_pago), 0) 
+                                 FROM pagamentos 
+                                 WHERE venda_id = %s
+                             )
+                             WHERE id = %s'''
+            self.execute_query(query_update, (dados_pagamento['venda_id'], dados_pagamento['venda_id']))
+            
+            # Atualizar status se necessário
+            self.atualizar_status_venda_apos_pagamento(dados_pagamento['venda_id'])
+            
+            self._aplicar_variacao_saldos(antes, self._situacao_vendas([dados_pagamento['venda_id']]))
+            self._acumular_pagamentos_diarios([(dados_pagamento['valor_pago'], dados_pagamento['forma_pagamento'])])
         
         return pagamento_id
     
+    def travar_venda(self, venda_id):
+        """Travar a venda até o fim da transação (SELECT ... FOR UPDATE)
+        
+        Pagamentos simultâneos na mesma venda esperam aqui, e o segundo já
+        enxerga o valor restante atualizado pelo primeiro. O saldo do cliente
+        é travado antes da venda, na mesma ordem de criar_venda.
+        """
+        vendas = self._travar_vendas([venda_id])
+        return vendas.get(venda_id)
+    
     def atualizar_status_venda_apos_pagamento(self, venda_id):
         query = '''UPDATE vendas 
                    SET status = CASE 
@@ -328,168 +1206,275 @@ class Database:
         return self.execute_query(query, (cliente_id,))
     
     def processar_pagamento_multiplo(self, cliente_id, vendas_ids, valor_total_pago, forma_pagamento):
-        """Processa pagamento em múltiplas vendas e cria venda de saldo restante se necessário"""
-        vendas = []
-        valor_total_devido = 0
-        
-        # Buscar todas as vendas selecionadas
-        for venda_id in vendas_ids:
-            venda = self.buscar_venda(venda_id)
-            if venda and venda['status'] in ['aberta', 'vencida']:
-                vendas.append(venda)
-                valor_total_devido += float(venda['valor_restante'])
-        
-        if not vendas:
-            raise Exception("Nenhuma venda válida encontrada")
+        """Processa pagamento em múltiplas vendas e cria venda de saldo restante se necessário
         
-        valor_restante_pagamento = float(valor_total_pago)
-        pagamentos_realizados = []
+        Usa um número fixo de comandos, qualquer que seja a quantidade de vendas:
+        a trava dos saldos e das vendas, um INSERT multi-linhas de pagamentos
+        (e a leitura dos ids gerados), um UPDATE em lote de valor pago/status
+        e a variação dos saldos.
+        """
+        # Remover ids repetidos mantendo a ordem escolhida
+        vendas_ids = list(dict.fromkeys(int(venda_id) for venda_id in vendas_ids))
+        if not vendas_ids:
+            raise Exception("Nenhuma venda válida encontrada")
         
-        # Processar pagamentos
-        for venda in vendas:
-            valor_devido_venda = float(venda['valor_restante'])
+        with self.transaction():
+            # Travar os saldos (dos donos das vendas e do cliente) e depois as vendas
+            vendas_por_id = self._travar_vendas(vendas_ids, clientes_ids=[cliente_id])
             
-            if valor_restante_pagamento <= 0:
-                break
+            vendas = [vendas_por_id[venda_id] for venda_id in vendas_ids
+                      if venda_id in vendas_por_id and vendas_por_id[venda_id]['status'] in ['aberta', 'vencida']]
             
-            if valor_restante_pagamento >= valor_devido_venda:
-                # Pagar a venda completamente
-                valor_pago_venda = valor_devido_venda
-                valor_restante_pagamento -= valor_devido_venda
-            else:
-                # Pagamento parcial
-                valor_pago_venda = valor_restante_pagamento
-                valor_restante_pagamento = 0
+            if not vendas:
+                raise Exception("Nenhuma venda válida encontrada")
             
-            # Registrar pagamento
-            dados_pagamento = {
-                'venda_id': venda['id'],
-                'valor_pago': valor_pago_venda,
-                'forma_pagamento': forma_pagamento,
-                'observacoes': f'Pagamento múltiplo - Vendas: {", ".join([f"#{v}" for v in vendas_ids])}'
-            }
-            
-            pagamento_id = self.inserir_pagamento(dados_pagamento)
-            pagamentos_realizados.append(pagamento_id)
-        
-        # Se sobrou dinheiro, criar nova venda com saldo restante
-        venda_saldo_id = None
-        if valor_total_devido < valor_total_pago:
-            valor_saldo = valor_total_pago - valor_total_devido
+            # Valores em Decimal com centavos, como o banco grava: sem resíduo de
+            # float, uma venda não recebe pagamento de 0,00 nem fica aberta por 0,01
+            valor_total_devido = sum(_centavos(venda['valor_restante']) for venda in vendas)
+            valor_total_pago = _centavos(valor_total_pago)
             
-            # Criar descrição das vendas origem
-            vendas_origem_str = ', '.join([f"#{venda['id']}" for venda in vendas])
-            data_hoje = datetime.now().strftime('%d/%m/%Y')
+            # Distribuir o valor pago entre as vendas, na ordem selecionada
+            valor_restante_pagamento = valor_total_pago
+            observacoes = f'Pagamento múltiplo - Vendas: {", ".join([f"#{v}" for v in vendas_ids])}'
+            pagamentos = []
             
-            dados_venda_saldo = {
-                'cliente_id': cliente_id,
-                'valor_total': valor_saldo,
-                'observacoes': f'Saldo restante do pagamento do dia {data_hoje}',
-                'venda_origem_ids': ','.join([str(v['id']) for v in vendas])
-            }
+            for venda in vendas:
+                if valor_restante_pagamento <= 0:
+                    break
+                
+                # Venda inteira ou o que sobrou do pagamento (parcial)
+                valor_pago_venda = min(valor_restante_pagamento, _centavos(venda['valor_restante']))
+                valor_restante_pagamento -= valor_pago_venda
+                
+                pagamentos.append((venda['id'], valor_pago_venda, forma_pagamento, observacoes))
             
-            itens_saldo = [{
-                'descricao': f'Saldo restante das vendas',
-                'quantidade': 1,
-                'valor_unitario': valor_saldo
-            }]
+            pagamentos_realizados = []
+            if pagamentos:
+                # Registrar todos os pagamentos em um único INSERT
+                query_pagamentos = '''INSERT INTO pagamentos (venda_id, valor_pago, forma_pagamento, observacoes)
+                                      VALUES (%s, %s, %s, %s)'''
+                self.execute_many(query_pagamentos, pagamentos)
+                
+                # lastrowid é o id da primeira linha; os demais não são necessariamente
+                # consecutivos (auto_increment_increment, innodb_autoinc_lock_mode=2).
+                # As vendas estão travadas, então só este INSERT gravou pagamentos nelas
+                placeholders = ', '.join(['%s'] * len(pagamentos))
+                query_ids = f'''SELECT id FROM pagamentos
+                                WHERE venda_id IN ({placeholders}) AND id >= %s
+                                ORDER BY id'''
+                params_ids = [venda_id for venda_id, _, _, _ in pagamentos] + [self.cursor.lastrowid]
+                pagamentos_realizados = [linha['id'] for linha in self.execute_query(query_ids, params_ids)]
+                
+                # Atualizar valor pago e status de todas as vendas em um único UPDATE.
+                # O MySQL avalia as atribuições da esquerda para a direita, então o
+                # status já enxerga o valor_pago atualizado.
+                casos = ' '.join(['WHEN %s THEN %s'] * len(pagamentos))
+                query_update = f'''UPDATE vendas
+                                  SET valor_pago = valor_pago + CASE id {casos} ELSE 0 END,
+                                      status = CASE
+                                          WHEN valor_total - valor_pago <= 0 THEN 'paga'
+                                          ELSE 'aberta'
+                                      END
+                                  WHERE id IN ({placeholders})'''
+                params = [valor for venda_id, valor_pago, _, _ in pagamentos for valor in (venda_id, valor_pago)]
+                params.extend(venda_id for venda_id, _, _, _ in pagamentos)
+                self.execute_query(query_update, params)
+                
+                pagas_ids = [venda_id for venda_id, _, _, _ in pagamentos]
+                self._aplicar_variacao_saldos({venda_id: vendas_por_id[venda_id] for venda_id in pagas_ids},
+                                              self._situacao_vendas(pagas_ids))
+                self._acumular_pagamentos_diarios([(valor_pago, forma) for _, valor_pago, forma, _ in pagamentos])
             
-            venda_saldo_id = self.inserir_venda(dados_venda_saldo, itens_saldo)
+            # Se sobrou dinheiro, criar nova venda com saldo restante
+            venda_saldo_id = None
+            if valor_total_devido < valor_total_pago:
+                valor_saldo = valor_total_pago - valor_total_devido
+                data_hoje = datetime.now().strftime('%d/%m/%Y')
+                
+                dados_venda_saldo = {
+                    'cliente_id': cliente_id,
+                    'valor_total': valor_saldo,
+                    'observacoes': f'Saldo restante do pagamento do dia {data_hoje}',
+                    'venda_origem_ids': [v['id'] for v in vendas]
+                }
+                
+                itens_saldo = [{
+                    'descricao': f'Saldo restante das vendas',
+                    'quantidade': 1,
+                    'valor_unitario': valor_saldo
+                }]
+                
+                venda_saldo_id = self.inserir_venda(dados_venda_saldo, itens_saldo)
         
         return {
             'pagamentos_realizados': pagamentos_realizados,
             'venda_saldo_id': venda_saldo_id,
-            'valor_total_pago': valor_total_pago,
-            'valor_total_devido': valor_total_devido
+            'valor_total_pago': float(valor_total_pago),
+            'valor_total_devido': float(valor_total_devido)
         }
 
     
     # MÉTODOS PARA ALERTAS
     def buscar_vendas_vencidas(self):
+        """Vendas vencidas ou em aberto além do prazo (somente leitura)
+        
+        A troca de status para 'vencida' é feita por marcar_vendas_vencidas,
+        executada periodicamente em segundo plano.
+        """
         limite_dias = self.buscar_configuracao('limite_inadimplencia_dias', 30)
         data_limite = datetime.now() - timedelta(days=int(limite_dias))
         
         query = '''SELECT v.*, c.nome as cliente_nome, c.telefone as cliente_telefone
                    FROM vendas v
                    JOIN clientes c ON v.cliente_id = c.id
-                   WHERE v.status = 'aberta' AND v.data_venda < %s
+                   WHERE v.status = 'vencida' OR (v.status = 'aberta' AND v.data_venda < %s)
                    ORDER BY v.data_venda'''
         
-        vendas_vencidas = self.execute_query(query, (data_limite,))
+        return self.execute_query(query, (data_limite,))
+    
+    def marcar_vendas_vencidas(self):
+        """Marcar como vencidas, em um único UPDATE, as vendas em aberto além do prazo"""
+        limite_dias = self.buscar_configuracao('limite_inadimplencia_dias', 30)
+        data_limite = datetime.now() - timedelta(days=int(limite_dias))
         
-        # Atualizar status para vencida
-        for venda in vendas_vencidas:
-            vendas = ut.convert_decimals_to_float(vendas)
-            self.atualizar_status_venda(venda['id'], 'vencida')
+        with self.transaction():
+            # Status mudou sem mudar o saldo: a versão dos clientes afetados sobe à parte
+            self.execute_query('''UPDATE saldos_clientes s
+                                  JOIN (SELECT DISTINCT cliente_id FROM vendas
+                                        WHERE status = 'aberta' AND data_venda < %s) v
+                                    ON v.cliente_id = s.cliente_id
+                                  SET s.versao = s.versao + 1''', (data_limite,))
+            
+            query = "UPDATE vendas SET status = 'vencida' WHERE status = 'aberta' AND data_venda < %s"
+            total = self.execute_query(query, (data_limite,))
+            if total:
+                self._dados_alterados()
+        return total
+    
+    # VERSÕES PARA ETAG (consultas leves, sem montar o objeto completo)
+    def versao_venda(self, venda_id):
+        """Tudo o que muda o detalhe da venda: atualização, pagamentos e cliente
         
-        return vendas_vencidas
+        A impressão do comprovante só altera pagamentos.comprovante_impresso,
+        por isso entra a contagem de comprovantes impressos.
+        """
+        query = '''SELECT v.updated_at, v.valor_pago, v.status, c.updated_at as cliente_updated_at,
+                          (SELECT COUNT(*) FROM pagamentos p WHERE p.venda_id = v.id) as pagamentos,
+                          (SELECT COALESCE(SUM(p.comprovante_impresso), 0) FROM pagamentos p
+                           WHERE p.venda_id = v.id) as comprovantes_impressos
+                   FROM vendas v
+                   JOIN clientes c ON c.id = v.cliente_id
+                   WHERE v.id = %s'''
+        result = self.execute_query(query, (venda_id,))
+        return tuple(result[0].values()) if result else None
+    
+    def versao_cliente(self, cliente_id):
+        """Cadastro do cliente + versão dos seus dados de vendas (saldos_clientes)"""
+        query = '''SELECT c.updated_at, c.ativo, COALESCE(s.versao, 0) as versao
+                   FROM clientes c
+                   LEFT JOIN saldos_clientes s ON s.cliente_id = c.id
+                   WHERE c.id = %s'''
+        result = self.execute_query(query, (cliente_id,))
+        return tuple(result[0].values()) if result else None
     
     def buscar_clientes_limite_credito(self):
-        query = '''SELECT c.*, COALESCE(SUM(v.valor_restante), 0) as saldo_devedor
+        query = '''SELECT c.*, COALESCE(s.saldo_devedor, 0) as saldo_devedor
                    FROM clientes c
-                   LEFT JOIN vendas v ON c.id = v.cliente_id AND v.status IN ('aberta', 'vencida')
+                   LEFT JOIN saldos_clientes s ON s.cliente_id = c.id
                    WHERE c.ativo = TRUE
-                   GROUP BY c.id
-                   HAVING saldo_devedor >= (c.limite_credito * 0.8)
+                   AND COALESCE(s.saldo_devedor, 0) >= (c.limite_credito * 0.8)
                    ORDER BY saldo_devedor DESC'''
         return self.execute_query(query)
     
     # MÉTODOS PARA CONFIGURAÇÕES
+    def _usar_cache_configuracoes(self):
+        # Dentro de uma transação a leitura vai ao banco: pode haver
+        # alterações ainda não confirmadas desta mesma conexão
+        return Config.CACHE_CONFIG['configuracoes_habilitado'] and not self.em_transacao
+    
     def buscar_configuracao(self, chave, valor_default=None):
+        if self._usar_cache_configuracoes():
+            return cache_configuracoes.obter(self, chave, valor_default)
+        
         query = "SELECT valor FROM configuracoes WHERE chave = %s"
         result = self.execute_query(query, (chave,))
         return result[0]['valor'] if result else valor_default
     
+    def buscar_configuracoes(self):
+        """Todas as configurações como dicionário {chave: valor}"""
+        if self._usar_cache_configuracoes():
+            return cache_configuracoes.obter_todas(self)
+        
+        result = self.execute_query("SELECT chave, valor FROM configuracoes")
+        return {linha['chave']: linha['valor'] for linha in result}
+    
     def atualizar_configuracao(self, chave, valor):
+        return self.atualizar_configuracoes({chave: valor})
+    
+    def atualizar_configuracoes(self, valores):
+        """Gravar várias configurações de uma vez e avisar os outros workers"""
         query = '''INSERT INTO configuracoes (chave, valor) VALUES (%s, %s)
-                   ON DUPLICATE KEY UPDATE valor = %s'''
-        return self.execute_query(query, (chave, valor, valor))
+                   ON DUPLICATE KEY UPDATE valor = VALUES(valor)'''
+        try:
+            with self.transaction():
+                self.execute_many(query, list(valores.items()))
+                self.execute_query("UPDATE configuracoes_versao SET versao = versao + 1 WHERE id = 1")
+                self._dados_alterados()
+        finally:
+            cache_configuracoes.invalidar()
+        return len(valores)
     
     # MÉTODOS PARA ESTATÍSTICAS
     def get_estatisticas_dashboard(self):
-        stats = {}
-        
-        # Total de clientes ativos
-        query = "SELECT COUNT(*) as total FROM clientes WHERE ativo = TRUE"
-        result = self.execute_query(query)
-        stats['total_clientes'] = result[0]['total']
-        
-        # Vendas do mês atual
-        query = '''SELECT COUNT(*) as total, COALESCE(SUM(valor_total), 0) as valor_total
-                   FROM vendas 
-                   WHERE MONTH(data_venda) = MONTH(CURRENT_DATE()) 
-                   AND YEAR(data_venda) = YEAR(CURRENT_DATE())'''
-        result = self.execute_query(query)
-        stats['vendas_mes'] = result[0]
-        
-        # Vendas em aberto
-        query = '''SELECT COUNT(*) as total, COALESCE(SUM(valor_restante), 0) as valor_total
-                   FROM vendas WHERE status IN ('aberta', 'vencida')'''
-        result = self.execute_query(query)
-        stats['vendas_abertas'] = result[0]
-        
-        # Vendas vencidas
+        """Contadores do dashboard em uma única consulta
+        
+        Mês e vendas em aberto saem das tabelas de resumo (vendas_diarias e
+        saldos_clientes); vencidas e clientes perto do limite são agregações
+        condicionais em uma passada cada, tudo na mesma ida ao banco.
+        """
         limite_dias = self.buscar_configuracao('limite_inadimplencia_dias', 30)
         data_limite = datetime.now() - timedelta(days=int(limite_dias))
-        query = '''SELECT COUNT(*) as total, COALESCE(SUM(valor_restante), 0) as valor_total
-                   FROM vendas 
-                   WHERE status = 'vencida' OR (status = 'aberta' AND data_venda < %s)'''
-        result = self.execute_query(query, (data_limite,))
-        stats['vendas_vencidas'] = result[0]
         
-        return stats
+        query = '''SELECT cli.total_clientes, cli.clientes_limite_credito,
+                          mes.total as mes_total, mes.valor_total as mes_valor_total,
+                          aberto.total as abertas_total, aberto.valor_total as abertas_valor_total,
+                          venc.total as vencidas_total, venc.valor_total as vencidas_valor_total
+                   FROM (SELECT COUNT(*) as total_clientes,
+                                COALESCE(SUM(COALESCE(s.saldo_devedor, 0) >= c.limite_credito * 0.8), 0)
+                                    as clientes_limite_credito
+                         FROM clientes c
+                         LEFT JOIN saldos_clientes s ON s.cliente_id = c.id
+                         WHERE c.ativo = TRUE) cli
+                   CROSS JOIN (SELECT COALESCE(SUM(quantidade_vendas), 0) as total,
+                                      COALESCE(SUM(valor_vendas), 0) as valor_total
+                               FROM vendas_diarias
+                               WHERE data >= %s) mes
+                   CROSS JOIN (SELECT COALESCE(SUM(vendas_abertas), 0) as total,
+                                      COALESCE(SUM(saldo_devedor), 0) as valor_total
+                               FROM saldos_clientes) aberto
+                   CROSS JOIN (SELECT COUNT(*) as total, COALESCE(SUM(valor_restante), 0) as valor_total
+                               FROM vendas
+                               WHERE status = 'vencida' OR (status = 'aberta' AND data_venda < %s)) venc'''
+        linha = self.execute_query(query, (date.today().replace(day=1), data_limite))[0]
+        
+        return {
+            'total_clientes': linha['total_clientes'],
+            'clientes_limite_credito': int(linha['clientes_limite_credito']),
+            'vendas_mes': {'total': linha['mes_total'], 'valor_total': linha['mes_valor_total']},
+            'vendas_abertas': {'total': linha['abertas_total'], 'valor_total': linha['abertas_valor_total']},
+            'vendas_vencidas': {'total': linha['vencidas_total'], 'valor_total': linha['vencidas_valor_total']}
+        }
     
     def get_dados_graficos(self, periodo_dias=30):
-        """Buscar dados para gráficos com tratamento de erro melhorado"""
+        """Buscar dados para gráficos a partir do resumo diário (uma linha por dia)"""
         try:
-            data_inicio = datetime.now() - timedelta(days=periodo_dias)
+            data_inicio = date.today() - timedelta(days=periodo_dias)
             
             # Vendas por dia - com tratamento de erro
             try:
-                query_vendas = '''SELECT DATE(data_venda) as data, COUNT(*) as quantidade, COALESCE(SUM(valor_total), 0) as valor
-                            FROM vendas 
-                            WHERE data_venda >= %s
-                            GROUP BY DATE(data_venda)
+                query_vendas = '''SELECT data, quantidade_vendas as quantidade, valor_vendas as valor
+                            FROM vendas_diarias 
+                            WHERE data >= %s AND quantidade_vendas > 0
                             ORDER BY data'''
                 vendas_por_dia = self.execute_query(query_vendas, (data_inicio,))
                 
@@ -503,15 +1488,25 @@ class Database:
             
             # Formas de pagamento - com tratamento de erro
             try:
-                query_pagamentos = '''SELECT p.forma_pagamento, COUNT(*) as quantidade, COALESCE(SUM(p.valor_pago), 0) as valor
-                                FROM pagamentos p
-                                WHERE p.data_pagamento >= %s
-                                GROUP BY p.forma_pagamento'''
-                formas_pagamento = self.execute_query(query_pagamentos, (data_inicio,))
+                query_pagamentos = '''SELECT COALESCE(SUM(quantidade_dinheiro), 0) as quantidade_dinheiro,
+                                       COALESCE(SUM(valor_dinheiro), 0) as valor_dinheiro,
+                                       COALESCE(SUM(quantidade_cartao), 0) as quantidade_cartao,
+                                       COALESCE(SUM(valor_cartao), 0) as valor_cartao,
+                                       COALESCE(SUM(quantidade_pix), 0) as quantidade_pix,
+                                       COALESCE(SUM(valor_pix), 0) as valor_pix
+                                FROM vendas_diarias
+                                WHERE data >= %s'''
+                totais = self.execute_query(query_pagamentos, (data_inicio,))[0]
                 
-                # Garantir que temos uma lista
-                if not formas_pagamento:
-                    formas_pagamento = []
+                formas_pagamento = [
+                    {
+                        'forma_pagamento': forma,
+                        'quantidade': int(totais[f'quantidade_{forma}']),
+                        'valor': totais[f'valor_{forma}']
+                    }
+                    for forma in ('dinheiro', 'cartao', 'pix')
+                    if totais[f'quantidade_{forma}']
+                ]
                     
             except Exception as e:
                 logger.error(f"Erro ao buscar formas de pagamento: {e}")
@@ -530,10 +1525,317 @@ class Database:
                 'formas_pagamento': []
             }
     # MÉTODO PARA LOG
-    def inserir_log(self, acao, detalhes=None, usuario='sistema', ip=None):
-        query = '''INSERT INTO logs_sistema (acao, detalhes, usuario, ip)
-                   VALUES (%s, %s, %s, %s)'''
-        return self.execute_query(query, (acao, detalhes, usuario, ip))
+    def inserir_log(self, acao, detalhes=None, usuario=None, ip=None):
+        """Registrar em logs_sistema sem esperar o banco (fila_logs)
+        
+        Dentro de um request, usuário e IP vêm da sessão/requisição. Em uma
+        transação o registro só entra na fila depois do commit.
+        """
+        if has_request_context():
+            if usuario is None:
+                usuario = 'usuario' if session.get('authenticated') else 'sistema'
+            if ip is None:
+                ip = request.remote_addr
+        usuario = usuario or 'sistema'
+        
+        if not Config.FILA_LOGS_CONFIG['habilitado']:
+            return self.inserir_logs_lote([(acao, detalhes, usuario, ip, datetime.now())])
+        
+        self.ao_confirmar(lambda: fila_logs.registrar(acao, detalhes, usuario, ip))
+    
+    def inserir_logs_lote(self, registros):
+        """Gravar [(acao, detalhes, usuario, ip, timestamp)] em um INSERT multi-linhas"""
+        query = '''INSERT INTO logs_sistema (acao, detalhes, usuario, ip, timestamp)
+                   VALUES (%s, %s, %s, %s, %s)'''
+        return self.execute_many(query, registros)
+    
+    def buscar_logs(self, filtros=None, limite=100, after=None):
+        """Logs mais recentes primeiro; filtros é um FiltroLogs (acao, período)
+        
+        Usa idx_logs_acao_timestamp quando há ação e idx_logs_timestamp para
+        período; after é (timestamp, id) do último item da página anterior.
+        """
+        where_clauses, params = (filtros or FiltroLogs()).clausulas()
+        
+        if after:
+            momento, log_id = after
+            where_clauses.append("(timestamp < %s OR (timestamp = %s AND id < %s))")
+            params.extend([momento, momento, log_id])
+        
+        params.append(limite)
+        
+        query = f'''SELECT id, acao, detalhes, usuario, ip, timestamp
+                   FROM logs_sistema
+                   WHERE {' AND '.join(where_clauses or ['1=1'])}
+                   ORDER BY timestamp DESC, id DESC
+                   LIMIT %s'''
+        return self.execute_query(query, params)
+    
+    # MÉTODOS PARA RETENÇÃO DE LOGS (partições mensais)
+    def particoes_logs(self):
+        """Partições mensais de logs_sistema em ordem ([] se a tabela não é particionada)"""
+        query = '''SELECT PARTITION_NAME as nome, TABLE_ROWS as linhas
+                   FROM information_schema.PARTITIONS
+                   WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'logs_sistema'
+                     AND PARTITION_NAME IS NOT NULL
+                   ORDER BY PARTITION_ORDINAL_POSITION'''
+        particoes = []
+        for linha in self.execute_query(query):
+            match = PADRAO_PARTICAO_LOGS.match(linha['nome'])
+            if match:
+                linha['mes'] = date(int(match.group(1)), int(match.group(2)), 1)
+                particoes.append(linha)
+        return particoes
+    
+    def particionar_logs_sistema(self, meses_a_frente=2):
+        """Converter logs_sistema em tabela particionada por mês (migração)
+        
+        A chave primária passa a ser (id, timestamp), exigência do MySQL
+        para particionar pela data.
+        """
+        if self.particoes_logs():
+            return
+        
+        inicio = self.execute_query("SELECT MIN(timestamp) as inicio FROM logs_sistema")[0]['inicio']
+        mes = (inicio or datetime.now()).date().replace(day=1)
+        fim = datetime.now().date().replace(day=1)
+        for _ in range(meses_a_frente):
+            fim = _proximo_mes(fim)
+        
+        particoes = []
+        while mes <= fim:
+            particoes.append(_particao_logs(mes))
+            mes = _proximo_mes(mes)
+        particoes.append("PARTITION pfuturo VALUES LESS THAN MAXVALUE")
+        
+        self.execute_query("UPDATE logs_sistema SET timestamp = CURRENT_TIMESTAMP WHERE timestamp IS NULL")
+        self.execute_query('''ALTER TABLE logs_sistema
+                              MODIFY timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                              DROP PRIMARY KEY,
+                              ADD PRIMARY KEY (id, timestamp)''')
+        self.execute_query(f'''ALTER TABLE logs_sistema
+                               PARTITION BY RANGE (UNIX_TIMESTAMP(timestamp)) ({', '.join(particoes)})''')
+    
+    def garantir_particoes_logs(self, meses_a_frente=2):
+        """Criar as partições dos próximos meses, separando-as de pfuturo"""
+        particoes = self.particoes_logs()
+        if not particoes:
+            return []
+        
+        alvo = datetime.now().date().replace(day=1)
+        for _ in range(meses_a_frente):
+            alvo = _proximo_mes(alvo)
+        
+        novas = []
+        mes = _proximo_mes(particoes[-1]['mes'])
+        while mes <= alvo:
+            novas.append(mes)
+            mes = _proximo_mes(mes)
+        
+        if novas:
+            definicoes = ', '.join([_particao_logs(mes) for mes in novas] +
+                                   ["PARTITION pfuturo VALUES LESS THAN MAXVALUE"])
+            self.execute_query(f"ALTER TABLE logs_sistema REORGANIZE PARTITION pfuturo INTO ({definicoes})")
+        return [f"p{mes:%Y%m}" for mes in novas]
+    
+    def exportar_logs(self, caminho, particao=None, data_limite=None, lote=5000):
+        """Gravar logs em JSONL compactado (gzip), lendo em lotes por id
+        
+        O arquivo só aparece com o nome final depois de completo.
+        """
+        origem = f"logs_sistema PARTITION ({particao})" if particao else "logs_sistema"
+        condicao = "id > %s"
+        if data_limite:
+            condicao += " AND timestamp < %s"
+        query = f'''SELECT id, acao, detalhes, usuario, ip, timestamp
+                    FROM {origem}
+                    WHERE {condicao}
+                    ORDER BY id
+                    LIMIT %s'''
+        
+        temporario = caminho + '.tmp'
+        ultimo_id = 0
+        total = 0
+        with gzip.open(temporario, 'wt', encoding='utf-8') as arquivo:
+            while True:
+                params = [ultimo_id] + ([data_limite] if data_limite else []) + [lote]
+                linhas = self.execute_query(query, params)
+                for linha in linhas:
+                    linha['timestamp'] = linha['timestamp'].isoformat() if linha['timestamp'] else None
+                    arquivo.write(json.dumps(linha, ensure_ascii=False) + '\n')
+                total += len(linhas)
+                if len(linhas) < lote:
+                    break
+                ultimo_id = linhas[-1]['id']
+        
+        os.replace(temporario, caminho)
+        return total
+    
+    def arquivar_logs_antigos(self, dias, pasta):
+        """Exportar para pasta/ e remover os logs com mais de N dias
+        
+        Com partições, cada mês inteiro fora do prazo é exportado e removido
+        com DROP PARTITION (instantâneo). Sem partições (migração pendente),
+        exporta e apaga em lotes.
+        """
+        data_limite = datetime.now() - timedelta(days=int(dias))
+        os.makedirs(pasta, exist_ok=True)
+        
+        particoes = self.particoes_logs()
+        if not particoes:
+            caminho = os.path.join(pasta, f"logs_sistema_ate_{data_limite:%Y%m%d_%H%M%S}.jsonl.gz")
+            exportados = self.exportar_logs(caminho, data_limite=data_limite)
+            if not exportados:
+                os.remove(caminho)
+                return []
+            self.limpar_logs_antigos(dias, data_limite=data_limite)
+            return [{'arquivo': caminho, 'registros': exportados}]
+        
+        arquivados = []
+        for particao in particoes:
+            # O mês inteiro precisa estar fora do prazo
+            if _proximo_mes(particao['mes']) > data_limite.date():
+                break
+            
+            caminho = os.path.join(pasta, f"logs_sistema_{particao['nome']}.jsonl.gz")
+            exportados = self.exportar_logs(caminho, particao=particao['nome'])
+            self.execute_query(f"ALTER TABLE logs_sistema DROP PARTITION {particao['nome']}")
+            
+            if not exportados:
+                os.remove(caminho)
+                continue
+            
+            logger.info(f"Logs de {particao['mes']:%m/%Y} arquivados em {caminho} ({exportados} registros)")
+            arquivados.append({'particao': particao['nome'], 'arquivo': caminho, 'registros': exportados})
+        
+        return arquivados
+    
+    def limpar_logs_antigos(self, dias, lote=5000, data_limite=None):
+        """Apagar logs mais antigos que N dias, em lotes para não travar a tabela"""
+        data_limite = data_limite or datetime.now() - timedelta(days=int(dias))
+        query = "DELETE FROM logs_sistema WHERE timestamp < %s LIMIT %s"
+        
+        total = 0
+        while True:
+            apagados = self.execute_query(query, (data_limite, lote))
+            total += apagados
+            if apagados < lote:
+                return total
+    
+    # MÉTODOS PARA IDEMPOTÊNCIA (Idempotency-Key)
+    def registrar_chave_idempotencia(self, chave, rota, hash_requisicao):
+        """Reservar a chave; False se ela já existe
+        
+        Com a mesma chave em uma transação ainda aberta, o INSERT espera o
+        commit/rollback da outra requisição antes de responder.
+        """
+        query = '''INSERT INTO chaves_idempotencia (chave, rota, hash_requisicao)
+                   VALUES (%s, %s, %s)'''
+        try:
+            self.execute_query(query, (chave, rota, hash_requisicao))
+            return True
+        except Error as e:
+            if e.errno == ER_DUP_ENTRY:
+                return False
+            raise
+    
+    def buscar_chave_idempotencia(self, chave):
+        query = "SELECT rota, hash_requisicao, resposta FROM chaves_idempotencia WHERE chave = %s"
+        result = self.execute_query(query, (chave,))
+        return result[0] if result else None
+    
+    def gravar_resposta_idempotencia(self, chave, resposta):
+        query = "UPDATE chaves_idempotencia SET resposta = %s WHERE chave = %s"
+        return self.execute_query(query, (resposta, chave))
+    
+    def limpar_chaves_idempotencia(self, horas):
+        """Apagar chaves mais antigas que N horas (retentativas já não chegam)"""
+        data_limite = datetime.now() - timedelta(hours=int(horas))
+        return self.execute_query("DELETE FROM chaves_idempotencia WHERE created_at < %s", (data_limite,))
+    
+    # MÉTODOS PARA EXPORTAÇÕES EM SEGUNDO PLANO
+    def inserir_exportacao(self, exportacao_id, tipo, formato, parametros, dono):
+        query = '''INSERT INTO exportacoes (id, tipo, formato, parametros, dono)
+                   VALUES (%s, %s, %s, %s, %s)'''
+        self.execute_query(query, (exportacao_id, tipo, formato, json.dumps(parametros, default=str), dono))
+    
+    def buscar_exportacao(self, exportacao_id):
+        result = self.execute_query("SELECT * FROM exportacoes WHERE id = %s", (exportacao_id,))
+        if not result:
+            return None
+        exportacao = result[0]
+        exportacao['parametros'] = json.loads(exportacao['parametros'] or '{}')
+        return exportacao
+    
+    def iniciar_exportacao(self, exportacao_id, total_linhas=None):
+        query = '''UPDATE exportacoes SET status = 'processando', total_linhas = %s, linhas_processadas = 0
+                   WHERE id = %s'''
+        self.execute_query(query, (total_linhas, exportacao_id))
+    
+    def atualizar_progresso_exportacao(self, exportacao_id, linhas_processadas):
+        query = "UPDATE exportacoes SET linhas_processadas = %s WHERE id = %s"
+        self.execute_query(query, (linhas_processadas, exportacao_id))
+    
+    def concluir_exportacao(self, exportacao_id, arquivo, nome_download, linhas_processadas):
+        query = '''UPDATE exportacoes
+                   SET status = 'concluida', arquivo = %s, nome_download = %s,
+                       linhas_processadas = %s, concluida_em = NOW()
+                   WHERE id = %s'''
+        self.execute_query(query, (arquivo, nome_download, linhas_processadas, exportacao_id))
+    
+    def falhar_exportacao(self, exportacao_id, erro):
+        query = "UPDATE exportacoes SET status = 'erro', erro = %s, concluida_em = NOW() WHERE id = %s"
+        self.execute_query(query, (str(erro)[:255], exportacao_id))
+    
+    def donos_exportacoes_em_andamento(self):
+        """Donos com exportações pendentes/em andamento (None: anteriores ao registro do dono)"""
+        query = "SELECT DISTINCT dono FROM exportacoes WHERE status IN ('pendente', 'processando')"
+        return [linha['dono'] for linha in self.execute_query(query)]
+    
+    def lock_consultivo_livre(self, nome):
+        """Nenhuma conexão segura o lock consultivo (GET_LOCK) com este nome?"""
+        return self.execute_query("SELECT IS_FREE_LOCK(%s) as livre", (nome,))[0]['livre'] == 1
+    
+    def falhar_exportacoes_interrompidas(self, donos, erro):
+        """Exportações pendentes/em andamento dos donos informados viram erro (None: sem dono)"""
+        conhecidos = [dono for dono in donos if dono is not None]
+        condicoes = []
+        if conhecidos:
+            condicoes.append(f"dono IN ({', '.join(['%s'] * len(conhecidos))})")
+        if None in donos:
+            condicoes.append("dono IS NULL")
+        if not condicoes:
+            return 0
+        
+        query = f'''UPDATE exportacoes SET status = 'erro', erro = %s, concluida_em = NOW()
+                    WHERE status IN ('pendente', 'processando') AND ({' OR '.join(condicoes)})'''
+        return self.execute_query(query, [str(erro)[:255]] + conhecidos)
+    
+    def limpar_exportacoes(self, horas):
+        """Apagar registros de exportação mais antigos que N horas"""
+        data_limite = datetime.now() - timedelta(hours=int(horas))
+        return self.execute_query("DELETE FROM exportacoes WHERE created_at < %s", (data_limite,))
+    
+    def arquivos_exportacoes_recentes(self, horas):
+        """Arquivos ainda citados por exportações das últimas N horas"""
+        data_limite = datetime.now() - timedelta(hours=int(horas))
+        query = "SELECT DISTINCT arquivo FROM exportacoes WHERE arquivo IS NOT NULL AND created_at >= %s"
+        return {linha['arquivo'] for linha in self.execute_query(query, (data_limite,))}
+    
+    # MÉTODOS PARA TAREFAS AGENDADAS
+    def registrar_execucao_tarefa(self, nome, inicio, duracao_ms, status, erro=None):
+        query = '''INSERT INTO tarefas_execucoes (nome, ultima_execucao, duracao_ms, status, erro, total_execucoes)
+                   VALUES (%s, %s, %s, %s, %s, 1)
+                   ON DUPLICATE KEY UPDATE ultima_execucao = VALUES(ultima_execucao),
+                                           duracao_ms = VALUES(duracao_ms),
+                                           status = VALUES(status),
+                                           erro = VALUES(erro),
+                                           total_execucoes = total_execucoes + 1'''
+        return self.execute_query(query, (nome, inicio, duracao_ms, status, erro))
+    
+    def buscar_execucoes_tarefas(self):
+        query = "SELECT * FROM tarefas_execucoes ORDER BY nome"
+        return self.execute_query(query)
     
     def __del__(self):
         self.disconnect()
\ No newline at end of file
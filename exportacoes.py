@@ -0,0 +1,286 @@
+"""
+Exportações de relatórios em segundo plano
+
+POST /api/exports grava a exportação (tabela exportacoes) e a entrega a um
+pool de threads, sem segurar o worker do Flask durante a consulta e a
+montagem do arquivo. A thread gera o arquivo em EXPORT_FOLDER com conexões
+próprias e atualiza o progresso a cada `progresso_a_cada` linhas; o estado
+fica no banco, então /api/exports/<id> responde em qualquer worker.
+
+O arquivo pronto é nomeado pelo hash do conteúdo e baixado por
+/api/exports/<id>/arquivo com um nome amigável. A tarefa agendada de
+limpeza apaga os registros e os arquivos de EXPORT_FOLDER fora do prazo.
+Cada exportação registra o processo dono (DONO_PROCESSO), que segura um
+lock consultivo do MySQL enquanto vive. Na inicialização, as exportações
+pendentes de donos que terminaram (o pool de threads morreu com eles) são
+marcadas como 'erro', com uma mensagem pedindo para gerar o relatório de
+novo; as de outros workers ainda ativos seguem normalmente.
+"""
+
+import hashlib
+import os
+import threading
+import uuid
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import mysql.connector
+
+from config import Config
+from database import Database
+from filtros import FiltroVendas
+from business import RelatoriosBusiness, COLUNAS_RELATORIO_VENDAS
+from utils import exportar_para_excel, gerar_csv, limpar_arquivo_temporario
+
+logger = logging.getLogger(__name__)
+
+# formato -> extensão do arquivo
+FORMATOS = {'excel': 'xlsx', 'csv': 'csv'}
+
+class ExportacaoInvalida(ValueError):
+    """Pedido ou resultado de exportação inválido (mensagem pronta para o usuário)"""
+    pass
+
+# Dono das exportações criadas por este processo; o lock consultivo com
+# este nome fica com uma conexão própria enquanto o processo vive
+DONO_PROCESSO = uuid.uuid4().hex
+PREFIXO_LOCK_DONO = 'acougue_exportacoes_'
+
+_conexao_dono = None
+_conexao_dono_lock = threading.Lock()
+
+ERRO_INTERROMPIDA = 'Exportação interrompida pelo reinício do sistema; gere o relatório novamente'
+
+_executor_exportacoes = ThreadPoolExecutor(
+    max_workers=Config.EXPORTACOES_CONFIG['workers'],
+    thread_name_prefix='exportacao'
+)
+
+def _garantir_lock_dono():
+    """Obter (ou confirmar) o lock consultivo do dono deste processo
+
+    Lock livre significa dono encerrado, em qualquer host: o MySQL o libera
+    quando a conexão fecha.
+    """
+    global _conexao_dono
+    with _conexao_dono_lock:
+        if _conexao_dono is not None:
+            try:
+                _conexao_dono.ping(reconnect=False)
+                return True
+            except Exception:
+                logger.warning("Conexão do lock das exportações perdida")
+                _conexao_dono = None
+
+        try:
+            # Conexão própria, fora do pool: o lock vive enquanto ela estiver aberta
+            conexao = mysql.connector.connect(**Config.DATABASE_CONFIG)
+            cursor = conexao.cursor()
+            cursor.execute("SELECT GET_LOCK(%s, 0)", (PREFIXO_LOCK_DONO + DONO_PROCESSO,))
+            obtido = cursor.fetchone()[0] == 1
+            cursor.close()
+        except Exception as e:
+            logger.error(f"Erro ao obter lock das exportações: {e}")
+            return False
+
+        if not obtido:
+            conexao.close()
+            return False
+
+        _conexao_dono = conexao
+        return True
+
+def _dados_vendas(db, filtros):
+    """(total, linhas, colunas, planilha) do relatório de vendas, lido sem buffer"""
+    total = db.contar_vendas(filtros)
+    if not total:
+        raise ExportacaoInvalida('Nenhum dado para exportar')
+
+    vendas = db.iterar_vendas_sem_buffer(filtros)
+
+    def linhas():
+        # Fechar as linhas fecha o cursor sem buffer antes de a conexão voltar ao pool
+        try:
+            for venda in vendas:
+                yield RelatoriosBusiness._linha_relatorio_venda(venda)
+        finally:
+            vendas.close()
+
+    return total, linhas(), COLUNAS_RELATORIO_VENDAS, 'Vendas'
+
+def _dados_inadimplentes(db, filtros):
+    """(total, linhas, colunas, planilha) do relatório de inadimplentes (agrupado em memória)"""
+    resultado = RelatoriosBusiness.gerar_relatorio_inadimplentes(db)
+    if not resultado['sucesso']:
+        raise RuntimeError(resultado['erro'])
+
+    dados = resultado['dados']
+    if not dados:
+        raise ExportacaoInvalida('Nenhum dado para exportar')
+    return len(dados), (linha for linha in dados), list(dados[0].keys()), 'Inadimplentes'
+
+TIPOS = {
+    'vendas': _dados_vendas,
+    'inadimplentes': _dados_inadimplentes
+}
+
+def criar_exportacao(db, tipo, formato, filtros=None):
+    """Registrar a exportação e agendá-la no pool (depois do commit); retorna o id
+
+    Os filtros são validados aqui, para o erro voltar na própria requisição.
+    """
+    if tipo not in TIPOS:
+        raise ExportacaoInvalida(f'Tipo de relatório inválido: {tipo}')
+    if formato not in FORMATOS:
+        raise ExportacaoInvalida(f'Formato inválido: {formato}')
+
+    parametros = {}
+    if tipo == 'vendas':
+        filtro = FiltroVendas.de_dict(filtros)
+        parametros = {
+            'cliente_id': filtro.cliente_id,
+            'status': filtro.status,
+            'data_inicio': filtro.data_inicio.isoformat() if filtro.data_inicio else None,
+            'data_fim': filtro.data_fim.isoformat() if filtro.data_fim else None
+        }
+
+    if not _garantir_lock_dono():
+        logger.warning("Exportação sem lock do dono: um worker iniciado agora pode marcá-la como erro")
+
+    exportacao_id = uuid.uuid4().hex
+    db.inserir_exportacao(exportacao_id, tipo, formato, parametros, DONO_PROCESSO)
+    db.ao_confirmar(lambda: _executor_exportacoes.submit(_executar, exportacao_id, tipo, formato, parametros))
+    return exportacao_id
+
+def _acompanhar_progresso(linhas, db_estado, exportacao_id, contador):
+    """Repassar as linhas gravando o progresso a cada `progresso_a_cada`"""
+    a_cada = Config.EXPORTACOES_CONFIG['progresso_a_cada']
+    for linha in linhas:
+        yield linha
+        contador['linhas'] += 1
+        if contador['linhas'] % a_cada == 0:
+            db_estado.atualizar_progresso_exportacao(exportacao_id, contador['linhas'])
+
+def _nomear_por_conteudo(caminho, tipo, extensao):
+    """Renomear o arquivo pelo hash do conteúdo; retorna o novo nome"""
+    sha256 = hashlib.sha256()
+    with open(caminho, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(1024 * 1024), b''):
+            sha256.update(bloco)
+
+    nome = f'relatorio_{tipo}_{sha256.hexdigest()[:20]}.{extensao}'
+    destino = os.path.join(Config.EXPORT_FOLDER, nome)
+    if os.path.exists(destino):
+        # Mesmo conteúdo já exportado: reaproveita e renova a idade para a limpeza
+        os.remove(caminho)
+        os.utime(destino)
+    else:
+        os.replace(caminho, destino)
+    return nome
+
+def _executar(exportacao_id, tipo, formato, parametros):
+    """Gerar o arquivo da exportação (thread do pool)"""
+    extensao = FORMATOS[formato]
+    temporario = os.path.join(Config.EXPORT_FOLDER, f'exportacao_{exportacao_id}.{extensao}')
+    contador = {'linhas': 0}
+    linhas = None
+
+    db_estado = Database()
+    db_dados = None
+    try:
+        # Uma conexão para as linhas (cursor sem buffer) e outra para o progresso
+        db_dados = Database()
+        total, linhas, colunas, planilha = TIPOS[tipo](db_dados, parametros)
+        db_estado.iniciar_exportacao(exportacao_id, total)
+
+        acompanhadas = _acompanhar_progresso(linhas, db_estado, exportacao_id, contador)
+        if formato == 'csv':
+            os.makedirs(Config.EXPORT_FOLDER, exist_ok=True)
+            with open(temporario, 'w', newline='', encoding='utf-8') as arquivo:
+                for bloco in gerar_csv(acompanhadas, colunas):
+                    arquivo.write(bloco)
+        else:
+            sucesso, resultado = exportar_para_excel(acompanhadas, os.path.basename(temporario), planilha,
+                                                     colunas, pasta=Config.EXPORT_FOLDER)
+            if not sucesso:
+                raise RuntimeError(resultado)
+
+        arquivo = _nomear_por_conteudo(temporario, tipo, extensao)
+        nome_download = f"relatorio_{tipo}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extensao}"
+        db_estado.concluir_exportacao(exportacao_id, arquivo, nome_download, contador['linhas'])
+        db_estado.inserir_log('RELATORIO_EXPORTADO', f"Relatório de {tipo}: {nome_download}")
+
+    except Exception as e:
+        if isinstance(e, ExportacaoInvalida):
+            erro = str(e)
+        else:
+            logger.error(f"Erro na exportação {exportacao_id} ({tipo}): {e}")
+            erro = 'Erro ao gerar o arquivo'
+        try:
+            db_estado.falhar_exportacao(exportacao_id, erro)
+        except Exception as e:
+            logger.error(f"Erro ao registrar falha da exportação {exportacao_id}: {e}")
+        if os.path.exists(temporario):
+            os.remove(temporario)
+    finally:
+        if linhas is not None:
+            linhas.close()
+        if db_dados is not None:
+            db_dados.disconnect()
+        db_estado.disconnect()
+
+def estado_exportacao(exportacao):
+    """Dicionário de estado exibido por /api/exports/<id>"""
+    if exportacao['status'] == 'concluida':
+        progresso = 100
+    elif exportacao['total_linhas']:
+        progresso = min(99, exportacao['linhas_processadas'] * 100 // exportacao['total_linhas'])
+    else:
+        progresso = 0
+
+    return {
+        'id': exportacao['id'],
+        'tipo': exportacao['tipo'],
+        'formato': exportacao['formato'],
+        'status': exportacao['status'],
+        'progresso': progresso,
+        'linhas_processadas': exportacao['linhas_processadas'],
+        'total_linhas': exportacao['total_linhas'],
+        'erro': exportacao['erro'],
+        'criada_em': exportacao['created_at'],
+        'concluida_em': exportacao['concluida_em']
+    }
+
+def marcar_exportacoes_interrompidas(db):
+    """Marcar como erro as exportações pendentes/em andamento de donos encerrados
+
+    Chamada na inicialização. Exportações sem dono (de antes do registro do
+    dono) também contam como interrompidas; as de workers ativos ficam.
+    Retorna quantas foram marcadas.
+    """
+    _garantir_lock_dono()
+    encerrados = [dono for dono in db.donos_exportacoes_em_andamento()
+                  if dono is None or (dono != DONO_PROCESSO and
+                                      db.lock_consultivo_livre(PREFIXO_LOCK_DONO + dono))]
+    return db.falhar_exportacoes_interrompidas(encerrados, ERRO_INTERROMPIDA)
+
+def limpar_exportacoes_antigas(db, horas):
+    """Apagar registros e arquivos de EXPORT_FOLDER com mais de N horas
+
+    Vale também para os arquivos das exportações síncronas; arquivos ainda
+    citados por exportações recentes ficam.
+    """
+    em_uso = db.arquivos_exportacoes_recentes(horas)
+    removidos = 0
+
+    if os.path.isdir(Config.EXPORT_FOLDER):
+        for nome in os.listdir(Config.EXPORT_FOLDER):
+            caminho = os.path.join(Config.EXPORT_FOLDER, nome)
+            if nome in em_uso or nome.startswith('.') or not os.path.isfile(caminho):
+                continue
+            if limpar_arquivo_temporario(caminho, idade_minutos=horas * 60):
+                removidos += 1
+
+    db.limpar_exportacoes(horas)
+    return removidos
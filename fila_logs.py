@@ -0,0 +1,211 @@
+"""
+Fila de gravação assíncrona de logs_sistema (write-behind)
+
+inserir_log só coloca o registro em uma fila em memória; uma thread em
+segundo plano grava os registros em lote (INSERT multi-linhas a cada
+`lote` registros ou `intervalo_ms`) com conexão própria. Se o MySQL
+estiver fora, o lote vai para um arquivo JSONL e é regravado no banco
+assim que uma gravação voltar a funcionar; a regravação anota quantos
+registros do arquivo já foram confirmados, então uma falha no meio não
+duplica os lotes anteriores. No encerramento do processo a fila é
+esvaziada.
+"""
+
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+import logging
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+class FilaLogs:
+    """Fila limitada de registros de log gravados em lote por uma thread
+
+    criar_database: função que devolve um Database novo (conexão própria,
+    fora do request), usada pela thread para gravar os lotes.
+    """
+
+    def __init__(self, criar_database, tamanho_maximo=10000, lote=200,
+                 intervalo_ms=500, arquivo_pendentes='logs/logs_sistema_pendentes.jsonl'):
+        self.criar_database = criar_database
+        self.lote = lote
+        self.intervalo_segundos = intervalo_ms / 1000
+        self.arquivo_pendentes = arquivo_pendentes
+
+        self._fila = queue.Queue(maxsize=tamanho_maximo)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._lock_arquivo = threading.Lock()
+        self._parar = threading.Event()
+
+        # Contadores para diagnóstico
+        self.gravados = 0
+        self.lotes = 0
+        self.em_arquivo = 0
+
+        atexit.register(self.parar)
+
+    def registrar(self, acao, detalhes=None, usuario='sistema', ip=None):
+        """Enfileirar um registro (não acessa o banco)"""
+        registro = (acao, detalhes, usuario, ip, datetime.now())
+        self._garantir_thread()
+        try:
+            self._fila.put_nowait(registro)
+        except queue.Full:
+            # Banco lento demais para o volume: nada se perde, vai para o arquivo
+            self._gravar_arquivo([registro])
+
+    def _garantir_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._parar.clear()
+                self._thread = threading.Thread(target=self._loop, name='fila-logs', daemon=True)
+                self._thread.start()
+
+    def _loop(self):
+        while not self._parar.is_set():
+            registros = self._coletar_lote()
+            if registros:
+                self._gravar(registros)
+
+    def _coletar_lote(self):
+        """Esperar o primeiro registro e juntar os seguintes até o lote ou o intervalo"""
+        try:
+            registros = [self._fila.get(timeout=self.intervalo_segundos)]
+        except queue.Empty:
+            return []
+
+        limite = time.monotonic() + self.intervalo_segundos
+        while len(registros) < self.lote:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                registros.append(self._fila.get(timeout=restante))
+            except queue.Empty:
+                break
+        return registros
+
+    def _drenar(self):
+        registros = []
+        while True:
+            try:
+                registros.append(self._fila.get_nowait())
+            except queue.Empty:
+                return registros
+
+    def _gravar(self, registros):
+        try:
+            db = self.criar_database()
+        except Exception as e:
+            logger.error(f"Banco indisponível para gravar logs, usando arquivo: {e}")
+            self._gravar_arquivo(registros)
+            return
+
+        try:
+            try:
+                for inicio in range(0, len(registros), self.lote):
+                    db.inserir_logs_lote(registros[inicio:inicio + self.lote])
+            except Exception as e:
+                logger.error(f"Erro ao gravar logs, usando arquivo: {e}")
+                self._gravar_arquivo(registros)
+                return
+
+            self.gravados += len(registros)
+            self.lotes += 1
+
+            # Banco voltou: regravar o que ficou no arquivo
+            if os.path.exists(self.arquivo_pendentes) or os.path.exists(self.arquivo_pendentes + '.processando'):
+                try:
+                    self._reprocessar_arquivo(db)
+                except Exception as e:
+                    logger.error(f"Erro ao regravar logs pendentes do arquivo: {e}")
+        finally:
+            db.disconnect()
+
+    def _gravar_arquivo(self, registros):
+        with self._lock_arquivo:
+            try:
+                pasta = os.path.dirname(self.arquivo_pendentes)
+                if pasta:
+                    os.makedirs(pasta, exist_ok=True)
+                with open(self.arquivo_pendentes, 'a', encoding='utf-8') as arquivo:
+                    for acao, detalhes, usuario, ip, momento in registros:
+                        arquivo.write(json.dumps({
+                            'acao': acao, 'detalhes': detalhes, 'usuario': usuario,
+                            'ip': ip, 'timestamp': momento.isoformat()
+                        }, ensure_ascii=False) + '\n')
+                self.em_arquivo += len(registros)
+            except OSError as e:
+                logger.error(f"Erro ao gravar logs pendentes em arquivo ({len(registros)} registro(s) perdidos): {e}")
+
+    def _reprocessar_arquivo(self, db):
+        with self._lock_arquivo:
+            # Renomear antes de ler: o que chegar durante a regravação vai para um arquivo novo
+            processando = self.arquivo_pendentes + '.processando'
+            if not os.path.exists(processando):
+                os.replace(self.arquivo_pendentes, processando)
+
+        # Registros do início do arquivo já confirmados por uma regravação interrompida
+        progresso = processando + '.progresso'
+        ja_gravados = self._ler_progresso(progresso)
+
+        registros = []
+        with open(processando, encoding='utf-8') as arquivo:
+            for linha in arquivo:
+                if not linha.strip():
+                    continue
+                item = json.loads(linha)
+                registros.append((item['acao'], item['detalhes'], item['usuario'], item['ip'],
+                                  datetime.fromisoformat(item['timestamp'])))
+
+        for inicio in range(ja_gravados, len(registros), self.lote):
+            db.inserir_logs_lote(registros[inicio:inicio + self.lote])
+            # Lote confirmado: se o próximo falhar, a nova tentativa começa depois dele
+            self._gravar_progresso(progresso, min(inicio + self.lote, len(registros)))
+        os.remove(processando)
+        if os.path.exists(progresso):
+            os.remove(progresso)
+
+        regravados = max(0, len(registros) - ja_gravados)
+        self.gravados += regravados
+        logger.info(f"{regravados} log(s) pendente(s) regravado(s) a partir do arquivo")
+
+    def _ler_progresso(self, caminho):
+        try:
+            with open(caminho, encoding='utf-8') as arquivo:
+                return int(arquivo.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def _gravar_progresso(self, caminho, registros_gravados):
+        # Arquivo temporário + replace: o progresso nunca fica pela metade
+        temporario = caminho + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(str(registros_gravados))
+        os.replace(temporario, caminho)
+
+    def parar(self, timeout=5):
+        """Parar a thread e gravar o que ainda estiver na fila"""
+        self._parar.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+        registros = self._drenar()
+        if registros:
+            self._gravar(registros)
+
+    def estatisticas(self):
+        return {
+            'pendentes': self._fila.qsize(),
+            'gravados': self.gravados,
+            'lotes': self.lotes,
+            'em_arquivo': self.em_arquivo,
+            'arquivo_pendentes': os.path.exists(self.arquivo_pendentes)
+        }
@@ -0,0 +1,197 @@
+from datetime import datetime, date, timedelta
+from utils import converter_data_brasileira_para_mysql
+
+class FiltroInvalido(ValueError):
+    """Parâmetro de filtro inválido (mensagem pronta para o usuário)"""
+    pass
+
+def _converter_data(valor, campo):
+    if valor is None or valor == '':
+        return None
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+
+    data_mysql = converter_data_brasileira_para_mysql(str(valor))
+    try:
+        return datetime.strptime(data_mysql[:10], '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise FiltroInvalido(f'{campo} inválida: {valor}')
+
+class FiltroVendas:
+    """Filtros de vendas validados uma única vez e convertidos em SQL
+
+    Datas viram intervalos semiabertos (data_venda >= início AND
+    data_venda < fim + 1 dia), sem funções sobre a coluna, para que o
+    índice de data_venda possa ser usado.
+    """
+
+    STATUS_VALIDOS = ('aberta', 'paga', 'vencida', 'cancelada')
+
+    def __init__(self, cliente_id=None, status=None, data_inicio=None, data_fim=None):
+        if cliente_id not in (None, ''):
+            try:
+                cliente_id = int(cliente_id)
+            except (TypeError, ValueError):
+                raise FiltroInvalido(f'Cliente inválido: {cliente_id}')
+        else:
+            cliente_id = None
+
+        if status in ('', None):
+            status = None
+        elif status not in self.STATUS_VALIDOS:
+            raise FiltroInvalido(f'Status inválido: {status}')
+
+        data_inicio = _converter_data(data_inicio, 'Data inicial')
+        data_fim = _converter_data(data_fim, 'Data final')
+
+        if data_inicio and data_fim and data_inicio > data_fim:
+            raise FiltroInvalido('Data inicial maior que a data final')
+
+        self.cliente_id = cliente_id
+        self.status = status
+        self.data_inicio = data_inicio
+        self.data_fim = data_fim
+
+    @classmethod
+    def de_dict(cls, filtros):
+        """Aceita o dicionário de filtros usado nas rotas (ou um FiltroVendas)"""
+        if isinstance(filtros, cls):
+            return filtros
+        filtros = filtros or {}
+        return cls(
+            cliente_id=filtros.get('cliente_id'),
+            status=filtros.get('status'),
+            data_inicio=filtros.get('data_inicio'),
+            data_fim=filtros.get('data_fim')
+        )
+
+    @classmethod
+    def de_request_args(cls, args):
+        """Montar a partir de request.args (cliente_id, status, data_inicio, data_fim)"""
+        return cls.de_dict({
+            'cliente_id': args.get('cliente_id'),
+            'status': args.get('status'),
+            'data_inicio': args.get('data_inicio'),
+            'data_fim': args.get('data_fim')
+        })
+
+    def clausulas(self, alias='v'):
+        """Condições WHERE e parâmetros correspondentes"""
+        where_clauses = []
+        params = []
+
+        if self.cliente_id is not None:
+            where_clauses.append(f"{alias}.cliente_id = %s")
+            params.append(self.cliente_id)
+
+        if self.status:
+            where_clauses.append(f"{alias}.status = %s")
+            params.append(self.status)
+
+        if self.data_inicio:
+            where_clauses.append(f"{alias}.data_venda >= %s")
+            params.append(self.data_inicio)
+
+        if self.data_fim:
+            where_clauses.append(f"{alias}.data_venda < %s")
+            params.append(self.data_fim + timedelta(days=1))
+
+        return where_clauses, params
+
+    def where(self, alias='v'):
+        """Cláusula WHERE completa ('1=1' quando não há filtros) e parâmetros"""
+        where_clauses, params = self.clausulas(alias)
+        return ' AND '.join(where_clauses or ['1=1']), params
+
+    def __bool__(self):
+        return any(valor is not None for valor in
+                   (self.cliente_id, self.status, self.data_inicio, self.data_fim))
+
+class FiltroLogs:
+    """Filtros da consulta de logs_sistema (ação exata e período)"""
+
+    def __init__(self, acao=None, data_inicio=None, data_fim=None):
+        self.acao = acao.strip().upper() if acao and acao.strip() else None
+        self.data_inicio = _converter_data(data_inicio, 'Data inicial')
+        self.data_fim = _converter_data(data_fim, 'Data final')
+
+        if self.data_inicio and self.data_fim and self.data_inicio > self.data_fim:
+            raise FiltroInvalido('Data inicial maior que a data final')
+
+    @classmethod
+    def de_request_args(cls, args):
+        """Montar a partir de request.args (acao, desde, ate)"""
+        return cls(acao=args.get('acao'), data_inicio=args.get('desde'), data_fim=args.get('ate'))
+
+    def clausulas(self):
+        where_clauses = []
+        params = []
+
+        if self.acao:
+            where_clauses.append("acao = %s")
+            params.append(self.acao)
+
+        if self.data_inicio:
+            where_clauses.append("timestamp >= %s")
+            params.append(self.data_inicio)
+
+        if self.data_fim:
+            where_clauses.append("timestamp < %s")
+            params.append(self.data_fim + timedelta(days=1))
+
+        return where_clauses, params
+
+# PAGINAÇÃO POR CURSOR (keyset)
+# O cursor é a chave de ordenação do último item da página: as próximas
+# páginas continuam a partir dela pelo índice, sem OFFSET.
+LIMITE_MAXIMO_PAGINA = 500
+
+def limite_pagina(valor, padrao=50):
+    """Tamanho de página vindo da requisição, limitado a LIMITE_MAXIMO_PAGINA"""
+    try:
+        limite = int(valor) if valor not in (None, '') else padrao
+    except (TypeError, ValueError):
+        raise FiltroInvalido(f'Limite inválido: {valor}')
+    return max(1, min(limite, LIMITE_MAXIMO_PAGINA))
+
+def _separar_cursor(after):
+    # Só a última vírgula separa o id: nomes de clientes podem conter vírgulas
+    chave, _, id_str = str(after).rpartition(',')
+    try:
+        return chave, int(id_str)
+    except ValueError:
+        raise FiltroInvalido(f'Cursor inválido: {after}')
+
+def ler_cursor_vendas(after):
+    """'AAAA-MM-DD HH:MM:SS,id' -> (data_venda, id)"""
+    if not after:
+        return None
+    chave, venda_id = _separar_cursor(after)
+    try:
+        return datetime.fromisoformat(chave.replace('T', ' ')), venda_id
+    except ValueError:
+        raise FiltroInvalido(f'Cursor inválido: {after}')
+
+def cursor_vendas(venda):
+    return f"{venda['data_venda'].strftime('%Y-%m-%d %H:%M:%S')},{venda['id']}"
+
+def ler_cursor_clientes(after):
+    """'nome,id' -> (nome, id)"""
+    if not after:
+        return None
+    nome, cliente_id = _separar_cursor(after)
+    if not nome:
+        raise FiltroInvalido(f'Cursor inválido: {after}')
+    return nome, cliente_id
+
+def cursor_clientes(cliente):
+    return f"{cliente['nome']},{cliente['id']}"
+
+def ler_cursor_logs(after):
+    """'AAAA-MM-DD HH:MM:SS,id' -> (timestamp, id)"""
+    return ler_cursor_vendas(after)
+
+def cursor_logs(log):
+    return f"{log['timestamp'].strftime('%Y-%m-%d %H:%M:%S')},{log['id']}"
@@ -0,0 +1,93 @@
+"""
+Requisições idempotentes com o cabeçalho Idempotency-Key
+
+O terminal gera uma chave por operação (ex.: um pagamento) e a reenvia em
+cada nova tentativa. A primeira requisição com a chave executa a rota e
+grava a resposta na mesma transação; as repetições recebem essa resposta
+sem executar nada de novo.
+"""
+
+import hashlib
+import logging
+from functools import wraps
+
+from flask import current_app, request, jsonify
+from mysql.connector import Error
+
+from database import obter_database
+
+logger = logging.getLogger(__name__)
+
+TAMANHO_MAXIMO_CHAVE = 100
+
+# Outra requisição com a mesma chave segurou a linha além do innodb_lock_wait_timeout
+ER_LOCK_WAIT_TIMEOUT = 1205
+
+class _RespostaSemSucesso(Exception):
+    """Rota terminou sem sucesso: desfaz a reserva da chave para permitir nova tentativa"""
+
+    def __init__(self, resposta):
+        super().__init__()
+        self.resposta = resposta
+
+def _responder_erro(mensagem, status):
+    resposta = jsonify({'sucesso': False, 'erro': mensagem})
+    resposta.status_code = status
+    return resposta
+
+def _repetir_resposta(db, chave, rota, hash_requisicao):
+    registro = db.buscar_chave_idempotencia(chave)
+    if not registro or registro['resposta'] is None:
+        return _responder_erro('Requisição em processamento, tente novamente', 409)
+
+    if registro['rota'] != rota or registro['hash_requisicao'] != hash_requisicao:
+        return _responder_erro('Idempotency-Key já usada em outra requisição', 422)
+
+    resposta = current_app.response_class(registro['resposta'], mimetype='application/json')
+    resposta.headers['Idempotent-Replayed'] = 'true'
+    return resposta
+
+def idempotente(funcao):
+    """Decorador de rotas POST: sem Idempotency-Key, a rota roda normalmente
+
+    A rota inteira roda dentro de uma transação aberta aqui (as transações da
+    rota participam dela). Só respostas com 'sucesso' ficam gravadas; uma
+    falha desfaz tudo, inclusive a reserva da chave. Efeitos fora do banco
+    (impressão) ficam para depois do commit, com db.ao_confirmar, para não
+    segurar as travas da transação.
+    """
+    @wraps(funcao)
+    def envoltorio(*args, **kwargs):
+        chave = request.headers.get('Idempotency-Key', '').strip()
+        if not chave:
+            return funcao(*args, **kwargs)
+
+        if len(chave) > TAMANHO_MAXIMO_CHAVE or not chave.isascii():
+            return _responder_erro('Idempotency-Key inválida', 400)
+
+        rota = request.path
+        hash_requisicao = hashlib.sha1(request.get_data()).hexdigest()
+        db = obter_database()
+
+        try:
+            with db.transaction():
+                nova = db.registrar_chave_idempotencia(chave, rota, hash_requisicao)
+                if nova:
+                    resposta = current_app.make_response(funcao(*args, **kwargs))
+                    dados = resposta.get_json(silent=True) or {}
+                    if not dados.get('sucesso'):
+                        raise _RespostaSemSucesso(resposta)
+
+                    db.gravar_resposta_idempotencia(chave, resposta.get_data(as_text=True))
+        except _RespostaSemSucesso as e:
+            return e.resposta
+        except Error as e:
+            if e.errno == ER_LOCK_WAIT_TIMEOUT:
+                return _responder_erro('Requisição em processamento, tente novamente', 409)
+            logger.error(f"Erro ao processar requisição idempotente: {e}")
+            return _responder_erro('Erro interno do sistema', 500)
+
+        if not nova:
+            return _repetir_resposta(db, chave, rota, hash_requisicao)
+        return resposta
+    return envoltorio
@@ -0,0 +1,22 @@
+-- Índices para as consultas mais frequentes do sistema
+
+-- Vendas de um cliente por status/data (saldos, vendas em aberto, histórico)
+CREATE INDEX idx_vendas_cliente_status_data ON vendas (cliente_id, status, data_venda);
+
+-- Vendas por status/data (vencidas, varredura de vencidas, dashboard)
+CREATE INDEX idx_vendas_status_data ON vendas (status, data_venda);
+
+-- Listagem e filtros por período de vendas
+CREATE INDEX idx_vendas_data ON vendas (data_venda);
+
+-- Pagamentos de uma venda em ordem (também atende a FK de venda_id)
+CREATE INDEX idx_pagamentos_venda_data ON pagamentos (venda_id, data_pagamento);
+
+-- Pagamentos por período e forma (resumo diário)
+CREATE INDEX idx_pagamentos_data_forma ON pagamentos (data_pagamento, forma_pagamento);
+
+-- Listagem de clientes ativos por nome
+CREATE INDEX idx_clientes_ativo_nome ON clientes (ativo, nome);
+
+-- Limpeza de logs por data
+CREATE INDEX idx_logs_timestamp ON logs_sistema (timestamp);
@@ -0,0 +1,18 @@
+"""
+Índice de busca de clientes por prefixo (typeahead)
+
+Cada cliente ganha uma linha por termo: palavras do nome sem acentos e
+CPF/telefone só com dígitos. A busca vira um intervalo na chave primária
+(termo LIKE 'x%') em vez de LIKE '%x%' sobre nome, cpf e telefone.
+"""
+
+def aplicar(db):
+    db.execute_query('''
+        CREATE TABLE IF NOT EXISTS clientes_busca (
+            termo VARCHAR(64) CHARACTER SET ascii COLLATE ascii_bin NOT NULL,
+            cliente_id INT NOT NULL,
+            PRIMARY KEY (termo, cliente_id),
+            INDEX idx_clientes_busca_cliente (cliente_id)
+        )
+    ''')
+    db.reindexar_busca_clientes()
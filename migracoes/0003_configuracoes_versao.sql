@@ -0,0 +1,8 @@
+-- Contador de versão das configurações: cada alteração incrementa, e os
+-- workers revalidam a cópia em memória comparando só este número
+CREATE TABLE IF NOT EXISTS configuracoes_versao (
+    id TINYINT PRIMARY KEY,
+    versao BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT IGNORE INTO configuracoes_versao (id, versao) VALUES (1, 0);
@@ -0,0 +1,3 @@
+-- Versão dos dados de cada cliente: incrementada a cada recálculo do saldo
+-- (venda, pagamento, troca de status), usada nos ETags das leituras
+ALTER TABLE saldos_clientes ADD COLUMN versao INT NOT NULL DEFAULT 0
@@ -0,0 +1,35 @@
+"""
+Tabela de ligação venda_origens no lugar de vendas.venda_origem_ids
+
+A venda de saldo restante guardava as vendas que a geraram como texto
+("12,15,20"). Cada origem passa a ser uma linha (venda_id, venda_origem_id),
+indexada nos dois sentidos, e a coluna de texto é removida depois da cópia.
+Sem chaves estrangeiras: a linhagem continua legível mesmo se a venda de
+origem sair da tabela vendas.
+"""
+
+from utils import ids_vendas_origem
+
+def aplicar(db):
+    db.execute_query('''
+        CREATE TABLE IF NOT EXISTS venda_origens (
+            venda_id INT NOT NULL,
+            venda_origem_id INT NOT NULL,
+            PRIMARY KEY (venda_id, venda_origem_id),
+            INDEX idx_venda_origens_origem (venda_origem_id)
+        )
+    ''')
+
+    # Instalação nova (ou migração reaplicada): a coluna antiga já não existe
+    if not db.execute_query("SHOW COLUMNS FROM vendas LIKE 'venda_origem_ids'"):
+        return
+
+    vendas = db.execute_query("SELECT id, venda_origem_ids FROM vendas WHERE venda_origem_ids IS NOT NULL")
+    db.execute_many(
+        "INSERT IGNORE INTO venda_origens (venda_id, venda_origem_id) VALUES (%s, %s)",
+        [(venda['id'], origem_id)
+         for venda in vendas
+         for origem_id in ids_vendas_origem(venda['venda_origem_ids'])]
+    )
+
+    db.execute_query("ALTER TABLE vendas DROP COLUMN venda_origem_ids")
@@ -0,0 +1,10 @@
+-- Respostas de requisições com Idempotency-Key (pagamentos): uma repetição
+-- da mesma requisição devolve a resposta original em vez de pagar de novo
+CREATE TABLE IF NOT EXISTS chaves_idempotencia (
+    chave VARCHAR(100) CHARACTER SET ascii COLLATE ascii_bin NOT NULL PRIMARY KEY,
+    rota VARCHAR(255) NOT NULL,
+    hash_requisicao CHAR(40) NOT NULL,
+    resposta MEDIUMTEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_chaves_idempotencia_criacao (created_at)
+)
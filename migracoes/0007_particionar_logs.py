@@ -0,0 +1,20 @@
+"""
+Partições mensais em logs_sistema e índice por ação
+
+A tabela passa a ser particionada por mês (RANGE sobre o timestamp): a
+retenção vira DROP PARTITION do mês exportado, em vez de DELETE em
+lotes, e as consultas por período só leem as partições do intervalo.
+"""
+
+from mysql.connector import Error
+
+ER_DUP_KEYNAME = 1061
+
+def aplicar(db):
+    try:
+        db.execute_query("CREATE INDEX idx_logs_acao_timestamp ON logs_sistema (acao, timestamp)")
+    except Error as e:
+        if e.errno != ER_DUP_KEYNAME:
+            raise
+
+    db.particionar_logs_sistema()
@@ -0,0 +1,40 @@
+-- Arquivo de vendas pagas antigas (Database.arquivar_vendas_pagas): mesmas
+-- colunas das tabelas ativas, sem chaves estrangeiras nem colunas geradas
+-- (os valores são copiados como estavam no momento do arquivamento)
+CREATE TABLE IF NOT EXISTS vendas_arquivo (
+    id INT PRIMARY KEY,
+    cliente_id INT NOT NULL,
+    data_venda TIMESTAMP NULL,
+    valor_total DECIMAL(10,2) NOT NULL,
+    valor_pago DECIMAL(10,2) NOT NULL,
+    valor_restante DECIMAL(10,2) NOT NULL,
+    status ENUM('aberta', 'paga', 'vencida', 'cancelada') NOT NULL,
+    observacoes TEXT,
+    created_at TIMESTAMP NULL,
+    updated_at TIMESTAMP NULL,
+    arquivada_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_vendas_arquivo_cliente_data (cliente_id, data_venda),
+    INDEX idx_vendas_arquivo_data (data_venda)
+);
+
+CREATE TABLE IF NOT EXISTS itens_venda_arquivo (
+    id INT PRIMARY KEY,
+    venda_id INT NOT NULL,
+    descricao VARCHAR(255) NOT NULL,
+    quantidade DECIMAL(8,3) NOT NULL,
+    valor_unitario DECIMAL(10,2) NOT NULL,
+    subtotal DECIMAL(10,2) NOT NULL,
+    INDEX idx_itens_venda_arquivo_venda (venda_id)
+);
+
+CREATE TABLE IF NOT EXISTS pagamentos_arquivo (
+    id INT PRIMARY KEY,
+    venda_id INT NOT NULL,
+    valor_pago DECIMAL(10,2) NOT NULL,
+    forma_pagamento ENUM('dinheiro', 'cartao', 'pix') NOT NULL,
+    data_pagamento TIMESTAMP NULL,
+    observacoes TEXT,
+    comprovante_impresso BOOLEAN DEFAULT FALSE,
+    INDEX idx_pagamentos_arquivo_venda_data (venda_id, data_pagamento),
+    INDEX idx_pagamentos_arquivo_data_forma (data_pagamento, forma_pagamento)
+)
@@ -0,0 +1,17 @@
+-- Exportações de relatórios geradas em segundo plano (exportacoes.py):
+-- estado e progresso consultados por /api/exports/<id> em qualquer worker
+CREATE TABLE IF NOT EXISTS exportacoes (
+    id CHAR(32) CHARACTER SET ascii NOT NULL PRIMARY KEY,
+    tipo VARCHAR(30) NOT NULL,
+    formato VARCHAR(10) NOT NULL,
+    parametros TEXT,
+    status ENUM('pendente', 'processando', 'concluida', 'erro') NOT NULL DEFAULT 'pendente',
+    total_linhas INT NULL,
+    linhas_processadas INT NOT NULL DEFAULT 0,
+    arquivo VARCHAR(255) NULL,
+    nome_download VARCHAR(255) NULL,
+    erro VARCHAR(255) NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    concluida_em TIMESTAMP NULL,
+    INDEX idx_exportacoes_criacao (created_at)
+)
@@ -0,0 +1,3 @@
+-- Processo dono de cada exportação (exportacoes.DONO_PROCESSO): na
+-- inicialização só viram erro as exportações de donos que terminaram
+ALTER TABLE exportacoes ADD COLUMN dono CHAR(32) CHARACTER SET ascii NULL AFTER parametros
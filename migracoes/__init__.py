@@ -0,0 +1,195 @@
+"""
+Migrações versionadas do esquema do banco
+
+Cada arquivo NNNN_descricao.sql (comandos separados por ';') ou
+NNNN_descricao.py (com uma função aplicar(db)) é aplicado uma única vez,
+em ordem, e registrado na tabela schema_version.
+
+Uso:
+    python -m migracoes              # aplicar migrações pendentes
+    python -m migracoes --dry-run    # apenas listar o que seria executado
+    python -m migracoes --explain    # conferir (EXPLAIN) o uso dos índices
+"""
+
+import os
+import re
+import importlib.util
+import logging
+
+from mysql.connector import Error
+
+logger = logging.getLogger(__name__)
+
+# Índice/coluna já existentes: permitem reaplicar uma migração que falhou no meio
+ER_DUP_FIELDNAME = 1060
+ER_DUP_KEYNAME = 1061
+
+DIRETORIO_MIGRACOES = os.path.dirname(os.path.abspath(__file__))
+PADRAO_ARQUIVO = re.compile(r'^(\d{4})_(\w+)\.(sql|py)$')
+
+# Consultas quentes e o índice que cada uma deve poder usar
+CONSULTAS_VERIFICADAS = [
+    (
+        'vendas em aberto do cliente',
+        "SELECT * FROM vendas WHERE cliente_id = %s AND status IN ('aberta', 'vencida') ORDER BY data_venda",
+        (1,),
+        'idx_vendas_cliente_status_data'
+    ),
+    (
+        'vendas vencidas',
+        "SELECT id FROM vendas WHERE status = 'aberta' AND data_venda < %s",
+        ('2000-01-01',),
+        'idx_vendas_status_data'
+    ),
+    (
+        'vendas por período',
+        "SELECT id FROM vendas WHERE data_venda >= %s AND data_venda < %s",
+        ('2000-01-01', '2000-02-01'),
+        'idx_vendas_data'
+    ),
+    (
+        'pagamentos da venda',
+        "SELECT * FROM pagamentos WHERE venda_id = %s ORDER BY data_pagamento",
+        (1,),
+        'idx_pagamentos_venda_data'
+    ),
+    (
+        'pagamentos por período e forma',
+        "SELECT forma_pagamento, SUM(valor_pago) FROM pagamentos WHERE data_pagamento >= %s GROUP BY forma_pagamento",
+        ('2000-01-01',),
+        'idx_pagamentos_data_forma'
+    ),
+    (
+        'página de clientes (cursor nome, id)',
+        "SELECT id FROM clientes WHERE ativo = TRUE AND (nome > %s OR (nome = %s AND id > %s)) ORDER BY nome, id LIMIT 50",
+        ('', '', 0),
+        'idx_clientes_ativo_nome'
+    ),
+    (
+        'sugestões de clientes (prefixo)',
+        "SELECT cliente_id FROM clientes_busca WHERE termo LIKE %s",
+        ('jo%',),
+        'PRIMARY'
+    ),
+    (
+        'origens da venda',
+        "SELECT venda_origem_id FROM venda_origens WHERE venda_id = %s",
+        (1,),
+        'PRIMARY'
+    ),
+    (
+        'logs por ação',
+        "SELECT id FROM logs_sistema WHERE acao = %s AND timestamp >= %s ORDER BY timestamp DESC, id DESC LIMIT 100",
+        ('LOGIN', '2000-01-01'),
+        'idx_logs_acao_timestamp'
+    ),
+    (
+        'vendas arquivadas do cliente',
+        "SELECT id FROM vendas_arquivo WHERE cliente_id = %s ORDER BY data_venda DESC, id DESC LIMIT 100",
+        (1,),
+        'idx_vendas_arquivo_cliente_data'
+    )
+]
+
+def listar_migracoes():
+    """Arquivos de migração em ordem de versão: (versao, nome, caminho, tipo)"""
+    migracoes = []
+    for arquivo in os.listdir(DIRETORIO_MIGRACOES):
+        match = PADRAO_ARQUIVO.match(arquivo)
+        if match:
+            versao, nome, tipo = match.groups()
+            migracoes.append((int(versao), nome, os.path.join(DIRETORIO_MIGRACOES, arquivo), tipo))
+
+    migracoes.sort()
+
+    versoes = [m[0] for m in migracoes]
+    if len(versoes) != len(set(versoes)):
+        raise ValueError("Existem migrações com a mesma versão")
+
+    return migracoes
+
+def ler_comandos_sql(caminho):
+    """Separar um arquivo .sql em comandos, ignorando comentários '--'"""
+    with open(caminho, encoding='utf-8') as arquivo:
+        linhas = [linha for linha in arquivo if not linha.strip().startswith('--')]
+
+    return [comando.strip() for comando in ''.join(linhas).split(';') if comando.strip()]
+
+def _carregar_modulo(caminho):
+    nome_modulo = 'migracoes._' + os.path.splitext(os.path.basename(caminho))[0]
+    spec = importlib.util.spec_from_file_location(nome_modulo, caminho)
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+def versoes_aplicadas(db):
+    db.execute_query('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            versao INT PRIMARY KEY,
+            nome VARCHAR(255) NOT NULL,
+            aplicada_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    return {linha['versao'] for linha in db.execute_query("SELECT versao FROM schema_version")}
+
+def migracoes_pendentes(db):
+    aplicadas = versoes_aplicadas(db)
+    return [m for m in listar_migracoes() if m[0] not in aplicadas]
+
+def aplicar_migracoes(db, dry_run=False):
+    """Aplicar as migrações pendentes em ordem
+
+    Com dry_run=True nada é executado; retorna as migrações pendentes e,
+    para as .sql, os comandos que seriam executados.
+    """
+    pendentes = migracoes_pendentes(db)
+    resultado = []
+
+    for versao, nome, caminho, tipo in pendentes:
+        comandos = ler_comandos_sql(caminho) if tipo == 'sql' else []
+        resultado.append({'versao': versao, 'nome': nome, 'tipo': tipo, 'comandos': comandos})
+
+        if dry_run:
+            continue
+
+        logger.info(f"Aplicando migração {versao:04d}_{nome}")
+
+        # DDL no MySQL faz commit implícito: cada comando é aplicado
+        # individualmente e a versão só é registrada ao final
+        if tipo == 'sql':
+            for comando in comandos:
+                try:
+                    db.execute_query(comando)
+                except Error as e:
+                    if e.errno not in (ER_DUP_KEYNAME, ER_DUP_FIELDNAME):
+                        raise
+                    logger.warning(f"Migração {versao:04d}: já aplicado, seguindo ({e.msg})")
+        else:
+            _carregar_modulo(caminho).aplicar(db)
+
+        db.execute_query(
+            "INSERT INTO schema_version (versao, nome) VALUES (%s, %s)",
+            (versao, nome)
+        )
+
+    return resultado
+
+def verificar_indices(db):
+    """Rodar EXPLAIN nas consultas quentes e conferir se o índice esperado é o usado"""
+    resultado = []
+
+    for descricao, consulta, params, indice in CONSULTAS_VERIFICADAS:
+        db.cursor.execute('EXPLAIN ' + consulta, params)
+        linhas = db.cursor.fetchall()
+
+        # Só conta o índice que o otimizador escolheu (key); estar em possible_keys não basta
+        chaves_usadas = [linha.get('key') for linha in linhas if linha.get('key')]
+
+        resultado.append({
+            'consulta': descricao,
+            'indice_esperado': indice,
+            'indice_usado': ', '.join(chaves_usadas) or None,
+            'ok': indice in chaves_usadas
+        })
+
+    return resultado
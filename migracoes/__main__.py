@@ -0,0 +1,41 @@
+import argparse
+import sys
+
+from database import Database
+from migracoes import aplicar_migracoes, verificar_indices
+
+def main():
+    parser = argparse.ArgumentParser(description='Migrações do esquema do banco')
+    parser.add_argument('--dry-run', action='store_true', help='Listar migrações pendentes sem executar')
+    parser.add_argument('--explain', action='store_true', help='Conferir o uso de índices nas consultas quentes')
+    args = parser.parse_args()
+
+    db = Database()
+    try:
+        if args.explain:
+            falhas = 0
+            for item in verificar_indices(db):
+                situacao = 'OK' if item['ok'] else 'FALHOU'
+                print(f"[{situacao}] {item['consulta']}: esperado {item['indice_esperado']}, "
+                      f"usado {item['indice_usado'] or 'nenhum'}")
+                if not item['ok']:
+                    falhas += 1
+            sys.exit(1 if falhas else 0)
+
+        migracoes = aplicar_migracoes(db, dry_run=args.dry_run)
+
+        if not migracoes:
+            print("Nenhuma migração pendente")
+            return
+
+        for migracao in migracoes:
+            prefixo = 'Pendente' if args.dry_run else 'Aplicada'
+            print(f"{prefixo}: {migracao['versao']:04d}_{migracao['nome']} ({migracao['tipo']})")
+            if args.dry_run:
+                for comando in migracao['comandos']:
+                    print(f"    {comando};")
+    finally:
+        db.disconnect()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+import mysql.connector
+from mysql.connector import Error
+import threading
+import queue
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+class PoolEsgotadoError(Error):
+    """Nenhuma conexão livre no pool dentro do tempo de espera"""
+    pass
+
+class PoolConexoes:
+    """Pool de conexões MySQL com verificação de saúde e reciclagem"""
+
+    def __init__(self, config_banco, tamanho=5, max_idade_segundos=1800,
+                 verificar_apos_segundos=30, timeout_espera=10):
+        self.config_banco = config_banco
+        self.tamanho = tamanho
+        self.max_idade_segundos = max_idade_segundos
+        self.verificar_apos_segundos = verificar_apos_segundos
+        self.timeout_espera = timeout_espera
+
+        # Conexões livres: (conexao, criada_em, devolvida_em)
+        self._livres = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._total = 0
+
+        # Contadores para diagnóstico/benchmark
+        self.conexoes_criadas = 0
+        self.conexoes_recicladas = 0
+        self.emprestimos = 0
+
+    def _criar_conexao(self):
+        conexao = mysql.connector.connect(**self.config_banco)
+        with self._lock:
+            self.conexoes_criadas += 1
+        logger.info("Conexão com banco estabelecida")
+        return conexao, time.monotonic()
+
+    def _descartar(self, conexao):
+        try:
+            conexao.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._total -= 1
+            self.conexoes_recicladas += 1
+
+    def _conexao_saudavel(self, conexao, criada_em, devolvida_em):
+        agora = time.monotonic()
+
+        # Reciclar conexões antigas (evita wait_timeout do servidor)
+        if agora - criada_em > self.max_idade_segundos:
+            return False
+
+        # Só faz ping se a conexão ficou parada por algum tempo
+        if agora - devolvida_em > self.verificar_apos_segundos:
+            try:
+                conexao.ping(reconnect=False)
+            except Exception:
+                return False
+
+        return True
+
+    def obter(self):
+        """Emprestar uma conexão do pool"""
+        while True:
+            try:
+                conexao, criada_em, devolvida_em = self._livres.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    pode_criar = self._total < self.tamanho
+                    if pode_criar:
+                        self._total += 1
+
+                if pode_criar:
+                    try:
+                        conexao, criada_em = self._criar_conexao()
+                    except Exception:
+                        with self._lock:
+                            self._total -= 1
+                        raise
+                    break
+
+                try:
+                    conexao, criada_em, devolvida_em = self._livres.get(timeout=self.timeout_espera)
+                except queue.Empty:
+                    raise PoolEsgotadoError(msg=f"Pool de conexões esgotado ({self.tamanho} em uso)")
+
+            if self._conexao_saudavel(conexao, criada_em, devolvida_em):
+                break
+
+            logger.info("Reciclando conexão inativa/antiga do pool")
+            self._descartar(conexao)
+
+        with self._lock:
+            self.emprestimos += 1
+
+        return _ConexaoEmprestada(conexao, criada_em)
+
+    def devolver(self, emprestada):
+        """Devolver uma conexão ao pool"""
+        conexao = emprestada.conexao
+        try:
+            # Não devolver transação pendurada para o próximo usuário
+            if conexao.in_transaction:
+                conexao.rollback()
+            self._livres.put((conexao, emprestada.criada_em, time.monotonic()))
+        except Exception as e:
+            logger.warning(f"Descartando conexão com erro ao devolver ao pool: {e}")
+            self._descartar(conexao)
+
+    def fechar(self):
+        """Fechar todas as conexões livres"""
+        while True:
+            try:
+                conexao, _, _ = self._livres.get_nowait()
+            except queue.Empty:
+                break
+            self._descartar(conexao)
+
+    def estatisticas(self):
+        return {
+            'tamanho': self.tamanho,
+            'abertas': self._total,
+            'livres': self._livres.qsize(),
+            'conexoes_criadas': self.conexoes_criadas,
+            'conexoes_recicladas': self.conexoes_recicladas,
+            'emprestimos': self.emprestimos
+        }
+
+class _ConexaoEmprestada:
+    """Conexão emprestada do pool junto com o instante em que foi criada"""
+
+    def __init__(self, conexao, criada_em):
+        self.conexao = conexao
+        self.criada_em = criada_em
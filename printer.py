@@ -304,8 +304,8 @@ class PrinterManager:
         """Marcar comprovante como impresso no banco"""
         try:
             if venda_id:
-                from database import Database
-                db = Database()
+                from database import obter_database
+                db = obter_database()
                 db.execute_query(
                     "UPDATE pagamentos SET comprovante_impresso = TRUE WHERE venda_id = %s",
                     (venda_id,)
@@ -753,6 +753,106 @@ async function apiRequest(url, options = {}) {
     }
 }
 
+// Percorrer uma listagem paginada por cursor (next_cursor), entregando
+// cada página assim que chega; chave é o campo da lista ('clientes', 'vendas')
+async function carregarPaginado(url, chave, aoReceberPagina, limite = 200) {
+    let cursor = null;
+
+    do {
+        const params = new URLSearchParams({ limite: limite });
+        if (cursor) params.append('after', cursor);
+
+        const separador = url.includes('?') ? '&' : '?';
+        const data = await apiRequest(`${url}${separador}${params}`);
+
+        if (!data.sucesso) {
+            throw new Error(data.erro || 'Erro ao carregar dados');
+        }
+
+        aoReceberPagina(data[chave]);
+        cursor = data.next_cursor;
+    } while (cursor);
+}
+
+// POST com Idempotency-Key e novas tentativas automáticas (Wi-Fi instável):
+// a mesma chave vai em todas as tentativas, então o servidor executa a
+// operação uma única vez e as repetições recebem a resposta original
+async function enviarComRetentativa(url, dados, tentativas = 4) {
+    const chave = (window.crypto && crypto.randomUUID) ? crypto.randomUUID() : gerarId();
+    let ultimoErro = null;
+
+    for (let tentativa = 1; tentativa <= tentativas; tentativa++) {
+        try {
+            const response = await fetch(url, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'Idempotency-Key': chave
+                },
+                body: JSON.stringify(dados)
+            });
+
+            // 409: tentativa anterior ainda em processamento; 5xx: falha passageira
+            if (response.status !== 409 && response.status < 500) {
+                return await response.json();
+            }
+            ultimoErro = new Error(`HTTP ${response.status}: ${response.statusText}`);
+        } catch (error) {
+            // Sem resposta: a requisição pode ou não ter chegado ao servidor
+            ultimoErro = error;
+        }
+
+        if (tentativa < tentativas) {
+            await sleep(500 * 2 ** (tentativa - 1));
+        }
+    }
+
+    throw ultimoErro;
+}
+
+// Relatório gerado em segundo plano: cria a exportação (POST /api/exports),
+// acompanha o progresso e inicia o download quando o arquivo fica pronto
+async function exportarEmSegundoPlano(tipo, formato, filtros = {}, aoProgredir = null) {
+    const criada = await enviarComRetentativa('/api/exports', { tipo, formato, filtros });
+    if (!criada.sucesso) {
+        throw new Error(criada.erro || 'Erro ao criar exportação');
+    }
+
+    while (true) {
+        await sleep(1000);
+
+        const data = await apiRequest(criada.url_status);
+        if (!data.sucesso) {
+            throw new Error(data.erro || 'Erro ao consultar exportação');
+        }
+
+        const exportacao = data.exportacao;
+        if (aoProgredir) aoProgredir(exportacao);
+
+        if (exportacao.status === 'concluida') {
+            window.location.href = exportacao.url_download;
+            return exportacao;
+        }
+        if (exportacao.status === 'erro') {
+            throw new Error(exportacao.erro || 'Erro ao gerar o arquivo');
+        }
+    }
+}
+
+// Sugestões de clientes para seletores (typeahead): { q, id, comSaldo, limite }
+async function buscarSugestoesClientes(opcoes = {}) {
+    const params = new URLSearchParams({ limite: opcoes.limite || 10 });
+    if (opcoes.q) params.append('q', opcoes.q);
+    if (opcoes.id) params.append('id', opcoes.id);
+    if (opcoes.comSaldo) params.append('com_saldo', '1');
+
+    const data = await apiRequest(`/api/clientes/sugestoes?${params}`);
+    if (!data.sucesso) {
+        throw new Error(data.erro || 'Erro ao buscar clientes');
+    }
+    return data.clientes;
+}
+
 // ========================================
 // SHORTCUTS DE TECLADO
 // ========================================
@@ -813,10 +913,10 @@ if ('IntersectionObserver' in window) {
 if ('serviceWorker' in navigator) {
     window.addEventListener('load', () => {
         // Primeiro verificar se o service worker existe
-        fetch('/static/sw.js')
+        fetch('/sw.js')
             .then(response => {
                 if (response.ok) {
-                    return navigator.serviceWorker.register('/static/sw.js');
+                    return navigator.serviceWorker.register('/sw.js');
                 } else {
                     console.log('Service Worker não encontrado, continuando sem cache offline');
                     return null;
@@ -859,6 +959,10 @@ window.SistemaAcougue = {
     validarEmail,
     navegarPara,
     apiRequest,
+    carregarPaginado,
+    enviarComRetentativa,
+    exportarEmSegundoPlano,
+    buscarSugestoesClientes,
     trackEvent
 };
 
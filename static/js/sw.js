@@ -2,7 +2,15 @@
 // SERVICE WORKER BÁSICO - Sistema de Crediário
 // ===================================================================
 
-const CACHE_NAME = 'acougue-sistema-v1.0.0';
+const CACHE_NAME = 'acougue-sistema-v1.1.0';
+const API_CACHE_NAME = 'acougue-api-v1';
+
+// Leituras da API que respondem com ETag (ver responder_com_etag em cache.py)
+const API_COM_ETAG = [
+    /^\/api\/vendas\/\d+$/,
+    /^\/api\/clientes\/\d+$/,
+    /^\/api\/pagamentos\/vendas-em-aberto\/\d+$/
+];
 const urlsToCache = [
     '/',
     '/static/css/style.css',
@@ -40,7 +48,7 @@ self.addEventListener('activate', event => {
             return Promise.all(
                 cacheNames.map(cacheName => {
                     // Remover caches antigos
-                    if (cacheName !== CACHE_NAME) {
+                    if (cacheName !== CACHE_NAME && cacheName !== API_CACHE_NAME) {
                         console.log('Service Worker: Removendo cache antigo:', cacheName);
                         return caches.delete(cacheName);
                     }
@@ -51,7 +59,48 @@ self.addEventListener('activate', event => {
 });
 
 // ===================================================================
-// INTERCEPTAÇÃO DE REQUISIÇÕES (ESTRATÉGIA CACHE FIRST)
+// API COM ETAG (REVALIDAÇÃO CONDICIONAL)
+// ===================================================================
+// Rotas de leitura que respondem com ETag: a cópia guardada é revalidada
+// com If-None-Match a cada acesso; 304 devolve a cópia sem baixar o JSON
+// de novo e, sem rede, a cópia é servida como está.
+function revalidarApi(request) {
+    return caches.open(API_CACHE_NAME).then(cache =>
+        cache.match(request).then(cached => {
+            const etag = cached && cached.headers.get('ETag');
+            const headers = new Headers(request.headers);
+            if (etag) {
+                headers.set('If-None-Match', etag);
+            }
+            
+            // no-store: a revalidação é feita aqui, não no cache HTTP do navegador
+            return fetch(request.url, {headers: headers, credentials: 'same-origin', cache: 'no-store'})
+                .then(response => {
+                    if (response.status === 304 && cached) {
+                        return cached;
+                    }
+                    
+                    if (response.status === 200 && response.headers.get('ETag')) {
+                        cache.put(request, response.clone());
+                    } else if (response.status === 200 || response.redirected) {
+                        // Sem ETag (erro ou sessão expirada): a cópia não vale mais
+                        cache.delete(request);
+                    }
+                    return response;
+                })
+                .catch(error => {
+                    if (cached) {
+                        console.log('Service Worker: Offline, servindo API do cache:', request.url);
+                        return cached;
+                    }
+                    throw error;
+                });
+        })
+    );
+}
+
+// ===================================================================
+// INTERCEPTAÇÃO DE REQUISIÇÕES
 // ===================================================================
 self.addEventListener('fetch', event => {
     // Só cachear GET requests
@@ -59,11 +108,33 @@ self.addEventListener('fetch', event => {
         return;
     }
     
-    // Não cachear requisições da API (para manter dados atualizados)
+    // API: só as rotas com ETag passam pelo service worker
     if (event.request.url.includes('/api/')) {
+        const url = new URL(event.request.url);
+        if (API_COM_ETAG.some(padrao => padrao.test(url.pathname))) {
+            event.respondWith(revalidarApi(event.request));
+        }
         return;
     }
     
+    // Páginas: rede primeiro (dados e sessão sempre atuais), cache só offline
+    if (event.request.mode === 'navigate') {
+        event.respondWith(
+            fetch(event.request)
+                .then(response => {
+                    if (response.status === 200 && response.type === 'basic' && !response.redirected) {
+                        const responseToCache = response.clone();
+                        caches.open(CACHE_NAME).then(cache => cache.put(event.request, responseToCache));
+                    }
+                    return response;
+                })
+                .catch(() => caches.match(event.request)
+                    .then(response => response || caches.match('/offline.html')))
+        );
+        return;
+    }
+    
+    // Arquivos estáticos: cache first
     event.respondWith(
         caches.match(event.request)
             .then(response => {
@@ -93,11 +164,6 @@ self.addEventListener('fetch', event => {
                     })
                     .catch(error => {
                         console.error('Service Worker: Erro na requisição:', error);
-                        
-                        // Retornar página offline personalizada se houver
-                        if (event.request.destination === 'document') {
-                            return caches.match('/offline.html');
-                        }
                     });
             })
     );
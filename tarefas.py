@@ -0,0 +1,388 @@
+import mysql.connector
+import threading
+import logging
+from datetime import datetime, timedelta
+
+from config import Config
+from database import Database
+from exportacoes import limpar_exportacoes_antigas
+from utils import criar_backup_mysql
+
+logger = logging.getLogger(__name__)
+
+class Tarefa:
+    """Tarefa periódica: a cada intervalo_segundos ou diariamente no horario 'HH:MM'"""
+
+    def __init__(self, nome, funcao, intervalo_segundos=None, horario=None, descricao=''):
+        if not intervalo_segundos and not horario:
+            raise ValueError(f"Tarefa {nome}: informe intervalo_segundos ou horario")
+
+        self.nome = nome
+        self.funcao = funcao
+        self.intervalo_segundos = intervalo_segundos
+        self.horario = horario
+        self.descricao = descricao
+
+        self.proxima_execucao = self._calcular_proxima(datetime.now(), primeira=True)
+        self.ultima_execucao = None
+        self.duracao_ms = None
+        self.ultimo_status = None
+        self.ultimo_erro = None
+        self.em_execucao = False
+
+    def _calcular_proxima(self, referencia, primeira=False):
+        if self.intervalo_segundos:
+            # Tarefas por intervalo rodam logo na primeira volta
+            if primeira:
+                return referencia
+            return referencia + timedelta(seconds=self.intervalo_segundos)
+
+        hora, minuto = (int(parte) for parte in self.horario.split(':'))
+        proxima = referencia.replace(hour=hora, minute=minuto, second=0, microsecond=0)
+        if proxima <= referencia:
+            proxima += timedelta(days=1)
+        return proxima
+
+    def executar(self):
+        inicio = datetime.now()
+        self.em_execucao = True
+        try:
+            self.funcao()
+            self.ultimo_status = 'ok'
+            self.ultimo_erro = None
+        except Exception as e:
+            logger.error(f"Erro na tarefa {self.nome}: {e}")
+            self.ultimo_status = 'erro'
+            self.ultimo_erro = str(e)
+        finally:
+            self.em_execucao = False
+
+        self.ultima_execucao = inicio
+        self.duracao_ms = int((datetime.now() - inicio).total_seconds() * 1000)
+        self.proxima_execucao = self._calcular_proxima(datetime.now())
+
+    def status(self):
+        return {
+            'nome': self.nome,
+            'descricao': self.descricao,
+            'intervalo_segundos': self.intervalo_segundos,
+            'horario': self.horario,
+            'em_execucao': self.em_execucao,
+            'proxima_execucao': self.proxima_execucao.isoformat() if self.proxima_execucao else None,
+            'ultima_execucao': self.ultima_execucao.isoformat() if self.ultima_execucao else None,
+            'duracao_ms': self.duracao_ms,
+            'status': self.ultimo_status,
+            'erro': self.ultimo_erro
+        }
+
+class Agendador:
+    """Executa tarefas periódicas em uma thread do próprio processo
+
+    Com vários workers da aplicação, só o que conseguir o lock consultivo
+    do MySQL (GET_LOCK) executa as tarefas; os demais ficam de reserva e
+    assumem se o líder cair (o lock é liberado quando a conexão fecha).
+    """
+
+    NOME_LOCK = 'acougue_agendador'
+
+    def __init__(self, intervalo_verificacao=30):
+        self.tarefas = {}
+        self.intervalo_verificacao = intervalo_verificacao
+        self.lider = False
+
+        self._conexao_lock = None
+        self._parar = threading.Event()
+        self._thread = None
+
+    def registrar(self, nome, funcao, intervalo_segundos=None, horario=None, descricao=''):
+        self.tarefas[nome] = Tarefa(nome, funcao, intervalo_segundos, horario, descricao)
+        return self.tarefas[nome]
+
+    def iniciar(self):
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._loop, name='agendador', daemon=True)
+        self._thread.start()
+        logger.info(f"Agendador iniciado com {len(self.tarefas)} tarefa(s)")
+
+    def parar(self):
+        self._parar.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        self._liberar_lideranca()
+
+    def _garantir_lideranca(self):
+        """Obter (ou confirmar) o lock consultivo de líder"""
+        if self._conexao_lock is not None:
+            try:
+                self._conexao_lock.ping(reconnect=False)
+                return True
+            except Exception:
+                logger.warning("Conexão do lock do agendador perdida")
+                self._liberar_lideranca()
+
+        try:
+            # Conexão própria, fora do pool: o lock vive enquanto ela estiver aberta
+            conexao = mysql.connector.connect(**Config.DATABASE_CONFIG)
+            cursor = conexao.cursor()
+            cursor.execute("SELECT GET_LOCK(%s, 0)", (self.NOME_LOCK,))
+            obtido = cursor.fetchone()[0] == 1
+            cursor.close()
+        except Exception as e:
+            logger.error(f"Erro ao obter lock do agendador: {e}")
+            return False
+
+        if not obtido:
+            conexao.close()
+            return False
+
+        self._conexao_lock = conexao
+        self.lider = True
+        logger.info("Agendador assumiu a liderança das tarefas")
+        return True
+
+    def _liberar_lideranca(self):
+        if self._conexao_lock is not None:
+            try:
+                self._conexao_lock.close()
+            except Exception:
+                pass
+        self._conexao_lock = None
+        self.lider = False
+
+    def _loop(self):
+        while not self._parar.is_set():
+            if self._garantir_lideranca():
+                for tarefa in list(self.tarefas.values()):
+                    if self._parar.is_set():
+                        break
+                    if datetime.now() >= tarefa.proxima_execucao:
+                        tarefa.executar()
+                        self._registrar_execucao(tarefa)
+
+            self._parar.wait(self._tempo_ate_proxima())
+
+    def _tempo_ate_proxima(self):
+        if not self.lider or not self.tarefas:
+            return self.intervalo_verificacao
+
+        proxima = min(tarefa.proxima_execucao for tarefa in self.tarefas.values())
+        segundos = (proxima - datetime.now()).total_seconds()
+        return max(1, min(segundos, self.intervalo_verificacao))
+
+    def _registrar_execucao(self, tarefa):
+        """Gravar o resultado no banco para que qualquer worker consiga exibir"""
+        db = None
+        try:
+            db = Database()
+            db.registrar_execucao_tarefa(
+                tarefa.nome,
+                tarefa.ultima_execucao,
+                tarefa.duracao_ms,
+                tarefa.ultimo_status,
+                tarefa.ultimo_erro
+            )
+        except Exception as e:
+            logger.error(f"Erro ao registrar execução da tarefa {tarefa.nome}: {e}")
+        finally:
+            if db:
+                db.disconnect()
+
+    def status(self):
+        """Situação das tarefas, com a última execução gravada por qualquer worker"""
+        execucoes = {}
+        db = None
+        try:
+            db = Database()
+            execucoes = {e['nome']: e for e in db.buscar_execucoes_tarefas()}
+        except Exception as e:
+            logger.error(f"Erro ao buscar execuções das tarefas: {e}")
+        finally:
+            if db:
+                db.disconnect()
+
+        resultado = []
+        for tarefa in self.tarefas.values():
+            item = tarefa.status()
+            execucao = execucoes.get(tarefa.nome)
+            if execucao and not tarefa.ultima_execucao:
+                item['ultima_execucao'] = execucao['ultima_execucao'].isoformat() if execucao['ultima_execucao'] else None
+                item['duracao_ms'] = execucao['duracao_ms']
+                item['status'] = execucao['status']
+                item['erro'] = execucao['erro']
+            item['total_execucoes'] = execucao['total_execucoes'] if execucao else 0
+            resultado.append(item)
+
+        return resultado
+
+# TAREFAS
+def varrer_vendas_vencidas():
+    """Marcar vendas em aberto além do prazo como vencidas"""
+    db = Database()
+    try:
+        total = db.marcar_vendas_vencidas()
+        if total:
+            logger.info(f"{total} venda(s) marcada(s) como vencida(s)")
+        return total
+    finally:
+        db.disconnect()
+
+def arquivar_logs_antigos():
+    """Criar as partições dos próximos meses e arquivar os logs fora do prazo
+
+    Os logs com mais de retencao_logs_dias vão para BACKUP_FOLDER em JSONL
+    compactado (um arquivo por mês) e saem da tabela.
+    """
+    db = Database()
+    try:
+        db.garantir_particoes_logs()
+        arquivados = db.arquivar_logs_antigos(Config.TAREFAS_CONFIG['retencao_logs_dias'], Config.BACKUP_FOLDER)
+        total = sum(item['registros'] for item in arquivados)
+        if total:
+            logger.info(f"{total} registro(s) de log arquivado(s) em {len(arquivados)} arquivo(s)")
+        return arquivados
+    finally:
+        db.disconnect()
+
+def limpar_chaves_idempotencia():
+    """Apagar chaves de idempotência fora do prazo de retentativa"""
+    db = Database()
+    try:
+        return db.limpar_chaves_idempotencia(Config.TAREFAS_CONFIG['retencao_chaves_idempotencia_horas'])
+    finally:
+        db.disconnect()
+
+def arquivar_vendas_pagas():
+    """Mover para as tabelas *_arquivo as vendas pagas há mais de arquivo_vendas_pagas_dias"""
+    db = Database()
+    try:
+        total = db.arquivar_vendas_pagas(Config.TAREFAS_CONFIG['arquivo_vendas_pagas_dias'])
+        if total:
+            logger.info(f"{total} venda(s) paga(s) movida(s) para o arquivo")
+        return total
+    finally:
+        db.disconnect()
+
+def limpar_exportacoes():
+    """Apagar exportações e arquivos de EXPORT_FOLDER fora do prazo de retenção"""
+    db = Database()
+    try:
+        removidos = limpar_exportacoes_antigas(db, Config.EXPORTACOES_CONFIG['retencao_horas'])
+        if removidos:
+            logger.info(f"{removidos} arquivo(s) de exportação removido(s)")
+        return removidos
+    finally:
+        db.disconnect()
+
+def recalcular_saldos_clientes():
+    """Conferir a tabela saldos_clientes com as vendas em aberto"""
+    db = Database()
+    try:
+        return db.recalcular_saldos_clientes()
+    finally:
+        db.disconnect()
+
+def reconstruir_vendas_diarias(data_inicio=None):
+    """Backfill do resumo diário de vendas/pagamentos"""
+    db = Database()
+    try:
+        db.reconstruir_vendas_diarias(data_inicio)
+    finally:
+        db.disconnect()
+
+def reindexar_busca_clientes():
+    """Reconstruir o índice de busca de clientes (clientes_busca)"""
+    db = Database()
+    try:
+        return db.reindexar_busca_clientes()
+    finally:
+        db.disconnect()
+
+def backup_noturno():
+    """Backup diário do banco com mysqldump"""
+    sucesso, resultado = criar_backup_mysql(Config.DATABASE_CONFIG, Config.BACKUP_FOLDER)
+    if not sucesso:
+        raise Exception(f"Erro ao criar backup: {resultado}")
+
+    db = Database()
+    try:
+        db.inserir_log('BACKUP_CRIADO', f"Backup automático: {resultado}")
+    finally:
+        db.disconnect()
+    return resultado
+
+def criar_agendador():
+    """Agendador com as tarefas de manutenção do sistema"""
+    tarefas_config = Config.TAREFAS_CONFIG
+    agendador = Agendador()
+
+    agendador.registrar(
+        'varredura_vencidas', varrer_vendas_vencidas,
+        intervalo_segundos=tarefas_config['intervalo_varredura_vencidas'],
+        descricao='Marcar vendas em aberto além do prazo como vencidas'
+    )
+    agendador.registrar(
+        'retencao_logs', arquivar_logs_antigos,
+        horario=tarefas_config['horario_limpeza_logs'],
+        descricao=f"Arquivar em {Config.BACKUP_FOLDER}/ os logs com mais de {tarefas_config['retencao_logs_dias']} dias"
+    )
+    agendador.registrar(
+        'limpeza_idempotencia', limpar_chaves_idempotencia,
+        horario=tarefas_config['horario_limpeza_logs'],
+        descricao=f"Remover chaves de idempotência com mais de {tarefas_config['retencao_chaves_idempotencia_horas']} horas"
+    )
+    agendador.registrar(
+        'limpeza_exportacoes', limpar_exportacoes,
+        intervalo_segundos=tarefas_config['intervalo_limpeza_exportacoes'],
+        descricao=f"Remover de {Config.EXPORT_FOLDER}/ os arquivos com mais de {Config.EXPORTACOES_CONFIG['retencao_horas']} horas"
+    )
+    agendador.registrar(
+        'recalculo_saldos', recalcular_saldos_clientes,
+        horario=tarefas_config['horario_recalculo_saldos'],
+        descricao='Reconstruir os saldos materializados dos clientes'
+    )
+    agendador.registrar(
+        'arquivo_vendas', arquivar_vendas_pagas,
+        horario=tarefas_config['horario_arquivo_vendas'],
+        descricao=f"Arquivar vendas pagas com mais de {tarefas_config['arquivo_vendas_pagas_dias']} dias"
+    )
+    agendador.registrar(
+        'backup_noturno', backup_noturno,
+        horario=tarefas_config['horario_backup'],
+        descricao='Backup diário do banco (mysqldump)'
+    )
+
+    return agendador
+
+agendador = criar_agendador()
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Tarefas de manutenção do sistema')
+    parser.add_argument('--reconstruir-vendas-diarias', action='store_true',
+                        help='Recalcular a tabela vendas_diarias a partir de vendas e pagamentos')
+    parser.add_argument('--desde', help='Data inicial (AAAA-MM-DD) para o recálculo; padrão: todo o histórico')
+    parser.add_argument('--reindexar-busca-clientes', action='store_true',
+                        help='Reconstruir o índice de busca (typeahead) de clientes')
+    parser.add_argument('--arquivar-logs', action='store_true',
+                        help='Arquivar agora os logs fora do prazo de retenção')
+    parser.add_argument('--arquivar-vendas', action='store_true',
+                        help='Mover agora as vendas pagas antigas para as tabelas de arquivo')
+    args = parser.parse_args()
+
+    if args.reconstruir_vendas_diarias:
+        data_inicio = datetime.strptime(args.desde, '%Y-%m-%d').date() if args.desde else None
+        reconstruir_vendas_diarias(data_inicio)
+        print("Resumo diário de vendas reconstruído")
+    elif args.reindexar_busca_clientes:
+        total = reindexar_busca_clientes()
+        print(f"Índice de busca reconstruído para {total} cliente(s)")
+    elif args.arquivar_logs:
+        for item in arquivar_logs_antigos():
+            print(f"{item['arquivo']}: {item['registros']} registro(s)")
+    elif args.arquivar_vendas:
+        print(f"{arquivar_vendas_pagas()} venda(s) arquivada(s)")
+    else:
+        parser.print_help()
@@ -0,0 +1,97 @@
+"""
+Fixtures comuns dos testes
+
+Os testes não precisam de MySQL: o Database real é usado com uma conexão
+falsa, que registra os comandos e desfaz em rollback o que o teste
+registrou em `ao_desfazer`.
+"""
+
+import os
+import sys
+
+import pytest
+from flask import Flask
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+
+class CursorFalso:
+    """Cursor que devolve as linhas de `conexao.responder(query, params)`"""
+
+    def __init__(self, conexao):
+        self.conexao = conexao
+        self.with_rows = False
+        self.lastrowid = None
+        self.rowcount = 0
+        self._linhas = []
+
+    def execute(self, query, params=()):
+        self.conexao.comandos.append((' '.join(query.split()), tuple(params)))
+        linhas = self.conexao.responder(query, params)
+        self.with_rows = linhas is not None
+        self._linhas = list(linhas or [])
+        self.rowcount = len(self._linhas)
+
+    def executemany(self, query, lista_params):
+        lista_params = [tuple(params) for params in lista_params]
+        self.conexao.comandos.append((' '.join(query.split()), lista_params))
+        self.conexao.responder(query, lista_params)
+        self.with_rows = False
+        self.rowcount = len(lista_params)
+
+    def fetchall(self):
+        linhas, self._linhas = self._linhas, []
+        return linhas
+
+    def close(self):
+        pass
+
+class ConexaoFalsa:
+    def __init__(self):
+        self.comandos = []
+        self.ao_desfazer = []
+        self.unread_result = False
+        # Consultas que devolvem linhas: função (query, params) -> lista ou None
+        self.responder = lambda query, params: None
+
+    def start_transaction(self):
+        self.comandos.append(('START TRANSACTION', ()))
+        self.ao_desfazer = []
+
+    def commit(self):
+        self.comandos.append(('COMMIT', ()))
+        self.ao_desfazer = []
+
+    def rollback(self):
+        self.comandos.append(('ROLLBACK', ()))
+        desfazer, self.ao_desfazer = self.ao_desfazer, []
+        for funcao in reversed(desfazer):
+            funcao()
+
+    def cursor(self, **kwargs):
+        return CursorFalso(self)
+
+    def close(self):
+        pass
+
+def _conectar_falso(self):
+    self.connection = ConexaoFalsa()
+    self.cursor = self.connection.cursor(dictionary=True)
+
+@pytest.fixture
+def conectar_sem_mysql(monkeypatch):
+    """Database() passa a usar ConexaoFalsa em vez do pool"""
+    monkeypatch.setattr(Database, 'connect', _conectar_falso)
+
+@pytest.fixture
+def banco(conectar_sem_mysql):
+    db = Database()
+    yield db
+    db.disconnect()
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['TESTING'] = True
+    return app
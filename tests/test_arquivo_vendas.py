@@ -0,0 +1,37 @@
+from datetime import date, timedelta
+
+import pytest
+
+import database
+
+@pytest.fixture
+def arquivo(banco, monkeypatch):
+    """Corte do arquivamento em 730 dias"""
+    monkeypatch.setitem(database.Config.TAREFAS_CONFIG, 'arquivo_vendas_pagas_dias', 730)
+
+    def responder(query, params):
+        query = ' '.join(query.split())
+        if query.startswith('SELECT COUNT(*)'):
+            return [{'total': 0}]
+        if query.startswith('SELECT'):
+            return []
+        return None
+
+    banco.connection.responder = responder
+    return date.today() - timedelta(days=730)
+
+def _consultas_com_arquivo(banco):
+    return [query for query, _ in banco.connection.comandos if 'FROM vendas_arquivo v' in query]
+
+def test_arquivo_sem_consultar_o_banco(banco, arquivo):
+    banco.buscar_vendas({'status': 'paga'}, limite=10)
+    banco.contar_vendas({'data_inicio': arquivo.isoformat()})
+    list(banco.iterar_vendas({}, lote=10))
+
+    assert len(_consultas_com_arquivo(banco)) == 3
+    assert not any('MAX(data_venda)' in query for query, _ in banco.connection.comandos)
+
+def test_filtro_depois_do_corte_nao_une_o_arquivo(banco, arquivo):
+    banco.buscar_vendas({'data_inicio': (arquivo + timedelta(days=1)).isoformat()})
+    banco.buscar_vendas({'status': 'aberta'})
+    assert _consultas_com_arquivo(banco) == []
@@ -0,0 +1,102 @@
+import time
+
+import pytest
+
+import cache
+import database
+from cache import CacheMemoria, CacheSQLite, CacheRespostas, cache_resposta
+
+@pytest.fixture
+def respostas(monkeypatch):
+    """cache_respostas novo (em memória) para o decorador e para o Database"""
+    novo = CacheRespostas(CacheMemoria(), ttl_segundos=60)
+    monkeypatch.setattr(cache, 'cache_respostas', novo)
+    monkeypatch.setattr(database, 'cache_respostas', novo)
+    return novo
+
+def test_memoria_expira_e_descarta_o_menos_usado():
+    backend = CacheMemoria(max_itens=2)
+    backend.definir('a', 1, 60)
+    backend.definir('b', 2, 60)
+    backend.obter('a')
+    backend.definir('c', 3, 60)
+
+    assert backend.obter('b') is None
+    assert backend.obter('a') == 1
+
+    backend.definir('d', 4, -1)
+    assert backend.obter('d') is None
+
+def test_obter_ou_calcular_so_guarda_sucesso():
+    respostas = CacheRespostas(CacheMemoria())
+    chamadas = []
+
+    def calcular():
+        chamadas.append(1)
+        return {'sucesso': len(chamadas) > 1}
+
+    assert respostas.obter_ou_calcular('k', calcular) == {'sucesso': False}
+    assert respostas.obter_ou_calcular('k', calcular) == {'sucesso': True}
+    assert respostas.obter_ou_calcular('k', calcular) == {'sucesso': True}
+    assert len(chamadas) == 2
+    assert (respostas.acertos, respostas.faltas) == (1, 2)
+
+def test_invalidar_recalcula():
+    respostas = CacheRespostas(CacheMemoria())
+    valores = iter([{'sucesso': True, 'n': 1}, {'sucesso': True, 'n': 2}])
+
+    assert respostas.obter_ou_calcular('k', lambda: next(valores))['n'] == 1
+    respostas.invalidar()
+    assert respostas.obter_ou_calcular('k', lambda: next(valores))['n'] == 2
+    assert respostas.estatisticas()['invalidacoes'] == 1
+
+def test_sqlite_invalidacao_vale_para_outros_processos(tmp_path):
+    caminho = str(tmp_path / 'respostas.sqlite3')
+    worker_a = CacheSQLite(caminho)
+    worker_b = CacheSQLite(caminho)
+
+    worker_a.definir('k', {'sucesso': True}, 60)
+    assert worker_b.obter('k') == {'sucesso': True}
+
+    worker_b.limpar()
+    assert worker_a.obter('k') is None
+
+def test_gravacao_invalida_so_depois_do_commit(banco, respostas):
+    respostas.obter_ou_calcular('k', lambda: {'sucesso': True})
+
+    with banco.transaction():
+        banco._dados_alterados()
+        assert respostas.backend.tamanho() == 1
+
+    assert respostas.backend.tamanho() == 0
+    assert respostas.invalidacoes == 1
+
+def test_rollback_nao_invalida(banco, respostas):
+    respostas.obter_ou_calcular('k', lambda: {'sucesso': True})
+
+    with pytest.raises(RuntimeError):
+        with banco.transaction():
+            banco._dados_alterados()
+            raise RuntimeError('falhou')
+
+    assert respostas.backend.tamanho() == 1
+    assert respostas.invalidacoes == 0
+
+def test_decorador_devolve_os_mesmos_bytes(app, respostas):
+    chamadas = []
+
+    @app.route('/api/dashboard')
+    @cache_resposta()
+    def dashboard():
+        chamadas.append(1)
+        return {'sucesso': True, 'total': len(chamadas), 'hora': time.time()}
+
+    cliente = app.test_client()
+    primeira = cliente.get('/api/dashboard?b=2&a=1')
+    segunda = cliente.get('/api/dashboard?a=1&b=2')
+
+    assert primeira.data == segunda.data
+    assert len(chamadas) == 1
+
+    respostas.invalidar()
+    assert cliente.get('/api/dashboard?a=1&b=2').get_json()['total'] == 2
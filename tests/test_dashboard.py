@@ -0,0 +1,33 @@
+import pytest
+
+import business
+from business import DashboardBusiness
+
+ALERTA_VENCIDAS = {'tipo': 'vendas_vencidas', 'titulo': '1 venda(s) vencida(s)', 'urgencia': 'alta',
+                   'dados': [{'id': 5, 'cliente_nome': 'Ana'}]}
+
+@pytest.fixture
+def secoes(conectar_sem_mysql, monkeypatch):
+    """Seções do dashboard falsas; registra a conexão recebida por cada uma"""
+    conexoes = {}
+
+    def secao(nome, resultado):
+        def executar(*args, db=None):
+            conexoes[nome] = db
+            return resultado
+        return staticmethod(executar)
+
+    monkeypatch.setattr(business.VendaBusiness, 'get_estatisticas_dashboard',
+                        secao('estatisticas', {'sucesso': True, 'estatisticas': {'total_clientes': 3}}))
+    monkeypatch.setattr(business.ClienteBusiness, 'get_alertas_inadimplencia',
+                        secao('alertas', {'sucesso': True, 'alertas': [ALERTA_VENCIDAS]}))
+    monkeypatch.setattr(business.RelatoriosBusiness, 'get_dados_graficos',
+                        secao('graficos', {'sucesso': False, 'erro': 'Erro interno do sistema'}))
+    return conexoes
+
+def test_alertas_com_a_lista_de_vencidas(secoes):
+    dados = DashboardBusiness.get_dados_dashboard(30)
+
+    assert dados == {'sucesso': True, 'estatisticas': {'total_clientes': 3}, 'alertas': [ALERTA_VENCIDAS],
+                     'graficos': None}
+    assert len({id(db) for db in secoes.values()}) == 3
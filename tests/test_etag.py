@@ -0,0 +1,63 @@
+from cache import responder_com_etag
+
+def _rota_venda(app, versoes, chamadas):
+    @app.route('/api/vendas/<int:venda_id>')
+    def venda(venda_id):
+        def calcular():
+            chamadas.append(venda_id)
+            return {'sucesso': venda_id != 404, 'venda': {'id': venda_id}}
+        return responder_com_etag(versoes.get(venda_id), calcular)
+
+def test_etag_e_304(app):
+    versoes = {1: ('2025-01-01 10:00:00', 2)}
+    chamadas = []
+    _rota_venda(app, versoes, chamadas)
+    cliente = app.test_client()
+
+    resposta = cliente.get('/api/vendas/1')
+    etag = resposta.headers['ETag']
+    assert resposta.status_code == 200
+    assert resposta.headers['Cache-Control'] == 'private, no-cache'
+
+    repetida = cliente.get('/api/vendas/1', headers={'If-None-Match': etag})
+    assert repetida.status_code == 304
+    assert repetida.data == b''
+    assert repetida.headers['ETag'] == etag
+    assert chamadas == [1]
+
+def test_etag_muda_com_a_versao(app):
+    versoes = {1: ('2025-01-01 10:00:00', 2)}
+    chamadas = []
+    _rota_venda(app, versoes, chamadas)
+    cliente = app.test_client()
+    etag = cliente.get('/api/vendas/1').headers['ETag']
+
+    versoes[1] = ('2025-01-01 10:05:00', 3)
+    resposta = cliente.get('/api/vendas/1', headers={'If-None-Match': etag})
+
+    assert resposta.status_code == 200
+    assert resposta.headers['ETag'] != etag
+    assert chamadas == [1, 1]
+
+def test_sem_versao_ou_sem_sucesso_nao_tem_etag(app):
+    versoes = {404: ('x',)}
+    _rota_venda(app, versoes, [])
+    cliente = app.test_client()
+
+    assert 'ETag' not in cliente.get('/api/vendas/2').headers
+    assert 'ETag' not in cliente.get('/api/vendas/404').headers
+
+def test_versao_da_venda_muda_com_o_comprovante_impresso(banco):
+    venda = {'updated_at': '2025-01-01 10:00:00', 'valor_pago': 10, 'status': 'aberta',
+             'cliente_updated_at': '2024-12-01 08:00:00', 'pagamentos': 2, 'comprovantes_impressos': 1}
+
+    def responder(query, params):
+        if 'comprovante_impresso' not in query:
+            return [{chave: valor for chave, valor in venda.items() if chave != 'comprovantes_impressos'}]
+        return [dict(venda)]
+
+    banco.connection.responder = responder
+    antes = banco.versao_venda(1)
+    venda['comprovantes_impressos'] = 2
+
+    assert banco.versao_venda(1) != antes
@@ -0,0 +1,41 @@
+from datetime import datetime
+
+from utils import gerar_csv
+
+COLUNAS = ['Cliente', 'Data', 'Valor Total']
+
+def _linhas(quantidade):
+    for numero in range(1, quantidade + 1):
+        yield {'Cliente': f'Cliente {numero}', 'Data': datetime(2025, 1, numero, 8, 30),
+               'Valor Total': 1234.5 * numero}
+
+def test_csv_cabecalho_e_formatacao():
+    conteudo = ''.join(gerar_csv(_linhas(1), COLUNAS))
+
+    assert conteudo.splitlines() == [
+        'Cliente;Data;Valor Total',
+        'Cliente 1;01/01/2025 08:30;R$ 1.234,50'
+    ]
+
+def test_csv_em_blocos():
+    blocos = list(gerar_csv(_linhas(5), COLUNAS, linhas_por_bloco=2))
+
+    assert len(blocos) == 3
+    assert blocos[0].startswith('Cliente;Data;Valor Total')
+    assert [len(bloco.splitlines()) for bloco in blocos] == [3, 2, 1]
+    assert ''.join(blocos).splitlines()[-1] == 'Cliente 5;05/01/2025 08:30;R$ 6.172,50'
+
+def test_csv_consome_linhas_sob_demanda():
+    consumidas = []
+
+    def linhas():
+        for linha in _linhas(4):
+            consumidas.append(linha)
+            yield linha
+
+    blocos = gerar_csv(linhas(), COLUNAS, linhas_por_bloco=2)
+    next(blocos)
+    assert len(consumidas) == 2
+
+def test_csv_sem_linhas_tem_so_cabecalho():
+    assert ''.join(gerar_csv([], COLUNAS)) == 'Cliente;Data;Valor Total\r\n'
@@ -0,0 +1,52 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+from openpyxl import load_workbook
+
+from utils import exportar_para_excel, FORMATO_MOEDA_EXCEL, FORMATO_DATA_EXCEL, FORMATO_DATA_HORA_EXCEL
+
+COLUNAS = ['Cliente', 'Data', 'Valor Total']
+
+def _linhas(quantidade):
+    for numero in range(1, quantidade + 1):
+        yield {'Cliente': f'Cliente {numero}', 'Data': datetime(2025, 1, numero, 8, 30),
+               'Valor Total': 1234.5 * numero}
+
+def test_excel_valores_e_formatos(tmp_path):
+    dados = [
+        {'Cliente': 'Ana', 'Data': datetime(2025, 1, 2, 9, 0), 'Valor Total': Decimal('10.50'),
+         'Vencimento': date(2025, 2, 2), 'Itens': 3},
+        {'Cliente': 'Bruno', 'Data': datetime(2025, 1, 3, 10, 0), 'Valor Total': 7.25,
+         'Vencimento': None, 'Itens': 1}
+    ]
+
+    sucesso, caminho = exportar_para_excel(dados, 'vendas.xlsx', 'Vendas', pasta=str(tmp_path))
+
+    assert sucesso
+    planilha = load_workbook(caminho)['Vendas']
+    linhas = list(planilha.iter_rows(values_only=True))
+    assert linhas[0] == ('Cliente', 'Data', 'Valor Total', 'Vencimento', 'Itens')
+    assert linhas[1] == ('Ana', datetime(2025, 1, 2, 9, 0), 10.5, datetime(2025, 2, 2), 3)
+    assert linhas[2][:3] == ('Bruno', datetime(2025, 1, 3, 10, 0), 7.25)
+
+    assert planilha['A1'].font.bold
+    assert planilha['B2'].number_format == FORMATO_DATA_HORA_EXCEL
+    assert planilha['C2'].number_format == FORMATO_MOEDA_EXCEL
+    assert planilha['D2'].number_format == FORMATO_DATA_EXCEL
+    # Números fora de colunas de valor não recebem formato de moeda
+    assert planilha['E2'].number_format == 'General'
+
+def test_excel_gerador_maior_que_a_amostra(tmp_path):
+    sucesso, caminho = exportar_para_excel(_linhas(30), 'grande.xlsx', colunas=COLUNAS,
+                                           linhas_amostra=5, pasta=str(tmp_path))
+
+    assert sucesso
+    planilha = load_workbook(caminho)['Dados']
+    assert planilha.max_row == 31
+    assert planilha['A31'].value == 'Cliente 30'
+    # Largura medida na amostra: maior entre cabeçalho e valores, + 2
+    assert planilha.column_dimensions['B'].width == 18
+
+def test_excel_sem_dados(tmp_path):
+    assert exportar_para_excel(iter([]), 'vazio.xlsx', pasta=str(tmp_path)) == (False, 'Nenhum dado para exportar')
+    assert not (tmp_path / 'vazio.xlsx').exists()
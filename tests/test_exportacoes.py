@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+import business
+import exportacoes
+from exportacoes import (_dados_inadimplentes, marcar_exportacoes_interrompidas, ExportacaoInvalida,
+                         ERRO_INTERROMPIDA, DONO_PROCESSO, PREFIXO_LOCK_DONO)
+
+class BancoVencidas:
+    def __init__(self, vendas):
+        self.vendas = vendas
+
+    def buscar_vendas_vencidas(self):
+        return self.vendas
+
+@pytest.fixture
+def sem_conexao_do_request(monkeypatch):
+    def obter_database():
+        raise AssertionError('o relatório deve usar a conexão da exportação')
+    monkeypatch.setattr(business, 'obter_database', obter_database)
+
+def _venda(venda_id, cliente_id, nome, valor, dias):
+    return {'id': venda_id, 'cliente_id': cliente_id, 'cliente_nome': nome, 'cliente_telefone': None,
+            'data_venda': datetime.now() - timedelta(days=dias), 'valor_restante': Decimal(valor)}
+
+def test_inadimplentes_usa_a_conexao_da_exportacao(sem_conexao_do_request):
+    db = BancoVencidas([_venda(1, 1, 'Ana', '10.00', 40), _venda(2, 2, 'Bruno', '50.00', 35),
+                        _venda(3, 1, 'Ana', '5.50', 60)])
+
+    total, linhas, colunas, planilha = _dados_inadimplentes(db, {})
+
+    linhas = list(linhas)
+    assert (total, planilha) == (2, 'Inadimplentes')
+    assert colunas == list(linhas[0].keys())
+    assert [(linha['Cliente'], linha['Valor Total Devido'], linha['Quantidade Vendas']) for linha in linhas] == [
+        ('Bruno', Decimal('50.00'), 1), ('Ana', Decimal('15.50'), 2)
+    ]
+
+def test_inadimplentes_sem_dados(sem_conexao_do_request):
+    with pytest.raises(ExportacaoInvalida):
+        _dados_inadimplentes(BancoVencidas([]), {})
+
+def test_so_exportacoes_de_donos_encerrados_viram_erro(banco, monkeypatch):
+    monkeypatch.setattr(exportacoes, '_garantir_lock_dono', lambda: True)
+    locks_livres = {PREFIXO_LOCK_DONO + 'encerrado': 1, PREFIXO_LOCK_DONO + 'ativo': 0}
+
+    def responder(query, params):
+        if query.startswith('SELECT DISTINCT dono FROM exportacoes'):
+            return [{'dono': dono} for dono in (None, 'encerrado', 'ativo', DONO_PROCESSO)]
+        if query.startswith('SELECT IS_FREE_LOCK'):
+            return [{'livre': locks_livres[params[0]]}]
+        return None
+
+    banco.connection.responder = responder
+    marcar_exportacoes_interrompidas(banco)
+
+    consultados = [params[0] for query, params in banco.connection.comandos if 'IS_FREE_LOCK' in query]
+    assert sorted(consultados) == [PREFIXO_LOCK_DONO + 'ativo', PREFIXO_LOCK_DONO + 'encerrado']
+
+    [(query, params)] = [comando for comando in banco.connection.comandos
+                         if comando[0].startswith("UPDATE exportacoes SET status = 'erro'")]
+    assert "WHERE status IN ('pendente', 'processando') AND (dono IN (%s) OR dono IS NULL)" in query
+    assert params == (ERRO_INTERROMPIDA, 'encerrado')
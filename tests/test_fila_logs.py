@@ -0,0 +1,48 @@
+import os
+from datetime import datetime
+
+import pytest
+
+from fila_logs import FilaLogs
+
+class BancoLogs:
+    def __init__(self, falhar_no_lote=None):
+        self.lotes = []
+        self.falhar_no_lote = falhar_no_lote
+
+    def inserir_logs_lote(self, registros):
+        if len(self.lotes) + 1 == self.falhar_no_lote:
+            raise RuntimeError('conexão perdida')
+        self.lotes.append([registro[1] for registro in registros])
+
+@pytest.fixture
+def fila(tmp_path):
+    fila = FilaLogs(lambda: None, lote=2, arquivo_pendentes=str(tmp_path / 'pendentes.jsonl'))
+    momento = datetime(2025, 1, 1, 12, 0)
+    fila._gravar_arquivo([('LOGIN', f'registro {numero}', 'sistema', None, momento) for numero in range(1, 6)])
+    return fila
+
+def test_regravacao_interrompida_retoma_sem_duplicar(fila, tmp_path):
+    com_falha = BancoLogs(falhar_no_lote=2)
+    with pytest.raises(RuntimeError):
+        fila._reprocessar_arquivo(com_falha)
+    assert com_falha.lotes == [['registro 1', 'registro 2']]
+
+    banco = BancoLogs()
+    fila._reprocessar_arquivo(banco)
+
+    assert banco.lotes == [['registro 3', 'registro 4'], ['registro 5']]
+    assert fila.gravados == 3
+    assert os.listdir(tmp_path) == []
+
+def test_registros_novos_durante_a_falha_vao_para_outro_arquivo(fila):
+    with pytest.raises(RuntimeError):
+        fila._reprocessar_arquivo(BancoLogs(falhar_no_lote=1))
+    fila._gravar_arquivo([('LOGOUT', 'registro 6', 'sistema', None, datetime(2025, 1, 1, 13, 0))])
+
+    banco = BancoLogs()
+    fila._reprocessar_arquivo(banco)
+    fila._reprocessar_arquivo(banco)
+
+    assert banco.lotes == [['registro 1', 'registro 2'], ['registro 3', 'registro 4'], ['registro 5'],
+                           ['registro 6']]
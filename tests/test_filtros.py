@@ -0,0 +1,55 @@
+from datetime import date, datetime
+
+import pytest
+
+from filtros import FiltroVendas, FiltroLogs, FiltroInvalido
+
+def test_periodo_vira_intervalo_semiaberto():
+    filtro = FiltroVendas(data_inicio='2025-01-01', data_fim='2025-01-31')
+
+    where_clauses, params = filtro.clausulas()
+
+    assert where_clauses == ['v.data_venda >= %s', 'v.data_venda < %s']
+    assert params == [date(2025, 1, 1), date(2025, 2, 1)]
+
+def test_data_fim_no_ultimo_dia_do_ano():
+    _, params = FiltroVendas(data_fim='31/12/2024').clausulas()
+    assert params == [date(2025, 1, 1)]
+
+def test_datas_em_formato_brasileiro_e_datetime():
+    filtro = FiltroVendas(data_inicio='05/03/2025', data_fim=datetime(2025, 3, 7, 18, 30))
+    assert filtro.data_inicio == date(2025, 3, 5)
+    assert filtro.data_fim == date(2025, 3, 7)
+
+def test_todos_os_filtros_sem_funcoes_na_coluna():
+    filtro = FiltroVendas.de_dict({'cliente_id': '7', 'status': 'aberta',
+                                   'data_inicio': '2025-01-01', 'data_fim': ''})
+
+    where, params = filtro.where(alias='x')
+
+    assert where == 'x.cliente_id = %s AND x.status = %s AND x.data_venda >= %s'
+    assert params == [7, 'aberta', date(2025, 1, 1)]
+    assert 'DATE(' not in where
+
+def test_sem_filtros():
+    filtro = FiltroVendas.de_dict(None)
+    assert filtro.where() == ('1=1', [])
+    assert not filtro
+
+@pytest.mark.parametrize('parametros', [
+    {'status': 'apagada'},
+    {'cliente_id': 'abc'},
+    {'data_inicio': '31/02/2025'},
+    {'data_inicio': '2025-02-10', 'data_fim': '2025-02-01'}
+])
+def test_filtros_invalidos(parametros):
+    with pytest.raises(FiltroInvalido):
+        FiltroVendas.de_dict(parametros)
+
+def test_filtro_logs_semiaberto():
+    filtro = FiltroLogs(acao=' login ', data_inicio='2025-06-01', data_fim='2025-06-01')
+
+    where_clauses, params = filtro.clausulas()
+
+    assert where_clauses == ['acao = %s', 'timestamp >= %s', 'timestamp < %s']
+    assert params == ['LOGIN', date(2025, 6, 1), date(2025, 6, 2)]
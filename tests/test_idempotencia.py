@@ -0,0 +1,134 @@
+import pytest
+from flask import jsonify, request
+from mysql.connector import Error
+
+import idempotencia
+from idempotencia import idempotente, ER_LOCK_WAIT_TIMEOUT
+from database import ER_DUP_ENTRY
+
+class TabelaChaves:
+    """chaves_idempotencia em memória, respondendo aos comandos do Database"""
+
+    def __init__(self, conexao):
+        self.conexao = conexao
+        self.linhas = {}
+        self.erro_ao_inserir = None
+
+    def __call__(self, query, params):
+        if query.lstrip().startswith('INSERT INTO chaves_idempotencia'):
+            if self.erro_ao_inserir:
+                raise Error(msg='Lock wait timeout', errno=self.erro_ao_inserir)
+            chave, rota, hash_requisicao = params
+            if chave in self.linhas:
+                raise Error(msg='Duplicate entry', errno=ER_DUP_ENTRY)
+            self.linhas[chave] = {'rota': rota, 'hash_requisicao': hash_requisicao, 'resposta': None}
+            self.conexao.ao_desfazer.append(lambda: self.linhas.pop(chave))
+        elif query.startswith('SELECT rota'):
+            linha = self.linhas.get(params[0])
+            return [dict(linha)] if linha else []
+        elif query.startswith('UPDATE chaves_idempotencia'):
+            resposta, chave = params
+            self.linhas[chave]['resposta'] = resposta
+        return None
+
+@pytest.fixture
+def chaves(banco, monkeypatch):
+    tabela = TabelaChaves(banco.connection)
+    banco.connection.responder = tabela
+    monkeypatch.setattr(idempotencia, 'obter_database', lambda: banco)
+    return tabela
+
+@pytest.fixture
+def pagamentos(app):
+    """Rota de pagamento que registra cada execução"""
+    executados = []
+
+    @app.route('/api/pagamento', methods=['POST'])
+    @idempotente
+    def pagar():
+        dados = request.get_json()
+        if dados['valor'] <= 0:
+            return jsonify({'sucesso': False, 'erro': 'Valor inválido'}), 400
+        executados.append(dados['valor'])
+        return jsonify({'sucesso': True, 'pagamento_id': len(executados)})
+
+    return executados
+
+def _pagar(app, valor, chave='chave-1'):
+    headers = {'Idempotency-Key': chave} if chave else {}
+    return app.test_client().post('/api/pagamento', json={'valor': valor}, headers=headers)
+
+def test_repeticao_devolve_a_mesma_resposta(app, chaves, pagamentos):
+    primeira = _pagar(app, 10)
+    repetida = _pagar(app, 10)
+
+    assert primeira.get_json() == {'sucesso': True, 'pagamento_id': 1}
+    assert repetida.data == primeira.data
+    assert repetida.headers['Idempotent-Replayed'] == 'true'
+    assert 'Idempotent-Replayed' not in primeira.headers
+    assert pagamentos == [10]
+
+def test_chaves_diferentes_executam_de_novo(app, chaves, pagamentos):
+    _pagar(app, 10, 'chave-1')
+    _pagar(app, 10, 'chave-2')
+    assert pagamentos == [10, 10]
+
+def test_sem_chave_executa_sempre(app, chaves, pagamentos):
+    _pagar(app, 10, None)
+    _pagar(app, 10, None)
+    assert pagamentos == [10, 10]
+    assert chaves.linhas == {}
+
+def test_mesma_chave_com_outro_corpo(app, chaves, pagamentos):
+    _pagar(app, 10)
+    resposta = _pagar(app, 20)
+
+    assert resposta.status_code == 422
+    assert pagamentos == [10]
+
+def test_chave_em_processamento_responde_409(app, chaves, pagamentos):
+    # Outra requisição reservou a chave e ainda não gravou a resposta
+    chaves.linhas['chave-1'] = {'rota': '/api/pagamento', 'hash_requisicao': 'x', 'resposta': None}
+
+    resposta = _pagar(app, 10)
+
+    assert resposta.status_code == 409
+    assert pagamentos == []
+
+def test_espera_pela_trava_esgotada_responde_409(app, chaves, pagamentos):
+    chaves.erro_ao_inserir = ER_LOCK_WAIT_TIMEOUT
+
+    resposta = _pagar(app, 10)
+
+    assert resposta.status_code == 409
+    assert pagamentos == []
+
+def test_falha_libera_a_chave(app, chaves, pagamentos):
+    falha = _pagar(app, 0)
+    assert falha.status_code == 400
+    assert chaves.linhas == {}
+    assert ('ROLLBACK', ()) in chaves.conexao.comandos
+
+    sucesso = _pagar(app, 10)
+    assert sucesso.get_json()['sucesso'] is True
+
+@pytest.mark.parametrize('chave', ['x' * 101, 'chave-ç'])
+def test_chave_invalida(app, chaves, pagamentos, chave):
+    assert _pagar(app, 10, chave).status_code == 400
+    assert pagamentos == []
+
+def test_efeitos_apos_commit_so_na_primeira_execucao(app, banco, chaves):
+    efeitos = []
+
+    @app.route('/api/quitar', methods=['POST'])
+    @idempotente
+    def quitar():
+        banco.ao_confirmar(lambda: efeitos.append(list(banco.connection.comandos)))
+        return jsonify({'sucesso': True})
+
+    cliente = app.test_client()
+    cliente.post('/api/quitar', json={}, headers={'Idempotency-Key': 'q'})
+    cliente.post('/api/quitar', json={}, headers={'Idempotency-Key': 'q'})
+
+    assert len(efeitos) == 1
+    assert efeitos[0][-1] == ('COMMIT', ())
@@ -0,0 +1,104 @@
+import pytest
+
+import migracoes
+from migracoes import listar_migracoes, ler_comandos_sql, aplicar_migracoes, verificar_indices
+
+@pytest.fixture
+def diretorio(tmp_path, monkeypatch):
+    monkeypatch.setattr(migracoes, 'DIRETORIO_MIGRACOES', str(tmp_path))
+    return tmp_path
+
+class BancoMigracoes:
+    """Executa os comandos só registrando-os; schema_version fica em memória"""
+
+    def __init__(self, aplicadas=()):
+        self.aplicadas = set(aplicadas)
+        self.comandos = []
+
+    def execute_query(self, query, params=None):
+        query = ' '.join(query.split())
+        if query.startswith('SELECT versao FROM schema_version'):
+            return [{'versao': versao} for versao in self.aplicadas]
+        if query.startswith('INSERT INTO schema_version'):
+            self.aplicadas.add(params[0])
+        self.comandos.append(query)
+        return 0
+
+    def comandos_de_migracao(self):
+        return [c for c in self.comandos if 'schema_version' not in c]
+
+def _criar(diretorio, nome, conteudo):
+    (diretorio / nome).write_text(conteudo, encoding='utf-8')
+
+def test_ordem_por_versao_numerica(diretorio):
+    _criar(diretorio, '0010_dez.sql', 'SELECT 10')
+    _criar(diretorio, '0002_dois.py', 'def aplicar(db): pass')
+    _criar(diretorio, '0001_um.sql', 'SELECT 1')
+    _criar(diretorio, 'leia-me.txt', '')
+    _criar(diretorio, '3_sem_zeros.sql', 'SELECT 3')
+
+    assert [(versao, nome, tipo) for versao, nome, _, tipo in listar_migracoes()] == [
+        (1, 'um', 'sql'), (2, 'dois', 'py'), (10, 'dez', 'sql')
+    ]
+
+def test_versao_repetida(diretorio):
+    _criar(diretorio, '0001_um.sql', 'SELECT 1')
+    _criar(diretorio, '0001_outro.py', 'def aplicar(db): pass')
+
+    with pytest.raises(ValueError):
+        listar_migracoes()
+
+def test_comandos_sql_sem_comentarios(diretorio):
+    _criar(diretorio, '0001_um.sql', '-- índice\nCREATE INDEX a ON t (x);\n\n-- outro\nCREATE INDEX b ON t (y);\n')
+    assert ler_comandos_sql(str(diretorio / '0001_um.sql')) == ['CREATE INDEX a ON t (x)', 'CREATE INDEX b ON t (y)']
+
+def test_dry_run_nao_executa(diretorio):
+    _criar(diretorio, '0001_um.sql', 'CREATE INDEX a ON t (x);')
+    _criar(diretorio, '0002_dois.py', 'def aplicar(db):\n    raise AssertionError("executou")\n')
+    db = BancoMigracoes()
+
+    pendentes = aplicar_migracoes(db, dry_run=True)
+
+    assert [(m['versao'], m['comandos']) for m in pendentes] == [(1, ['CREATE INDEX a ON t (x)']), (2, [])]
+    assert db.comandos_de_migracao() == []
+    assert db.aplicadas == set()
+
+def test_aplica_pendentes_em_ordem(diretorio):
+    _criar(diretorio, '0001_um.sql', 'CREATE INDEX a ON t (x);')
+    _criar(diretorio, '0002_dois.py', 'def aplicar(db):\n    db.execute_query("ALTER TABLE t ADD c INT")\n')
+    _criar(diretorio, '0003_tres.sql', 'CREATE INDEX b ON t (y);\nCREATE INDEX c ON t (z);')
+    db = BancoMigracoes(aplicadas={1})
+
+    aplicadas = aplicar_migracoes(db)
+
+    assert [m['versao'] for m in aplicadas] == [2, 3]
+    assert db.comandos_de_migracao() == ['ALTER TABLE t ADD c INT', 'CREATE INDEX b ON t (y)',
+                                         'CREATE INDEX c ON t (z)']
+    assert db.aplicadas == {1, 2, 3}
+    assert aplicar_migracoes(db) == []
+
+class CursorExplain:
+    def __init__(self, linhas):
+        self.linhas = linhas
+
+    def execute(self, query, params):
+        self.query = query
+
+    def fetchall(self):
+        return self.linhas
+
+class BancoExplain:
+    def __init__(self, linhas):
+        self.cursor = CursorExplain(linhas)
+
+def test_verificar_indices_exige_o_indice_escolhido(monkeypatch):
+    monkeypatch.setattr(migracoes, 'CONSULTAS_VERIFICADAS', [('vendas', 'SELECT 1', (), 'idx_vendas_data')])
+
+    so_possivel = BancoExplain([{'key': None, 'possible_keys': 'idx_vendas_data,PRIMARY'}])
+    escolhido = BancoExplain([{'key': 'idx_vendas_data', 'possible_keys': 'idx_vendas_data'}])
+
+    assert verificar_indices(so_possivel)[0]['ok'] is False
+    assert verificar_indices(escolhido)[0] == {
+        'consulta': 'vendas', 'indice_esperado': 'idx_vendas_data',
+        'indice_usado': 'idx_vendas_data', 'ok': True
+    }
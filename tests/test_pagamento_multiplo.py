@@ -0,0 +1,83 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+@pytest.fixture
+def vendas(banco):
+    """Vendas abertas do cliente 9; registra o INSERT de pagamentos e aplica o UPDATE em lote"""
+    estado = {'vendas': [], 'pagamentos': None, 'ids_gerados': [], 'busca_ids': None}
+
+    def responder(query, params):
+        query = ' '.join(query.split())
+        if query.startswith('SELECT DISTINCT cliente_id FROM vendas'):
+            return [{'cliente_id': 9}]
+        if query.startswith('SELECT id, cliente_id, valor_restante, status, data_venda FROM vendas'):
+            return [dict(venda) for venda in estado['vendas']]
+        if query.startswith('UPDATE vendas SET valor_pago'):
+            casos = params[:len(params) // 3 * 2]
+            pagos = dict(zip(casos[0::2], casos[1::2]))
+            for venda in estado['vendas']:
+                venda['valor_restante'] -= pagos.get(venda['id'], 0)
+                venda['status'] = 'paga' if venda['valor_restante'] <= 0 else 'aberta'
+        if query.startswith('INSERT INTO pagamentos'):
+            estado['pagamentos'] = params
+            banco.cursor.lastrowid = 100
+        if query.startswith('SELECT id FROM pagamentos'):
+            estado['busca_ids'] = params
+            return [{'id': pagamento_id} for pagamento_id in estado['ids_gerados']]
+        if query.startswith('SELECT'):
+            return []
+        return None
+
+    banco.connection.responder = responder
+    return estado
+
+def _venda(venda_id, restante):
+    return {'id': venda_id, 'cliente_id': 9, 'valor_restante': Decimal(restante), 'status': 'aberta',
+            'data_venda': datetime(2025, 1, venda_id)}
+
+def test_valor_exato_quita_sem_pagamento_de_zero(banco, vendas):
+    vendas['vendas'] = [_venda(1, '5.05'), _venda(2, '5.05'), _venda(3, '7.00')]
+
+    resultado = banco.processar_pagamento_multiplo(9, [1, 2, 3], 10.10, 'pix')
+
+    assert [(venda_id, valor) for venda_id, valor, _, _ in vendas['pagamentos']] == [
+        (1, Decimal('5.05')), (2, Decimal('5.05'))
+    ]
+    assert resultado['venda_saldo_id'] is None
+    assert resultado['valor_total_devido'] == 17.10
+
+def test_pagamento_parcial_na_ultima_venda(banco, vendas):
+    vendas['vendas'] = [_venda(1, '0.10'), _venda(2, '0.20')]
+
+    banco.processar_pagamento_multiplo(9, [1, 2], 0.1 + 0.2 - 0.05, 'dinheiro')
+
+    assert [valor for _, valor, _, _ in vendas['pagamentos']] == [Decimal('0.10'), Decimal('0.15')]
+
+def test_ids_dos_pagamentos_lidos_do_banco(banco, vendas):
+    # auto_increment_increment = 2: os ids não são consecutivos
+    vendas['vendas'] = [_venda(1, '5.00'), _venda(2, '5.00')]
+    vendas['ids_gerados'] = [100, 102]
+
+    resultado = banco.processar_pagamento_multiplo(9, [1, 2], 10, 'pix')
+
+    assert resultado['pagamentos_realizados'] == [100, 102]
+    assert list(vendas['busca_ids']) == [1, 2, 100]
+
+def test_saldo_travado_antes_das_vendas_e_atualizado_por_variacao(banco, vendas):
+    vendas['vendas'] = [_venda(1, '5.00'), _venda(2, '8.00')]
+
+    banco.processar_pagamento_multiplo(9, [1, 2], 7, 'pix')
+
+    comandos = [query for query, _ in banco.connection.comandos]
+    trava_saldo = next(i for i, query in enumerate(comandos) if query.startswith('INSERT INTO saldos_clientes'))
+    trava_vendas = next(i for i, query in enumerate(comandos) if query.endswith('FOR UPDATE'))
+    assert trava_saldo < trava_vendas
+
+    query, params = next(comando for comando in banco.connection.comandos
+                         if comando[0].startswith('UPDATE saldos_clientes'))
+    assert 'saldo_devedor = saldo_devedor + %s' in query
+    assert 'SUM(' not in query
+    # Venda 1 quitada (sai do aberto), venda 2 com 6,00 restantes
+    assert params == (Decimal('-7.00'), -1, 9, 9)
@@ -0,0 +1,38 @@
+from datetime import datetime
+
+import pytest
+
+from filtros import (FiltroInvalido, limite_pagina, LIMITE_MAXIMO_PAGINA,
+                     ler_cursor_vendas, cursor_vendas, ler_cursor_clientes, cursor_clientes)
+
+def test_cursor_vendas_ida_e_volta():
+    venda = {'id': 42, 'data_venda': datetime(2025, 4, 1, 9, 15, 0)}
+
+    cursor = cursor_vendas(venda)
+
+    assert cursor == '2025-04-01 09:15:00,42'
+    assert ler_cursor_vendas(cursor) == (datetime(2025, 4, 1, 9, 15, 0), 42)
+    assert ler_cursor_vendas('2025-04-01T09:15:00,42') == (datetime(2025, 4, 1, 9, 15, 0), 42)
+
+def test_cursor_clientes_com_virgula_no_nome():
+    cliente = {'id': 3, 'nome': 'Silva, José'}
+    assert ler_cursor_clientes(cursor_clientes(cliente)) == ('Silva, José', 3)
+
+@pytest.mark.parametrize('cursor', ['2025-04-01 09:15:00', 'ontem,5', '2025-04-01 09:15:00,x'])
+def test_cursor_vendas_invalido(cursor):
+    with pytest.raises(FiltroInvalido):
+        ler_cursor_vendas(cursor)
+
+def test_cursor_vazio_e_primeira_pagina():
+    assert ler_cursor_vendas('') is None
+    assert ler_cursor_clientes(None) is None
+    with pytest.raises(FiltroInvalido):
+        ler_cursor_clientes(',5')
+
+def test_limite_pagina():
+    assert limite_pagina(None) == 50
+    assert limite_pagina('20') == 20
+    assert limite_pagina('0') == 1
+    assert limite_pagina(10 ** 6) == LIMITE_MAXIMO_PAGINA
+    with pytest.raises(FiltroInvalido):
+        limite_pagina('muitos')
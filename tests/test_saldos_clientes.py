@@ -0,0 +1,56 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+@pytest.fixture
+def venda_do_cliente(banco):
+    """Venda 7 do cliente 3; INSERT INTO vendas gera o id 7 e UPDATE muda o status"""
+    estado = {'venda': None}
+
+    def responder(query, params):
+        query = ' '.join(query.split())
+        if query.startswith('INSERT INTO vendas'):
+            estado['venda'] = {'id': 7, 'cliente_id': 3, 'valor_restante': Decimal('40.00'), 'status': 'aberta',
+                               'data_venda': datetime(2025, 3, 1, 10, 0)}
+            banco.cursor.lastrowid = 7
+        if query.startswith('UPDATE vendas SET status'):
+            estado['venda']['status'] = params[0]
+        if query.startswith('SELECT DISTINCT cliente_id FROM vendas'):
+            return [{'cliente_id': 3}]
+        if query.startswith('SELECT id, cliente_id, valor_restante, status, data_venda FROM vendas'):
+            return [dict(estado['venda'])] if estado['venda'] else []
+        if query.startswith('SELECT'):
+            return []
+        return None
+
+    banco.connection.responder = responder
+    return estado
+
+def _atualizacoes_de_saldo(banco):
+    return [comando for comando in banco.connection.comandos if comando[0].startswith('UPDATE saldos_clientes')]
+
+def test_venda_nova_soma_ao_saldo(banco, venda_do_cliente):
+    banco.inserir_venda({'cliente_id': 3, 'valor_total': Decimal('40.00'), 'observacoes': ''}, [])
+
+    comandos = [query for query, _ in banco.connection.comandos]
+    assert comandos[1].startswith('INSERT INTO saldos_clientes')
+    assert comandos[2].startswith('INSERT INTO vendas')
+
+    [(query, params)] = _atualizacoes_de_saldo(banco)
+    assert 'LEAST(COALESCE(venda_aberta_mais_antiga, %s), %s)' in query
+    assert params == (Decimal('40.00'), 1, datetime(2025, 3, 1, 10, 0), datetime(2025, 3, 1, 10, 0), 3)
+
+def test_venda_cancelada_sai_do_saldo(banco, venda_do_cliente):
+    venda_do_cliente['venda'] = {'id': 7, 'cliente_id': 3, 'valor_restante': Decimal('40.00'), 'status': 'vencida',
+                                 'data_venda': datetime(2025, 3, 1, 10, 0)}
+
+    banco.atualizar_status_venda(7, 'cancelada')
+
+    comandos = [query for query, _ in banco.connection.comandos]
+    assert comandos[2].startswith('INSERT INTO saldos_clientes')
+    assert comandos[3].endswith('FOR UPDATE')
+
+    [(query, params)] = _atualizacoes_de_saldo(banco)
+    assert 'SELECT MIN(data_venda) FROM vendas' in query
+    assert params == (Decimal('-40.00'), -1, 3, 3)
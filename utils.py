@@ -1,11 +1,16 @@
 import re
 import csv
+import io
+import itertools
 import os
 import json
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import decimal
+import unicodedata
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, Alignment, PatternFill
+from openpyxl.utils import get_column_letter
 import logging
 
 logger = logging.getLogger(__name__)
@@ -163,6 +168,59 @@ def sanitizar_string(texto):
     
     return texto_limpo.strip()
 
+def normalizar_termos_busca(texto):
+    """Quebrar texto em termos de busca: minúsculos, sem acentos, só letras e dígitos"""
+    if not texto:
+        return []
+    
+    sem_acentos = unicodedata.normalize('NFKD', str(texto))
+    sem_acentos = ''.join(c for c in sem_acentos if not unicodedata.combining(c))
+    return re.findall(r'[a-z0-9]+', sem_acentos.lower())
+
+def termos_busca_cliente(nome, cpf=None, telefone=None):
+    """Termos indexados de um cliente para a busca por prefixo
+    
+    Palavras do nome normalizadas e CPF/telefone só com dígitos (o telefone
+    também sem DDD, para achar pelo número digitado sem ele).
+    """
+    termos = set(normalizar_termos_busca(nome))
+    
+    for documento in (cpf, telefone):
+        digitos = re.sub(r'\D', '', documento or '')
+        if digitos:
+            termos.add(digitos)
+    
+    digitos_telefone = re.sub(r'\D', '', telefone or '')
+    if len(digitos_telefone) >= 10:
+        termos.add(digitos_telefone[2:])
+    
+    return termos
+
+def termos_consulta_busca(texto):
+    """Termos de uma consulta de busca; CPF/telefone digitados com
+    pontuação ("123.456", "(31) 9876") viram um único termo de dígitos"""
+    if texto and not re.search(r'[^\W\d_]', str(texto)):
+        digitos = re.sub(r'\D', '', str(texto))
+        return [digitos] if digitos else []
+    return normalizar_termos_busca(texto)
+
+def ids_vendas_origem(valor):
+    """Ids de vendas de origem a partir de lista ou texto "12,15,20" (formato antigo)"""
+    if not valor:
+        return []
+    if isinstance(valor, str):
+        valor = valor.split(',')
+    
+    ids = []
+    for item in valor:
+        try:
+            venda_id = int(str(item).strip())
+        except ValueError:
+            continue
+        if venda_id not in ids:
+            ids.append(venda_id)
+    return ids
+
 def validar_numero_positivo(valor):
     """Validar se um valor é um número positivo"""
     try:
@@ -176,6 +234,34 @@ def gerar_nome_arquivo_backup():
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     return f"backup_acougue_{timestamp}.sql"
 
+def criar_backup_mysql(config_db, pasta='backups'):
+    """Gerar backup do banco com mysqldump. Retorna (sucesso, nome_arquivo ou erro)"""
+    import subprocess
+    
+    criar_diretorio_se_nao_existe(pasta)
+    
+    nome_arquivo = gerar_nome_arquivo_backup()
+    caminho_backup = os.path.join(pasta, nome_arquivo)
+    
+    comando = [
+        'mysqldump',
+        f'--host={config_db["host"]}',
+        f'--user={config_db["user"]}',
+        f'--password={config_db["password"]}',
+        '--single-transaction',
+        '--routines',
+        '--triggers',
+        config_db['database']
+    ]
+    
+    with open(caminho_backup, 'w') as arquivo_backup:
+        resultado = subprocess.run(comando, stdout=arquivo_backup, stderr=subprocess.PIPE, text=True)
+    
+    if resultado.returncode != 0:
+        return False, resultado.stderr
+    
+    return True, nome_arquivo
+
 def criar_diretorio_se_nao_existe(caminho):
     """Criar diretório se não existir"""
     try:
@@ -206,15 +292,7 @@ def exportar_para_csv(dados, nome_arquivo, colunas=None):
             writer.writeheader()
             
             for linha in dados:
-                # Formatar valores monetários
-                linha_formatada = {}
-                for chave, valor in linha.items():
-                    if isinstance(valor, (int, float)) and 'valor' in chave.lower():
-                        linha_formatada[chave] = formatar_moeda(valor)
-                    else:
-                        linha_formatada[chave] = valor
-                
-                writer.writerow(linha_formatada)
+                writer.writerow(_formatar_linha_csv(linha))
         
         return True, caminho_arquivo
         
@@ -222,63 +300,136 @@ def exportar_para_csv(dados, nome_arquivo, colunas=None):
         logger.error(f"Erro ao exportar CSV: {e}")
         return False, f"Erro ao exportar: {str(e)}"
 
-def exportar_para_excel(dados, nome_arquivo, nome_planilha="Dados", colunas=None):
-    """Exportar dados para arquivo Excel"""
+def _formatar_linha_csv(linha):
+    """Formatar valores monetários de uma linha do CSV"""
+    linha_formatada = {}
+    for chave, valor in linha.items():
+        if isinstance(valor, (int, float)) and 'valor' in chave.lower():
+            linha_formatada[chave] = formatar_moeda(valor)
+        elif isinstance(valor, datetime):
+            linha_formatada[chave] = formatar_data_hora_brasileira(valor)
+        else:
+            linha_formatada[chave] = valor
+    return linha_formatada
+
+def gerar_csv(linhas, colunas, linhas_por_bloco=500):
+    """CSV no formato de exportar_para_csv, gerado em blocos de texto
+    
+    Para respostas em streaming: consome 'linhas' (qualquer iterável de
+    dicts) aos poucos e só guarda o bloco atual em memória.
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=colunas, delimiter=';')
+    writer.writeheader()
+    
+    for numero, linha in enumerate(linhas, 1):
+        writer.writerow(_formatar_linha_csv(linha))
+        if numero % linhas_por_bloco == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    
+    yield buffer.getvalue()
+
+FORMATO_MOEDA_EXCEL = '#,##0.00'
+FORMATO_DATA_EXCEL = 'DD/MM/YYYY'
+FORMATO_DATA_HORA_EXCEL = 'DD/MM/YYYY HH:MM'
+
+def _formato_excel(valor, coluna_valor):
+    """Formato numérico da célula (None = célula sem estilo)"""
+    if isinstance(valor, datetime):
+        return FORMATO_DATA_HORA_EXCEL
+    if isinstance(valor, date):
+        return FORMATO_DATA_EXCEL
+    if coluna_valor and isinstance(valor, (int, float, decimal.Decimal)) and not isinstance(valor, bool):
+        return FORMATO_MOEDA_EXCEL
+    return None
+
+def _largura_excel(valor, formato):
+    """Largura aproximada (em caracteres) do valor exibido na célula"""
+    if valor is None:
+        return 0
+    if formato == FORMATO_DATA_HORA_EXCEL:
+        return 16
+    if formato == FORMATO_DATA_EXCEL:
+        return 10
+    if formato == FORMATO_MOEDA_EXCEL:
+        return len(f"{valor:,.2f}")
+    return len(str(valor))
+
+def exportar_para_excel(dados, nome_arquivo, nome_planilha="Dados", colunas=None, linhas_amostra=1000,
+                        pasta='exports'):
+    """Exportar dados para arquivo Excel
+    
+    Workbook em modo write-only: cada linha vai direto para o arquivo, então
+    'dados' pode ser um gerador e a memória não cresce com o relatório.
+    Nesse modo as larguras das colunas vão no início da planilha; elas são
+    medidas nas primeiras 'linhas_amostra' linhas, as únicas guardadas em
+    memória. Datas e valores monetários (colunas com 'valor' no nome) são
+    gravados como números formatados.
+    """
     try:
         # Criar diretório exports se não existir
-        criar_diretorio_se_nao_existe('exports')
+        criar_diretorio_se_nao_existe(pasta)
         
-        caminho_arquivo = os.path.join('exports', nome_arquivo)
+        caminho_arquivo = os.path.join(pasta, nome_arquivo)
         
-        if not dados:
+        linhas = iter(dados)
+        amostra = list(itertools.islice(linhas, linhas_amostra))
+        if not amostra:
             return False, "Nenhum dado para exportar"
         
         # Se não especificar colunas, usar as chaves do primeiro item
         if not colunas:
-            colunas = list(dados[0].keys())
-        
-        # Criar workbook e worksheet
-        wb = Workbook()
-        ws = wb.active
-        ws.title = nome_planilha
-        
-        # Estilo do cabeçalho
+            colunas = list(amostra[0].keys())
+        colunas_valor = ['valor' in coluna.lower() for coluna in colunas]
+        
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(nome_planilha)
+        
+        # Larguras pelo maior valor entre cabeçalho e amostra (máximo 50)
+        larguras = [len(str(coluna)) for coluna in colunas]
+        for linha in amostra:
+            for indice, coluna in enumerate(colunas):
+                valor = linha.get(coluna)
+                larguras[indice] = max(larguras[indice],
+                                       _largura_excel(valor, _formato_excel(valor, colunas_valor[indice])))
+        for indice, largura in enumerate(larguras, 1):
+            ws.column_dimensions[get_column_letter(indice)].width = min(largura + 2, 50)
+        
+        # Cabeçalho
         header_font = Font(bold=True, color="FFFFFF")
         header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
         header_alignment = Alignment(horizontal="center", vertical="center")
         
-        # Escrever cabeçalho
-        for col_num, coluna in enumerate(colunas, 1):
-            cell = ws.cell(row=1, column=col_num, value=coluna)
+        cabecalho = []
+        for coluna in colunas:
+            cell = WriteOnlyCell(ws, value=coluna)
             cell.font = header_font
             cell.fill = header_fill
             cell.alignment = header_alignment
-        
-        # Escrever dados
-        for row_num, linha in enumerate(dados, 2):
-            for col_num, coluna in enumerate(colunas, 1):
+            cabecalho.append(cell)
+        ws.append(cabecalho)
+        
+        # Uma célula formatada por (coluna, formato), reaproveitada a cada
+        # linha: o append grava a linha na hora
+        celulas = {}
+        
+        def celula(indice, valor, formato):
+            cell = celulas.get((indice, formato))
+            if cell is None:
+                cell = celulas[(indice, formato)] = WriteOnlyCell(ws)
+                cell.number_format = formato
+            cell.value = valor
+            return cell
+        
+        for linha in itertools.chain(amostra, linhas):
+            valores = []
+            for indice, coluna in enumerate(colunas):
                 valor = linha.get(coluna, '')
-                
-                # Formatar valores monetários
-                if isinstance(valor, (int, float)) and 'valor' in coluna.lower():
-                    valor = float(valor)
-                
-                ws.cell(row=row_num, column=col_num, value=valor)
-        
-        # Ajustar largura das colunas
-        for column in ws.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            
-            adjusted_width = min(max_length + 2, 50)
-            ws.column_dimensions[column_letter].width = adjusted_width
+                formato = _formato_excel(valor, colunas_valor[indice])
+                valores.append(celula(indice, valor, formato) if formato else valor)
+            ws.append(valores)
         
         # Salvar arquivo
         wb.save(caminho_arquivo)